@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmarks for the CAN Analyzer hot paths.
+
+Usage:
+    python benchmarks.py encode path/to/file.dbc [iterations]
+    python benchmarks.py dtc path/to/file.cdd [iterations]
+    python benchmarks.py cdd path/to/file.cdd
+    python benchmarks.py pipeline path/to/file.dbc [frames]
+    python benchmarks.py verify path/to/file.dbc [payloads]
+"""
+import itertools
+import math
+import os
+import random
+import re
+import sys
+import time
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _rate(func, iterations):
+    """Run func repeatedly and return calls per second"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed if elapsed else float('inf')
+
+
+def benchmark_encode(dbc_path, iterations=20000):
+    """Compare cantools encode with the compiled encoders for every message"""
+    from parsers.dbc_parser import DBCParser
+
+    parser = DBCParser()
+    if not parser.load_dbc_file(dbc_path):
+        print(f"Could not load {dbc_path}")
+        return
+
+    print(f"{'Message':<32}{'cantools':>14}{'compiled':>14}{'no-check':>14}{'update 1':>14}")
+    for name, message in parser.messages.items():
+        encoder = parser.get_encoder(name)
+        fast_encoder = parser.get_encoder(name, validate=False)
+        try:
+            values = message.decode(bytes(message.length))
+            message.encode(values)
+            encoder.encode(values)
+            fast_encoder.encode(values)
+        except Exception as e:
+            print(f"{name:<32}skipped ({e})")
+            continue
+
+        # Alternate one signal between two values so every update really re-packs
+        try:
+            other_values = message.decode(bytes([0x55] * message.length))
+        except Exception:
+            other_values = values
+        first_signal = next(iter(values))
+        toggled = itertools.cycle([{first_signal: values[first_signal]},
+                                   {first_signal: other_values.get(first_signal, values[first_signal])}])
+        rates = [
+            _rate(lambda: message.encode(values), iterations),
+            _rate(lambda: encoder.encode(values), iterations),
+            _rate(lambda: fast_encoder.encode(values), iterations),
+            _rate(lambda: fast_encoder.update(**next(toggled)), iterations),
+        ]
+        print(f"{name:<32}" + ''.join(f"{rate:>10.0f} f/s" for rate in rates))
+
+
+def _legacy_hex_window_scan(cdd_parser, data):
+    """Previous MainWindow payload scan: hex string slices looked up one by one"""
+    found = []
+    data_hex = data.hex().upper()
+    for i in range(0, len(data_hex) - 5, 2):
+        dtc_info = cdd_parser.get_dtc_info(data_hex[i:i + 6])
+        if dtc_info:
+            found.append((i // 2, dtc_info))
+    return found
+
+
+def _legacy_regex_scan(cdd_parser, signals):
+    """Previous MessageProcessor signal scan: four regexes per stringified value"""
+    found = []
+    for signal_value in signals.values():
+        signal_str = str(signal_value).upper()
+        for pattern in [r'P[0-3][0-9A-F]{3}', r'C[0-3][0-9A-F]{3}',
+                        r'B[0-3][0-9A-F]{3}', r'U[0-3][0-9A-F]{3}']:
+            for match in re.findall(pattern, signal_str):
+                dtc_info = cdd_parser.get_dtc_info(match)
+                if dtc_info:
+                    found.append((match, dtc_info))
+    return found
+
+
+def benchmark_dtc(cdd_path, iterations=20000):
+    """Compare the heuristic DTC scans with the precompiled matcher"""
+    from parsers.cdd_parser import CDDParser
+
+    parser = CDDParser()
+    if not parser.load_cdd_file(cdd_path):
+        print(f"Could not load {cdd_path}")
+        return
+
+    start = time.perf_counter()
+    matcher = parser.get_dtc_matcher()
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Matcher over {len(matcher.codes)} numeric / {len(matcher.sae_codes)} SAE codes "
+          f"built in {build_ms:.1f} ms")
+
+    # Random payloads with a known DTC planted in every tenth one
+    rng = random.Random(1)
+    known = list(matcher.codes)
+    payloads = []
+    for index in range(1000):
+        payload = bytearray(rng.getrandbits(8) for _ in range(8))
+        if known and index % 10 == 0:
+            offset = rng.randrange(6)
+            payload[offset:offset + 3] = rng.choice(known).to_bytes(3, 'big')
+        payloads.append(bytes(payload))
+    frames = itertools.cycle(payloads)
+
+    sae = list(matcher.sae_codes) or ['P0000']
+    signal_sets = itertools.cycle([
+        {'Speed': rng.random() * 250, 'Gear': rng.randrange(8), 'State': rng.choice(sae + ['Idle', 'Run'])}
+        for _ in range(1000)
+    ])
+
+    legacy_hits = sum(len(_legacy_hex_window_scan(parser, payload)) for payload in payloads)
+    matcher_hits = sum(len(matcher.scan_bytes(payload)) for payload in payloads)
+    print(f"Payload detections: hex-window {legacy_hits}, matcher {matcher_hits}")
+
+    rates = [
+        ('payload hex-window', _rate(lambda: _legacy_hex_window_scan(parser, next(frames)), iterations)),
+        ('payload matcher', _rate(lambda: matcher.scan_bytes(next(frames)), iterations)),
+        ('signals regex', _rate(lambda: _legacy_regex_scan(parser, next(signal_sets)), iterations)),
+        ('signals matcher', _rate(lambda: [matcher.scan_text(str(value))
+                                           for value in next(signal_sets).values()
+                                           if not isinstance(value, (int, float))], iterations)),
+    ]
+    for name, rate in rates:
+        print(f"{name:<24}{rate:>12.0f} scans/s")
+
+
+def benchmark_cdd_load(cdd_path):
+    """Load a CDD once and report the loader's time and memory growth"""
+    from parsers.cdd_parser import CDDParser
+
+    parser = CDDParser()
+    if not parser.load_cdd_file(cdd_path):
+        print(f"Could not load {cdd_path}")
+        return
+
+    stats = parser.load_stats
+    growth = f"{stats['peak_rss_growth_mb']:.0f} MB" if stats['peak_rss_growth_mb'] is not None else "n/a"
+    print(f"{len(parser.dids)} DIDs, {len(parser.dtcs)} DTCs, {len(parser.variants)} variants "
+          f"(active: {parser.active_variant or 'none'})")
+    source = 'cache' if stats['cached'] else 'XML'
+    print(f"{stats['file_size'] / (1024 * 1024):.1f} MB loaded from {source} in {stats['seconds']:.2f}s, RSS growth {growth}")
+
+
+def _random_raw(signal):
+    """A random raw value that fits the signal's bits"""
+    if signal.is_float:
+        return random.uniform(-1e6, 1e6)
+    if signal.is_signed:
+        return random.randrange(-(1 << (signal.length - 1)), 1 << (signal.length - 1))
+    return random.randrange(1 << signal.length)
+
+
+def _random_mux_payload(message):
+    """Encode random raw values along a randomly chosen multiplexer path"""
+    values = {}
+    pending = [message.signal_tree]
+    while pending:
+        for item in pending.pop():
+            if isinstance(item, str):
+                values[item] = _random_raw(message.get_signal_by_name(item))
+                continue
+            for selector, branches in item.items():
+                mux_id = random.choice(list(branches))
+                values[selector] = mux_id
+                pending.append(branches[mux_id])
+    return message.encode(values, scaling=False, strict=False)
+
+
+def _decode_or_error(decode, data):
+    try:
+        return decode(data)
+    except Exception:
+        return 'error'
+
+
+def _same_decode(expected, decoded):
+    """Equal values of equal types (NaN floats count as equal)"""
+    if expected == 'error' or decoded == 'error':
+        return expected == decoded
+    if expected.keys() != decoded.keys():
+        return False
+    for name, value in expected.items():
+        other = decoded[name]
+        if type(value) is not type(other):
+            return False
+        if value != other and not (isinstance(value, float) and math.isnan(value) and math.isnan(other)):
+            return False
+    return True
+
+
+def verify_decoders(dbc_path, payloads=20000):
+    """Compare the compiled decoders with cantools on random payloads; returns True if all agree.
+
+    Multiplexed messages get half of their payloads encoded along a random
+    multiplexer path, so every branch table is exercised, and half fully
+    random, which also covers unknown selector values.
+    """
+    import cantools
+    from parsers.dbc_codec import compile_decoder
+
+    database = cantools.database.load_file(dbc_path)
+    random.seed(1)
+    all_match = True
+    print(f"{'Message':<32}{'payloads':>10}{'mismatches':>12}")
+    for message in database.messages:
+        decoder = compile_decoder(message)
+        if decoder is None:
+            print(f"{message.name:<32}{'not compiled, cantools is used':>22}")
+            continue
+
+        mismatches = 0
+        for _ in range(payloads):
+            if message.is_multiplexed() and random.random() < 0.5:
+                try:
+                    data = _random_mux_payload(message)
+                except Exception:
+                    data = bytes(random.getrandbits(8) for _ in range(message.length))
+            else:
+                data = bytes(random.getrandbits(8) for _ in range(message.length))
+
+            expected = _decode_or_error(message.decode, data)
+            decoded = _decode_or_error(decoder, data)
+            if not _same_decode(expected, decoded):
+                mismatches += 1
+                if mismatches <= 3:
+                    print(f"  {message.name} {data.hex()}: cantools {expected}, compiled {decoded}")
+
+        all_match = all_match and mismatches == 0
+        print(f"{message.name:<32}{payloads:>10}{mismatches:>12}")
+    return all_match
+
+
+def benchmark_pipeline(dbc_path, frames=20000):
+    """Run random frames through MessageProcessor with 0, 2 and N decode workers and in batch mode"""
+    from datetime import datetime, timedelta
+    from parsers.dbc_parser import DBCParser
+    from parsers.message_processor import MessageProcessor
+
+    parser = DBCParser()
+    if not parser.load_dbc_file(dbc_path):
+        print(f"Could not load {dbc_path}")
+        return
+
+    frame_ids = [message.frame_id for message in parser.db.messages]
+    start_time = datetime.now()
+    traffic = [(random.choice(frame_ids), bytes(random.randrange(256) for _ in range(8)))
+               for _ in range(frames)]
+
+    for workers in sorted({0, 2, os.cpu_count() or 1}):
+        processor = MessageProcessor(parser, decode_workers=workers)
+        delivered = []
+        processor.add_handler(lambda message: delivered.append(message['sequence']))
+        for sequence, (can_id, data) in enumerate(traffic):
+            processor.add_message({'sequence': sequence, 'can_id': can_id, 'data': data, 'channel': 0,
+                                   'timestamp': start_time + timedelta(microseconds=sequence)})
+
+        start = time.perf_counter()
+        processor.start_processing()
+        processor.message_queue.join()
+        elapsed = time.perf_counter() - start
+        processor.stop_processing()
+
+        in_order = delivered == list(range(frames))
+        print(f"{workers:>2} decode workers{frames / elapsed:>12.0f} f/s  in order: {in_order}")
+
+    # The same frames through the synchronous batch API, as columns
+    processor = MessageProcessor(parser)
+    columns = {'timestamp': [start_time + timedelta(microseconds=sequence) for sequence in range(frames)],
+               'can_id': [can_id for can_id, _ in traffic],
+               'data': [data for _, data in traffic],
+               'channel': [0] * frames}
+    start = time.perf_counter()
+    processed = processor.process_batch(columns)
+    elapsed = time.perf_counter() - start
+    print(f"synchronous batch{frames / elapsed:>12.0f} f/s  processed: {len(processed)}")
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return
+
+    command, path = sys.argv[1], sys.argv[2]
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    if command == 'encode':
+        benchmark_encode(path, iterations)
+    elif command == 'dtc':
+        benchmark_dtc(path, iterations)
+    elif command == 'cdd':
+        benchmark_cdd_load(path)
+    elif command == 'pipeline':
+        benchmark_pipeline(path, iterations)
+    elif command == 'verify':
+        if not verify_decoders(path, iterations):
+            sys.exit(1)
+    else:
+        print(__doc__)
+
+
+if __name__ == '__main__':
+    main()
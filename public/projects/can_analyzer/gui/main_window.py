@@ -7,12 +7,20 @@ from PyQt5.QtGui import QFont
 import logging
 import time
 import queue
+import threading
+from collections import deque
+from itertools import count
 from datetime import datetime
 
 from hardware.vector_interface import VectorCANInterface
+from hardware.flow_control import POLICY_DROP_OLDEST
 from parsers.dbc_parser import DBCParser
 from parsers.cdd_parser import CDDParser
+from parsers.isotp import IsoTpReassembler
+from parsers.uds_decoder import UDSDecoder
+from parsers.message_statistics import MessageStatistics
 from loggers.data_logger import DataLogger
+from loggers.dtc_tracker import DTCTracker
 
 class CircuitBreaker:
     def __init__(self, max_errors=10, timeout=30):
@@ -111,19 +119,68 @@ class CANWorker(QThread):
             logging.warning("CAN worker did not stop gracefully - terminating")
             self.terminate()
 
+class DatabaseLoader(QThread):
+    """Parse a DBC or CDD file off the GUI thread into a fresh parser instance"""
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(str, object, str)
+    failed = pyqtSignal(str, str)
+    
+    def __init__(self, kind, filename, variant=None):
+        super().__init__()
+        self.kind = kind
+        self.filename = filename
+        self.variant = variant  # CDD variant to activate
+        
+    def run(self):
+        try:
+            # Build a brand new parser so the one in use keeps decoding until the swap
+            if self.kind == "dbc":
+                parser = DBCParser()
+                ok = parser.load_dbc_file(self.filename, self.progress.emit)
+            else:
+                parser = CDDParser()
+                ok = parser.load_cdd_file(self.filename, self.progress.emit, self.variant)
+                
+            if ok:
+                self.loaded.emit(self.kind, parser, self.filename)
+            else:
+                self.failed.emit(self.kind, f"Failed to load {self.kind.upper()} file")
+                
+        except Exception as e:
+            logging.error(f"Database loader error: {e}")
+            self.failed.emit(self.kind, str(e))
+
 class MainWindow(QMainWindow):
         # Add this signal for thread-safe GUI updates
     _safe_update_display = pyqtSignal(str, str)
+    _variant_load_requested = pyqtSignal(str)
+    _diagnostic_text = pyqtSignal(str)
     def __init__(self):
         super().__init__()
         self.can_interface = VectorCANInterface()
         self.dbc_parser = DBCParser()
         self.cdd_parser = CDDParser()
+        self.cdd_parser.variant_load_callback = self._variant_load_requested.emit
+        self.isotp = IsoTpReassembler()
+        self._diagnostic_lock = threading.Lock()  # Frames arrive from the capture thread and the worker
+        self._frame_sequence = count()
+        self._recorded_dtcs = {}  # (frame sequence, ECU, code) -> None, oldest first
+        self.max_recorded_dtcs = 10000
+        self.uds_decoder = UDSDecoder(self.cdd_parser)
+        self.heuristic_dtc_scan = False  # Legacy byte-window DTC search on all traffic
         self.data_logger = DataLogger()
+        self.dtc_tracker = DTCTracker(self.data_logger)
         self.can_worker = None
         
+        # Background DBC/CDD loading
+        self.database_loaders = {}
+        self.recent_frames = deque()
+        self.redecode_window_seconds = 10  # Frames re-decoded after a database swap
+        
         # Connect the thread-safe signal
         self._safe_update_display.connect(self._update_display_safe)
+        self._variant_load_requested.connect(self._load_cdd_variant)
+        self._diagnostic_text.connect(self._append_decoded_text)
         
         # Add circuit breaker for error protection
         self.circuit_breaker = CircuitBreaker(max_errors=5, timeout=60)  # 5 errors in 60 seconds
@@ -135,8 +192,9 @@ class MainWindow(QMainWindow):
         self.last_display_update = 0
         self.display_update_interval = 0.1  # Update GUI every 100ms
         
-        # Add message queues for thread-safe GUI updates
-        self.message_queue = queue.Queue()
+        # Bounded queue for thread-safe GUI updates; the newest frames win under overload
+        self.flow = self.can_interface.flow
+        self.message_queue = self.flow.stage('gui_queue', 10000, POLICY_DROP_OLDEST)
         self.gui_update_timer = QTimer()
         
         self.setup_ui()
@@ -222,6 +280,11 @@ class MainWindow(QMainWindow):
         self.load_cdd_btn = QPushButton("Load CDD File")
         file_layout.addWidget(self.load_cdd_btn)
         
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setVisible(False)
+        file_layout.addWidget(self.load_progress)
+        
         file_layout.addStretch()
         
         # Control panel
@@ -365,7 +428,7 @@ class MainWindow(QMainWindow):
         
         self.message_count = 0
         self.dtc_count = 0
-        self.message_timestamps = []
+        self.message_statistics = MessageStatistics()
         self.simulate_traffic = False
     
     def check_memory_usage(self):
@@ -402,6 +465,7 @@ class MainWindow(QMainWindow):
                 
             # Clear pending messages
             if len(self.pending_messages) > 1000:
+                self.flow.record_drop('gui_pending', 'memory_cleanup', len(self.pending_messages) - 500)
                 self.pending_messages = self.pending_messages[-500:]
                 
             # Force garbage collection
@@ -430,7 +494,8 @@ class MainWindow(QMainWindow):
             
             # Clear all buffers
             self.pending_messages = []
-            self.message_timestamps.clear()
+            self.message_statistics.reset()
+            self.recent_frames.clear()
             
             # Force garbage collection
             import gc
@@ -560,6 +625,15 @@ class MainWindow(QMainWindow):
         
         self.gui_update_timer.timeout.connect(self.process_queued_messages)
         self.gui_update_timer.start(100)  # Update GUI every 100ms
+        
+        # DTCs are aggregated in memory; display and database follow at a fixed rate
+        self.dtc_ui_timer = QTimer()
+        self.dtc_ui_timer.timeout.connect(self._refresh_dtc_view)
+        self.dtc_ui_timer.start(250)
+        
+        self.dtc_flush_timer = QTimer()
+        self.dtc_flush_timer.timeout.connect(self._flush_dtcs_async)
+        self.dtc_flush_timer.start(1000)
     
     def emergency_stop(self):
         """Emergency stop - immediately halt everything"""
@@ -581,7 +655,8 @@ class MainWindow(QMainWindow):
             # Reset counters
             self.message_count = 0
             self.dtc_count = 0
-            self.message_timestamps.clear()
+            self.dtc_tracker.clear()
+            self.message_statistics.reset()
             
             # Update UI
             self.connect_btn.setEnabled(True)
@@ -603,10 +678,8 @@ class MainWindow(QMainWindow):
         """Update the status indicators"""
         current_time = time.time()
         
-        # Calculate message rate (messages per second)
-        # Keep only timestamps from last 2 seconds
-        self.message_timestamps = [ts for ts in self.message_timestamps if current_time - ts < 2]
-        message_rate = len(self.message_timestamps) / 2.0
+        # Smoothed message rate (messages per second)
+        message_rate = self.message_statistics.total_rate(current_time)
         
         # Update traffic light
         if message_rate > 10:
@@ -631,8 +704,14 @@ class MainWindow(QMainWindow):
     def update_statistics(self):
         """Update statistics display"""
         try:
+            snapshot = self.message_statistics.snapshot()
+            busiest = sorted(snapshot['ids'].values(), key=lambda entry: entry['rate'], reverse=True)[:3]
+            busiest_text = ", ".join(
+                f"{hex(entry['can_id'])} {entry['rate']:.1f}/s ±{entry['jitter'] * 1000:.1f}ms" for entry in busiest
+            )
             stats_text = f"""
-            Messages: {self.message_count} | DTCs: {self.dtc_count}
+            Messages: {self.message_count} | DTCs: {self.dtc_count} | IDs: {len(snapshot['ids'])} | Dropped: {self.flow.total_dropped()}
+            Busiest: {busiest_text or 'N/A'}
             Status: {'Connected' if hasattr(self, 'can_interface') and self.can_interface.bus else 'Disconnected'}
             Capture: {'Running' if hasattr(self, 'can_worker') and self.can_worker and self.can_worker.is_running else 'Stopped'}
             Channel: {getattr(self, 'current_channel', 'N/A')}
@@ -884,18 +963,120 @@ class MainWindow(QMainWindow):
     def load_dbc_file(self):
         filename, _ = QFileDialog.getOpenFileName(self, "Load DBC File", "", "DBC Files (*.dbc)")
         if filename:
-            if self.dbc_parser.load_dbc_file(filename):
-                QMessageBox.information(self, "Success", "DBC file loaded successfully")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to load DBC file")
+            self._start_database_load("dbc", filename)
                 
     def load_cdd_file(self):
         filename, _ = QFileDialog.getOpenFileName(self, "Load CDD File", "", "CDD Files (*.cdd)")
         if filename:
-            if self.cdd_parser.load_cdd_file(filename):
-                QMessageBox.information(self, "Success", "CDD file loaded successfully")
-            else:
-                QMessageBox.critical(self, "Error", "Failed to load CDD file")
+            self._start_database_load("cdd", filename)
+    
+    def _start_database_load(self, kind, filename, variant=None):
+        """Parse a database file in a worker thread while capture keeps running"""
+        if kind in self.database_loaders:
+            QMessageBox.warning(self, "Busy", f"A {kind.upper()} file is already loading")
+            return
+            
+        loader = DatabaseLoader(kind, filename, variant)
+        loader.progress.connect(self._on_database_load_progress)
+        loader.loaded.connect(self._on_database_loaded)
+        loader.failed.connect(self._on_database_load_failed)
+        loader.finished.connect(lambda: self.database_loaders.pop(kind, None))
+        self.database_loaders[kind] = loader
+        
+        button = self.load_dbc_btn if kind == "dbc" else self.load_cdd_btn
+        button.setEnabled(False)
+        self.load_progress.setValue(0)
+        self.load_progress.setVisible(True)
+        loader.start()
+    
+    def _load_cdd_variant(self, variant):
+        """Reload the CDD with a variant identified from ECU responses (runs in main thread)"""
+        if "cdd" in self.database_loaders or not self.cdd_parser.source_path:
+            # Let the next identifying response request it again
+            self.cdd_parser.pending_variant = None
+            return
+        logging.info(f"Loading CDD variant {variant} in the background")
+        self._start_database_load("cdd", self.cdd_parser.source_path, variant)
+    
+    def _on_database_load_progress(self, percent, stage):
+        """Show loader progress (runs in main thread)"""
+        self.load_progress.setValue(percent)
+        self.load_progress.setFormat(f"{stage} - %p%")
+    
+    def _finish_database_load(self, kind):
+        """Restore file loading controls once a loader is done"""
+        button = self.load_dbc_btn if kind == "dbc" else self.load_cdd_btn
+        button.setEnabled(True)
+        if len(self.database_loaders) <= 1:
+            self.load_progress.setVisible(False)
+    
+    def _on_database_loaded(self, kind, parser, filename):
+        """Swap in the freshly loaded parser and re-decode recently buffered frames"""
+        self._finish_database_load(kind)
+        
+        # Decoding runs on this thread too, so a single assignment is an atomic swap
+        if kind == "dbc":
+            self.dbc_parser = parser
+        else:
+            parser.variant_load_callback = self._variant_load_requested.emit
+            self.cdd_parser = parser
+            self.uds_decoder.set_cdd_parser(parser)
+            
+        redecoded = self._redecode_recent_frames(kind)
+        self.status_label.setText(
+            f"{kind.upper()} file loaded: {filename} ({redecoded} buffered frames re-decoded)"
+        )
+        logging.info(f"{kind.upper()} file swapped in, {redecoded} buffered frames re-decoded")
+    
+    def _on_database_load_failed(self, kind, error_message):
+        """Report a failed background load"""
+        self._finish_database_load(kind)
+        QMessageBox.critical(self, "Error", f"Failed to load {kind.upper()} file: {error_message}")
+    
+    def _remember_recent_frame(self, message_data):
+        """Keep the last few seconds of frames so they can be re-decoded after a database swap"""
+        self.recent_frames.append(message_data)
+        cutoff = message_data['timestamp'].timestamp() - self.redecode_window_seconds
+        while self.recent_frames and self.recent_frames[0]['timestamp'].timestamp() < cutoff:
+            self.recent_frames.popleft()
+    
+    def _redecode_recent_frames(self, kind):
+        """Run frames buffered during loading through the newly loaded database"""
+        if not self.recent_frames:
+            return 0
+            
+        cutoff = datetime.now().timestamp() - self.redecode_window_seconds
+        frames = [msg for msg in self.recent_frames if msg['timestamp'].timestamp() >= cutoff]
+        
+        if kind == "cdd":
+            # Separate reassembler so the replay cannot disturb live transfers; DTCs
+            # already counted for a frame are skipped by _record_dtc()
+            replay = IsoTpReassembler()
+            for message_data in frames:
+                self.check_for_dtcs(message_data, replay)
+            return len(frames)
+            
+        decoded_lines = []
+        for message_data in frames:
+            decoded_info = self.dbc_parser.decode_message(
+                message_data['can_id'], message_data['data'], message_data.get('channel')
+            )
+            if not decoded_info:
+                continue
+                
+            message_data['message_name'] = decoded_info['message_name']
+            message_data['decoded_data'] = decoded_info['signals']
+            
+            timestamp = message_data['timestamp'].strftime("%H:%M:%S.%f")[:-3]
+            decoded_line = f"{timestamp} {decoded_info['message_name']}:"
+            for signal, value in decoded_info['signals'].items():
+                decoded_line += f" {signal}={value}"
+            decoded_lines.append(decoded_line)
+            
+        # One append keeps the widget responsive even for a full window of frames
+        if decoded_lines:
+            self.decoded_text.append("\n".join(decoded_lines))
+        return len(decoded_lines)
                 
     def start_capture(self):
         if not hasattr(self, 'can_interface') or not self.can_interface.bus:
@@ -920,7 +1101,6 @@ class MainWindow(QMainWindow):
             # Add debugging for message reception
             def debug_message(msg):
                 print(f"Message received: ID {hex(msg['can_id'])}, Data: {msg['data'].hex()}")
-                self.on_message_received(msg)
             
             self.can_worker.message_received.connect(debug_message)
             
@@ -952,6 +1132,9 @@ class MainWindow(QMainWindow):
         self.stop_btn.setEnabled(False)
         self.status_label.setText("Capture stopped")
         
+        # Write the remaining DTC changes
+        self.dtc_tracker.flush()
+        
         # Cleanup resources
         self.cleanup_resources()
     
@@ -975,7 +1158,10 @@ class MainWindow(QMainWindow):
         """Process a single message with display throttling"""
         try:
             self.message_count += 1
-            self.message_timestamps.append(time.time())
+            self.message_statistics.update_message(message_data)
+            self._remember_recent_frame(message_data)
+            
+            # DTCs were decoded at intake, see on_message_received()
             
             # Update message count label
             self.message_count_label.setText(f"Messages: {self.message_count}")
@@ -983,6 +1169,7 @@ class MainWindow(QMainWindow):
             # Sample messages for display (every Nth message)
             self.message_counter += 1
             if self.message_counter % self.message_display_interval != 0:
+                self.flow.record_drop('display', 'sampled')
                 return  # Skip display for sampled messages
             
             # Limit the number of displayed messages
@@ -1012,7 +1199,8 @@ class MainWindow(QMainWindow):
             if self.dbc_parser.db:
                 decoded_info = self.dbc_parser.decode_message(
                     message_data['can_id'], 
-                    message_data['data']
+                    message_data['data'],
+                    message_data.get('channel')
                 )
                 
                 if decoded_info:
@@ -1025,9 +1213,6 @@ class MainWindow(QMainWindow):
                         decoded_line += f" {signal}={value}"
                     self.decoded_text.append(decoded_line)
             
-            # Check for DTCs
-            self.check_for_dtcs(message_data)
-            
             # Log to database (in background thread) - with error handling
             self._log_message_async(message_data)
             
@@ -1145,8 +1330,8 @@ class MainWindow(QMainWindow):
                 self.can_interface.close()
             
             # Clear large data structures
-            self.message_timestamps.clear()
-            self.message_queue = queue.Queue()
+            self.message_statistics.reset()
+            self.message_queue.clear()
             
             # Force garbage collection
             import gc
@@ -1182,15 +1367,16 @@ class MainWindow(QMainWindow):
             
             self.message_count += len(batch)
             
-            # Update timestamps for rate calculation
+            # Update per-ID statistics and the bus rate
             current_time = time.time()
-            self.message_timestamps.append(current_time)
+            for message_data in batch:
+                self.message_statistics.update_message(message_data)
             
-            # Keep only recent timestamps (last 5 seconds)
-            self.message_timestamps = [ts for ts in self.message_timestamps if current_time - ts < 5]
+            # DTCs were decoded at intake, see on_message_received()
             
             # Sample messages for display (only show 1 in 10 to reduce load)
             display_messages = batch[::10]
+            self.flow.record_drop('display', 'sampled', len(batch) - len(display_messages))
             
             for message_data in display_messages:
                 self._process_single_message_for_display(message_data)
@@ -1204,6 +1390,7 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.circuit_breaker.record_error()
             logging.error(f"Error processing message batch: {e}")
+            self.flow.record_drop('gui_pending', 'error', len(self.pending_messages))
             self.pending_messages = []  # Clear on error
     
     def _log_messages_async(self, messages):
@@ -1261,6 +1448,7 @@ class MainWindow(QMainWindow):
         """Handle incoming CAN messages with circuit breaker protection"""
         # Check circuit breaker first
         if not self.circuit_breaker.check():
+            self.flow.record_drop('gui_input', 'circuit_breaker')
             return  # Circuit breaker is open - drop messages temporarily
         
         try:
@@ -1296,46 +1484,111 @@ class MainWindow(QMainWindow):
                     logging.error(f"Invalid data type: {type(message_data['data'])}")
                     return
             
-            # Add to queue for thread-safe processing
-            try:
-                self.message_queue.put(message_data, timeout=0.001)
-                self.circuit_breaker.record_success()  # Successfully queued
-                
-            except queue.Full:
-                # Queue is full - this is expected under high load
-                self.circuit_breaker.record_error()
-                logging.warning("Message queue full - dropping message")
+            # Identifies the frame when it is replayed after a database swap
+            message_data['sequence'] = next(self._frame_sequence)
+            
+            # ISO-TP needs every consecutive frame, so diagnostics run before
+            # the display queue, which drops the oldest frames under load
+            self.check_for_dtcs(message_data)
+            
+            # Add to queue for thread-safe processing; overflow is expected under
+            # high load and is counted by the flow monitor, not treated as an error
+            self.message_queue.put(message_data)
+            self.circuit_breaker.record_success()
                 
         except Exception as e:
             self.circuit_breaker.record_error()
             logging.error(f"Critical error in message reception: {e}")
         
-    def check_for_dtcs(self, message_data):
-        """Check if message contains DTC information"""
-        # Simple DTC detection - this would be enhanced based on specific protocol
-        data_hex = message_data['data'].hex().upper()
-        
-        # Look for common DTC patterns in data
-        for i in range(0, len(data_hex)-5, 2):
-            possible_dtc = data_hex[i:i+6]  # Typical 3-byte DTC format
+    def check_for_dtcs(self, message_data, isotp=None):
+        """Decode DTCs from UDS responses on diagnostic IDs (called for every received frame)"""
+        isotp = isotp or self.isotp
+        if not isotp.is_diagnostic_id(message_data['can_id']):
+            if self.heuristic_dtc_scan:
+                self._scan_payload_for_dtcs(message_data)
+            return
+            
+        with self._diagnostic_lock:
+            pdu = isotp.feed(
+                message_data.get('channel'), message_data['can_id'], message_data['data'],
+                message_data['timestamp'].timestamp()
+            )
+        if pdu is None:
+            return
             
-            dtc_info = self.cdd_parser.get_dtc_info(possible_dtc)
-            if dtc_info:
-                self.dtc_count += 1
-                self.dtc_count_label.setText(f"DTCs: {self.dtc_count}")
+        response = self.uds_decoder.decode_pdu(pdu)
+        if not response:
+            return
+            
+        for dtc in response.get('dtcs', []):
+            if dtc['info']:
+                self._record_dtc(message_data, dtc['info'], dtc['status'], ecu=hex(pdu['tx_id']))
+                
+        for did in response.get('dids', []):
+            if did['values']:
+                self._show_did_values(message_data, did)
+        if response.get('undecoded'):
+            timestamp = message_data['timestamp'].strftime("%H:%M:%S.%f")[:-3]
+            self._diagnostic_text.emit(f"{timestamp} DID data not decoded: {response['undecoded'].hex()}")
                 
-                dtc_line = f"{message_data['timestamp']} DTC: {dtc_info['code']} - {dtc_info['name']}"
-                self.dtc_text.append(dtc_line)
+    def _show_did_values(self, message_data, did):
+        """Show the decoded values of one DID from a ReadDataByIdentifier response"""
+        timestamp = message_data['timestamp'].strftime("%H:%M:%S.%f")[:-3]
+        did_line = f"{timestamp} DID {did['info']['name']} (0x{did['did']:04X}):"
+        for name, value in did['values'].items():
+            did_line += f" {name}={value}"
+        # May run on the capture thread; the widget is updated on the GUI thread
+        self._diagnostic_text.emit(did_line)
+    
+    def _append_decoded_text(self, text):
+        self.decoded_text.append(text)
+                
+    def _scan_payload_for_dtcs(self, message_data):
+        """Heuristic search for known DTC codes anywhere in the payload"""
+        matcher = self.cdd_parser.get_dtc_matcher()
+        for _, dtc_info in matcher.scan_bytes(message_data['data']):
+            self._record_dtc(message_data, dtc_info)
                 
-                # Log DTC
-                dtc_data = {
-                    'timestamp': message_data['timestamp'],
-                    'dtc_code': dtc_info['code'],
-                    'dtc_name': dtc_info['name'],
-                    'description': dtc_info.get('description', ''),
-                    'severity': dtc_info.get('severity', '')
-                }
-                self.data_logger.log_dtc(dtc_data)
+    def _record_dtc(self, message_data, dtc_info, status=None, ecu=None):
+        """Count one detected DTC; display and database are updated by timers"""
+        ecu = ecu or hex(message_data['can_id'])
+        sequence = message_data.get('sequence')
+        if sequence is not None:
+            # A frame replayed after a CDD load must not count its DTCs again
+            key = (sequence, ecu, dtc_info.get('code'))
+            with self._diagnostic_lock:
+                if key in self._recorded_dtcs:
+                    return
+                self._recorded_dtcs[key] = None
+                if len(self._recorded_dtcs) > self.max_recorded_dtcs:
+                    del self._recorded_dtcs[next(iter(self._recorded_dtcs))]
+        self.dtc_tracker.record(ecu, dtc_info, status, message_data['timestamp'])
+        
+    def _refresh_dtc_view(self):
+        """Show DTCs that are new or changed status since the last refresh"""
+        changes = self.dtc_tracker.take_display_changes()
+        if self.dtc_count != self.dtc_tracker.total_occurrences:
+            self.dtc_count = self.dtc_tracker.total_occurrences
+            self.dtc_count_label.setText(f"DTCs: {self.dtc_count}")
+        if not changes:
+            return
+            
+        lines = []
+        for state in changes:
+            dtc_line = f"{state.last_seen} {state.ecu} DTC: {state.code} - {state.name}"
+            if state.status is not None:
+                dtc_line += f" (status 0x{state.status:02X})"
+            lines.append(dtc_line)
+        self.dtc_text.append("\n".join(lines))
+        
+    def _flush_dtcs_async(self):
+        """Write changed DTC states to the database in a background thread"""
+        import threading
+        
+        if not self.dtc_tracker.has_pending():
+            return
+        thread = threading.Thread(target=self.dtc_tracker.flush, daemon=True)
+        thread.start()
                 
     def on_error_occurred(self, error_message):
         self.status_label.setText(f"Error: {error_message}")
@@ -1346,8 +1599,7 @@ class MainWindow(QMainWindow):
         current_time = time.time()
         
         # Calculate message rate
-        self.message_timestamps = [ts for ts in self.message_timestamps if current_time - ts < 2]
-        message_rate = len(self.message_timestamps) / 2.0
+        message_rate = self.message_statistics.total_rate(current_time)
         
         # Update traffic light with circuit breaker status
         if self.circuit_breaker.is_open:
@@ -1370,6 +1622,9 @@ class MainWindow(QMainWindow):
                 status += " - ⚠️ CIRCUIT BREAKER OPEN"
             self.channel_activity_label.setText(status)
         
+        # One summary line for frames dropped anywhere in the pipeline
+        self.flow.log_summary()
+        
         # Update statistics
         self.update_statistics()
     
@@ -1380,6 +1635,7 @@ class MainWindow(QMainWindow):
         self.message_list.clear()
         self.message_count = 0
         self.dtc_count = 0
+        self.dtc_tracker.clear()
         self.message_count_label.setText("Messages: 0")
         self.dtc_count_label.setText("DTCs: 0")
         
@@ -1398,4 +1654,14 @@ class MainWindow(QMainWindow):
                 f.write(f"Total Messages: {self.message_count}\n")
                 f.write(f"Total DTCs: {self.dtc_count}\n")
                 
+                snapshot = self.message_statistics.snapshot()
+                f.write("\nCAN ID,Count,Rate (msg/s),Mean Period (ms),Min Period (ms),Max Period (ms),"
+                        "Jitter (ms),DLC Changes,Payload Changes\n")
+                for can_id, entry in sorted(snapshot['ids'].items()):
+                    periods = [entry[key] * 1000 if entry[key] is not None else 0.0
+                               for key in ('mean_period', 'min_period', 'max_period')]
+                    f.write(f"{hex(can_id)},{entry['count']},{entry['rate']:.2f},"
+                            + ",".join(f"{period:.3f}" for period in periods)
+                            + f",{entry['jitter'] * 1000:.3f},{entry['dlc_changes']},{entry['payload_changes']}\n")
+                
             QMessageBox.information(self, "Success", f"Report exported to {filename}")
\ No newline at end of file
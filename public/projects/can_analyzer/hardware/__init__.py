@@ -4,5 +4,8 @@ Hardware interface modules for CAN Analyzer
 
 from .vector_interface import VectorCANInterface
 from .can_detector import CANDetector, HardwareInfo
+from .async_capture import AsyncCapture, frame_from_can_message
+from .flow_control import FlowMonitor, FlowStage
 
-__all__ = ['VectorCANInterface', 'CANDetector', 'HardwareInfo']
\ No newline at end of file
+__all__ = ['VectorCANInterface', 'CANDetector', 'HardwareInfo', 'AsyncCapture', 'frame_from_can_message',
+           'FlowMonitor', 'FlowStage']
\ No newline at end of file
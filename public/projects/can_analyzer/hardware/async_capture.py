@@ -0,0 +1,182 @@
+import asyncio
+import functools
+from datetime import datetime
+from typing import Dict, List, Optional, Any, AsyncIterator, Callable
+import logging
+
+import can
+
+from .flow_control import FlowMonitor
+
+
+def frame_from_can_message(message: can.Message, channel: int) -> Dict[str, Any]:
+    """Convert a python-can message into the analyzer's message dict"""
+    return {
+        'timestamp': datetime.fromtimestamp(message.timestamp) if message.timestamp else datetime.now(),
+        'can_id': message.arbitration_id,
+        'data': bytes(message.data),
+        'dlc': message.dlc,
+        'channel': channel,
+        'is_rx': getattr(message, 'is_rx', True),
+        'is_extended': message.is_extended_id
+    }
+
+
+class AsyncCapture:
+    """Capture from one or more python-can buses on an asyncio event loop.
+
+    Each bus gets a python-can Notifier bound to the running loop: buses
+    with a file descriptor (socketcan) are read by the loop itself, others
+    by a blocking receive thread that hands frames to the loop, so there
+    is no polling delay either way. Every consumer (frames(), batches(),
+    run()) has its own queue; a consumer that falls behind loses frames,
+    which are counted in dropped_count, instead of stalling the others.
+    Error frames are not passed on; they are counted by the FlowMonitor.
+
+        async with AsyncCapture({0: bus}) as capture:
+            async for batch in capture.batches():
+                ...
+    """
+
+    def __init__(self, buses: Optional[Dict[int, can.BusABC]] = None, max_queue: int = 10000,
+                 flow: Optional[FlowMonitor] = None):
+        self.logger = logging.getLogger(__name__)
+        self.flow = flow or FlowMonitor()
+        self.buses: Dict[int, can.BusABC] = dict(buses or {})
+        self.max_queue = max_queue
+        self.notifiers: List[can.Notifier] = []
+        self.handlers: List[Callable] = []
+        self.sinks: List[Callable] = []
+        self.frame_count = 0
+        self.dropped_count = 0
+        self._queues: List[asyncio.Queue] = []
+        self._running = False
+        self._stopped = False  # Consumers end once their queue is drained after stop()
+
+    def add_bus(self, channel: int, bus: can.BusABC):
+        """Add a bus before start()"""
+        self.buses[channel] = bus
+
+    def add_handler(self, handler: Callable):
+        """Per-frame handler for run(); coroutine functions are awaited"""
+        self.handlers.append(handler)
+
+    def add_sink(self, sink: Callable):
+        """Batch consumer for run(), e.g. DataLoggerSink or StreamSink(host, port, capture.flow); coroutines are awaited"""
+        self.sinks.append(sink)
+
+    async def start(self):
+        if self._running:
+            return
+        loop = asyncio.get_running_loop()
+        for channel, bus in self.buses.items():
+            listener = functools.partial(self._on_message, channel)
+            self.notifiers.append(can.Notifier(bus, [listener], timeout=0.5, loop=loop))
+        self._running = True
+        self._stopped = False
+        self.logger.info(f"Async capture started on {len(self.buses)} channel(s)")
+
+    async def stop(self):
+        self._running = False
+        self._stopped = True
+        for notifier in self.notifiers:
+            # Joins the receive threads, so keep it off the loop
+            await asyncio.get_running_loop().run_in_executor(None, notifier.stop)
+        self.notifiers = []
+        for queue in self._queues:
+            if queue.full():
+                # A slow consumer still has to see the end marker
+                queue.get_nowait()
+                self.dropped_count += 1
+                self.flow.record_drop('async_consumer', 'queue_full')
+            queue.put_nowait(None)
+        self.logger.info("Async capture stopped")
+
+    async def __aenter__(self) -> 'AsyncCapture':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def _on_message(self, channel: int, message: can.Message):
+        """Runs on the event loop for every received frame"""
+        if message.is_error_frame:
+            self.flow.record_drop('async_capture', 'error_frame')
+            return
+        self.frame_count += 1
+        message_data = frame_from_can_message(message, channel)
+        for queue in self._queues:
+            try:
+                queue.put_nowait(message_data)
+            except asyncio.QueueFull:
+                self.dropped_count += 1
+                self.flow.record_drop('async_consumer', 'queue_full')
+
+    async def frames(self) -> AsyncIterator[Dict[str, Any]]:
+        """Received frames one at a time, until stop()"""
+        async for batch in self.batches(max_size=1, max_delay=0):
+            yield batch[0]
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.frames()
+
+    async def batches(self, max_size: int = 256, max_delay: float = 0.01) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Received frames in lists, until stop().
+
+        A batch is returned as soon as max_size frames are queued, or
+        max_delay seconds after its first frame arrived. Consumers started
+        before start() wait for it; after stop() they end at once.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._queues.append(queue)
+        loop = asyncio.get_running_loop()
+        try:
+            while not self._stopped or not queue.empty():
+                first = await queue.get()
+                if first is None:
+                    break
+                batch = [first]
+                deadline = loop.time() + max_delay
+                while len(batch) < max_size:
+                    if queue.empty():
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            message_data = await asyncio.wait_for(queue.get(), remaining)
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        message_data = queue.get_nowait()
+                    if message_data is None:
+                        yield batch
+                        return
+                    batch.append(message_data)
+                yield batch
+        finally:
+            self._queues.remove(queue)
+
+    async def run(self, max_size: int = 256, max_delay: float = 0.01):
+        """Feed handlers and sinks until stop()"""
+        async for batch in self.batches(max_size, max_delay):
+            for message_data in batch:
+                for handler in self.handlers:
+                    try:
+                        result = handler(message_data)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception as e:
+                        self.logger.error(f"Error in async handler: {e}")
+            for sink in self.sinks:
+                try:
+                    result = sink(batch)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    self.logger.error(f"Error in async sink: {e}")
+
+    async def send(self, channel: int, can_id: int, data: bytes, is_extended: bool = False):
+        """Transmit a frame on one of the buses"""
+        message = can.Message(arbitration_id=can_id, data=data, is_extended_id=is_extended)
+        await asyncio.get_running_loop().run_in_executor(None, self.buses[channel].send, message)
@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+from typing import Dict, Optional, Any
+import logging
+
+# What a full stage does with a new item
+POLICY_BLOCK = 'block'              # Wait for space (backpressure), drop after block_timeout
+POLICY_DROP_NEWEST = 'drop_newest'  # Reject the new item
+POLICY_DROP_OLDEST = 'drop_oldest'  # Discard the oldest queued item to make room
+POLICIES = (POLICY_BLOCK, POLICY_DROP_NEWEST, POLICY_DROP_OLDEST)
+
+SUMMARY_INTERVAL = 10.0  # Seconds between drop summaries in the log
+
+
+class FlowStage:
+    """Bounded queue of one pipeline stage with an overflow policy.
+
+    Drops are counted on the owning FlowMonitor by stage and reason and
+    never logged one by one. Supports the queue.Queue methods the stages
+    use (get, get_nowait, task_done, join, empty, qsize).
+    """
+
+    def __init__(self, monitor: 'FlowMonitor', name: str, capacity: int,
+                 policy: str = POLICY_DROP_NEWEST, block_timeout: Optional[float] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown flow control policy: {policy}")
+        self.monitor = monitor
+        self.name = name
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.queue = queue.Queue(maxsize=capacity)
+        self.passed = 0
+        self.high_watermark = 0
+
+    def put(self, item: Any) -> bool:
+        """Queue an item according to the policy; returns False if it was dropped"""
+        stage_queue = self.queue
+        try:
+            if self.policy == POLICY_BLOCK:
+                stage_queue.put(item, timeout=self.block_timeout)
+            else:
+                stage_queue.put_nowait(item)
+        except queue.Full:
+            if self.policy != POLICY_DROP_OLDEST:
+                self.monitor.record_drop(self.name, 'timeout' if self.policy == POLICY_BLOCK else 'queue_full')
+                return False
+            if not self._make_room(item):
+                return False
+
+        self.passed += 1
+        size = stage_queue.qsize()
+        if size > self.high_watermark:
+            self.high_watermark = size
+        return True
+
+    def _make_room(self, item: Any) -> bool:
+        """Evict queued items until the new one fits (another producer may refill the gap)"""
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.monitor.record_drop(self.name, 'evicted')
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                continue
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        return self.queue.get(block, timeout)
+
+    def get_nowait(self) -> Any:
+        return self.queue.get_nowait()
+
+    def task_done(self):
+        self.queue.task_done()
+
+    def join(self):
+        self.queue.join()
+
+    def empty(self) -> bool:
+        return self.queue.empty()
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def clear(self) -> int:
+        """Discard everything queued, counted as drops; returns the number discarded"""
+        cleared = 0
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                cleared += 1
+            except queue.Empty:
+                break
+        if cleared:
+            self.monitor.record_drop(self.name, 'cleared', cleared)
+        return cleared
+
+
+class FlowMonitor:
+    """Drop accounting for every stage a frame passes, from capture to display.
+
+    Queue stages are created with stage(); places that discard frames
+    without a queue (rate limits, circuit breakers, display sampling)
+    report them with record_drop(). log_summary() writes one line for all
+    drops since its last run, at most every SUMMARY_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.stages: Dict[str, FlowStage] = {}
+        self.drops: Dict[str, Dict[str, int]] = {}
+        self._logged_total = 0
+        self._last_summary = 0.0
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, capacity: int, policy: str = POLICY_DROP_NEWEST,
+              block_timeout: Optional[float] = None) -> FlowStage:
+        """Create (or replace) the bounded queue of a stage"""
+        flow_stage = FlowStage(self, name, capacity, policy, block_timeout)
+        self.stages[name] = flow_stage
+        return flow_stage
+
+    def record_drop(self, stage: str, reason: str, count: int = 1):
+        with self._lock:
+            reasons = self.drops.setdefault(stage, {})
+            reasons[reason] = reasons.get(reason, 0) + count
+
+    def total_dropped(self) -> int:
+        with self._lock:
+            return sum(sum(reasons.values()) for reasons in self.drops.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage queue state and drop counts by reason"""
+        with self._lock:
+            drops = {stage: dict(reasons) for stage, reasons in self.drops.items()}
+        result = {}
+        for name in set(self.stages) | set(drops):
+            flow_stage = self.stages.get(name)
+            result[name] = {
+                'capacity': flow_stage.capacity if flow_stage else None,
+                'policy': flow_stage.policy if flow_stage else None,
+                'queued': flow_stage.qsize() if flow_stage else 0,
+                'high_watermark': flow_stage.high_watermark if flow_stage else 0,
+                'passed': flow_stage.passed if flow_stage else 0,
+                'dropped': drops.get(name, {})
+            }
+        return result
+
+    def log_summary(self, force: bool = False):
+        """Log new drops as one summary line, rate limited"""
+        now = time.time()
+        if not force and now - self._last_summary < SUMMARY_INTERVAL:
+            return
+        total = self.total_dropped()
+        if total == self._logged_total:
+            return
+        self._last_summary = now
+        self._logged_total = total
+        with self._lock:
+            details = ", ".join(f"{stage}/{reason}={count}" for stage, reasons in sorted(self.drops.items())
+                                for reason, count in sorted(reasons.items()))
+        self.logger.warning(f"Frames dropped so far: {total} ({details})")
+
+    def reset(self):
+        with self._lock:
+            self.drops = {}
+        self._logged_total = 0
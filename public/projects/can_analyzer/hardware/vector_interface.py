@@ -7,8 +7,11 @@ from datetime import datetime
 from typing import Dict, List, Optional, Callable
 import logging
 
+from .flow_control import FlowMonitor, POLICY_DROP_NEWEST
+
 class VectorCANInterface:
-    def __init__(self):
+    def __init__(self, flow: Optional[FlowMonitor] = None, buffer_size: int = 10000,
+                 buffer_policy: str = POLICY_DROP_NEWEST):
         self.logger = logging.getLogger(__name__)
         self.bus = None
         self.is_running = False
@@ -18,10 +21,11 @@ class VectorCANInterface:
         self.message_count = 0
         self.error_count = 0
         
-        # Add message buffer and rate limiting
-        self.message_buffer = queue.Queue(maxsize=10000)  # Buffer up to 10,000 messages
+        # Bounded capture buffer; overflow is counted per stage by the flow monitor
+        self.flow = flow or FlowMonitor()
+        self.message_buffer = self.flow.stage('capture_buffer', buffer_size, buffer_policy)
         self.buffer_thread = None
-        self.max_messages_per_second = 1000  # Rate limit
+        self.max_messages_per_second = None  # Optional rate limit (None = off)
         self.last_message_time = time.time()
         
     def detect_available_interfaces(self) -> List[Dict]:
@@ -141,19 +145,16 @@ class VectorCANInterface:
             try:
                 message = self.bus.recv(timeout=0.01)  # Shorter timeout for responsiveness
                 if message:
-                    # Apply rate limiting
-                    current_time = time.time()
-                    if current_time - self.last_message_time < (1.0 / self.max_messages_per_second):
-                        continue  # Skip message if we're over rate limit
-                    
-                    self.last_message_time = current_time
+                    # Optional rate limiting
+                    if self.max_messages_per_second:
+                        current_time = time.time()
+                        if current_time - self.last_message_time < (1.0 / self.max_messages_per_second):
+                            self.flow.record_drop('capture', 'rate_limit')
+                            continue
+                        self.last_message_time = current_time
                     
-                    # Non-blocking put with timeout
-                    try:
-                        self.message_buffer.put(message, timeout=0.001)
-                    except queue.Full:
-                        self.error_count += 1
-                        self.logger.warning("Message buffer full, dropping message")
+                    # The buffer applies its overflow policy and counts drops
+                    self.message_buffer.put(message)
                         
             except Exception as e:
                 self.logger.error(f"Error in capture loop: {e}")
@@ -191,6 +192,8 @@ class VectorCANInterface:
                 message_data['is_rx'] = message.is_rx
             else:
                 message_data['is_rx'] = True  # Default to RX
+            if getattr(message, 'is_error_frame', False):
+                message_data['is_error_frame'] = True
                 
             self.message_count += 1
             
@@ -217,6 +220,7 @@ class VectorCANInterface:
                     'can_id': message.arbitration_id,
                     'data': message.data,
                     'dlc': message.dlc,
+                    'channel': self.channel_info.get('channel', 0),
                     'is_rx': not getattr(message, 'is_tx', False)  # Better TX/RX detection
                 }
             return None
@@ -246,6 +250,16 @@ class VectorCANInterface:
         except Exception as e:
             self.logger.error(f"Failed to send message: {e}")
     
+    def create_async_capture(self, max_queue: int = 10000):
+        """AsyncCapture on the initialized bus, for use instead of start_capture()"""
+        from .async_capture import AsyncCapture
+        
+        if not self.bus:
+            raise RuntimeError("CAN interface not initialized")
+        if self.is_running:
+            raise RuntimeError("Threaded capture is running on this bus")
+        return AsyncCapture({self.channel_info.get('channel', 0): self.bus}, max_queue, self.flow)
+    
     def add_message_callback(self, callback: Callable):
         """Add callback for received messages"""
         self.message_callbacks.append(callback)
@@ -268,6 +282,7 @@ class VectorCANInterface:
             'is_capturing': self.is_running,
             'message_count': self.message_count,
             'error_count': self.error_count,
+            'dropped_count': self.flow.total_dropped(),
             'channel_info': self.channel_info,
             'timestamp': datetime.now()
         }
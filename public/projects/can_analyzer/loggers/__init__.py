@@ -4,5 +4,8 @@ Logging and reporting modules for CAN Analyzer
 
 from .data_logger import DataLogger
 from .report_generator import ReportGenerator, ReportFormat
+from .dtc_tracker import DTCTracker, DTCState
+from .async_sinks import DataLoggerSink, StreamSink
 
-__all__ = ['DataLogger', 'ReportGenerator', 'ReportFormat']
\ No newline at end of file
+__all__ = ['DataLogger', 'ReportGenerator', 'ReportFormat', 'DTCTracker', 'DTCState',
+           'DataLoggerSink', 'StreamSink']
\ No newline at end of file
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Any
+import logging
+
+
+class DataLoggerSink:
+    """Async batch sink writing frames to a DataLogger.
+
+    sqlite calls block, so each batch is written in one transaction on the
+    default executor, in arrival order.
+    """
+
+    def __init__(self, data_logger):
+        self.logger = logging.getLogger(__name__)
+        self.data_logger = data_logger
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, batch: List[Dict[str, Any]]):
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(None, self.data_logger.log_messages_batch, batch)
+
+
+class StreamSink:
+    """Async batch sink streaming frames as JSON lines over TCP.
+
+    Connects on the first batch and again after a failure, waiting
+    min_backoff seconds after the first failure and twice as long after
+    each further one, up to max_backoff. Batches that arrive while the peer
+    is unreachable are dropped, counted in dropped_count and reported to
+    the FlowMonitor (stage 'stream_sink') when one is given. An outage is
+    logged once when it starts and once when the stream is back.
+    """
+
+    def __init__(self, host: str, port: int, flow=None,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.logger = logging.getLogger(__name__)
+        self.host = host
+        self.port = port
+        self.flow = flow
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.sent_count = 0
+        self.dropped_count = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._outage_dropped = 0  # Frames lost since the current outage began
+
+    async def __call__(self, batch: List[Dict[str, Any]]):
+        if self.writer is None and time.monotonic() < self._retry_at:
+            self._drop(batch, 'disconnected')
+            return
+        try:
+            if self.writer is None:
+                _, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(''.join(self._encode(message_data) for message_data in batch).encode('utf-8'))
+            # Waits while the peer is slow, which slows down this consumer only
+            await self.writer.drain()
+            self.sent_count += len(batch)
+            if self._backoff:
+                self.logger.info(f"Stream to {self.host}:{self.port} restored, "
+                                 f"{self._outage_dropped} frames were lost")
+                self._backoff = 0.0
+                self._outage_dropped = 0
+        except (OSError, ConnectionError) as e:
+            if not self._backoff:
+                self.logger.warning(f"Stream to {self.host}:{self.port} failed: {e}; dropping frames until it is back")
+            self._backoff = min(self.max_backoff, self._backoff * 2 or self.min_backoff)
+            self._retry_at = time.monotonic() + self._backoff
+            self._drop(batch, 'send_failed')
+            await self.close()
+
+    def _drop(self, batch: List[Dict[str, Any]], reason: str):
+        self.dropped_count += len(batch)
+        self._outage_dropped += len(batch)
+        if self.flow is not None:
+            self.flow.record_drop('stream_sink', reason, len(batch))
+
+    def _encode(self, message_data: Dict[str, Any]) -> str:
+        return json.dumps({
+            'timestamp': message_data['timestamp'].isoformat(),
+            'can_id': message_data['can_id'],
+            'data': message_data['data'].hex(),
+            'channel': message_data.get('channel'),
+            'is_rx': message_data.get('is_rx', True),
+            'message_name': message_data.get('message_name'),
+            'signals': {name: value if isinstance(value, (int, float)) else str(value)
+                        for name, value in (message_data.get('decoded_signals') or {}).items()}
+        }) + '\n'
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (OSError, ConnectionError):
+                pass
+            self.writer = None
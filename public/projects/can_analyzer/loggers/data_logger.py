@@ -1,15 +1,30 @@
 import csv
+import functools
 import json
 import sqlite3
+import threading
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
 import sqlite3
 
+
+def _serialized(method):
+    """Run a DataLogger write method under its write lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class DataLogger:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.connection = None
+        # The connection is shared by the logging, DTC flush and trigger writer threads:
+        # one writer at a time, so no thread commits or rolls back another one's rows
+        self._write_lock = threading.Lock()
         self.setup_database()
         
     def setup_database(self):
@@ -44,6 +59,35 @@ class DataLogger:
                     severity TEXT
                 )
             ''')
+            self._migrate_dtcs_table(cursor)
+            
+            # Windows recorded around trigger conditions
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trigger_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    trigger_name TEXT,
+                    condition TEXT,
+                    trigger_time DATETIME,
+                    start_time DATETIME,
+                    end_time DATETIME,
+                    frame_count INTEGER,
+                    retriggers INTEGER
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trigger_frames (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id INTEGER REFERENCES trigger_events(id),
+                    timestamp DATETIME,
+                    can_id INTEGER,
+                    data BLOB,
+                    dlc INTEGER,
+                    is_rx BOOLEAN,
+                    channel INTEGER,
+                    message_name TEXT,
+                    decoded_data TEXT
+                )
+            ''')
             
             self.connection.commit()
             self.logger.info("Database setup completed")
@@ -51,11 +95,20 @@ class DataLogger:
         except Exception as e:
             self.logger.error(f"Failed to setup database: {e}")
     
+    def _migrate_dtcs_table(self, cursor):
+        """Add the aggregated DTC state columns to databases created before they existed"""
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(dtcs)')}
+        for column, column_type in (('ecu', 'TEXT'), ('status', 'INTEGER'), ('first_seen', 'DATETIME'),
+                                    ('last_seen', 'DATETIME'), ('occurrence_count', 'INTEGER')):
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE dtcs ADD COLUMN {column} {column_type}')
+    
+    @_serialized
     def log_message(self, message_data: Dict[str, Any]):
         try:
             # Convert datetime to string for SQLite
             timestamp_str = message_data['timestamp'].strftime('%Y-%m-%d %H:%M:%S.%f')
-            
+        
             cursor = self.connection.cursor()
             cursor.execute('''
                 INSERT INTO can_messages 
@@ -73,41 +126,44 @@ class DataLogger:
             ))
             self.connection.commit()
         except Exception as e:
+            self.connection.rollback()
             self.logger.error(f"Failed to log message: {e}")
             raise  # Re-raise to see the actual error
     
+    @_serialized
     def log_messages_batch(self, messages_data: List[Dict[str, Any]]):
         if not messages_data:
             return
-            
+        
         try:
             cursor = self.connection.cursor()
             cursor.execute('BEGIN TRANSACTION')
-            
+        
             for message_data in messages_data:
-                timestamp_str = message_data['timestamp'].strftime('%Y-%m-%d %H:%M:%S.%f')  # ADD THIS
-                
+                timestamp_str = message_data['timestamp'].strftime('%Y-%m-%d %H:%M:%S.%f')
+            
                 cursor.execute('''
                     INSERT INTO can_messages 
                     (timestamp, can_id, data, dlc, is_rx, channel, message_name, decoded_data)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
-                    timestamp_str,  # USE THE CONVERTED STRING
+                    timestamp_str,
                     message_data['can_id'],
-                    sqlite3.Binary(message_data['data']),  # Also add Binary here
+                    sqlite3.Binary(message_data['data']),
                     message_data['dlc'],
                     message_data.get('is_rx', True),
                     message_data.get('channel', 0),
                     message_data.get('message_name', ''),
                     json.dumps(message_data.get('decoded_data', {}))
                 ))
-            
+        
             self.connection.commit()
-            
+        
         except Exception as e:
             self.connection.rollback()
             self.logger.error(f"Failed to log message batch: {e}")
     
+    @_serialized
     def log_dtc(self, dtc_data: Dict[str, Any]):
         """Log DTC to database"""
         try:
@@ -125,35 +181,150 @@ class DataLogger:
             ))
             self.connection.commit()
         except Exception as e:
+            self.connection.rollback()
             self.logger.error(f"Failed to log DTC: {e}")
     
-    def generate_report(self, start_time: datetime, end_time: datetime, format: str = 'csv') -> str:
-        """Generate comprehensive report"""
+    @_serialized
+    def save_dtc_states(self, states: List[Dict[str, Any]]) -> Optional[List[int]]:
+        """Insert or update aggregated DTC states in one transaction; returns their row ids"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN TRANSACTION')
+            row_ids = []
+            for state in states:
+                first_seen = state['first_seen'].strftime('%Y-%m-%d %H:%M:%S.%f')
+                last_seen = state['last_seen'].strftime('%Y-%m-%d %H:%M:%S.%f')
+                if state.get('row_id') is None:
+                    cursor.execute('''
+                        INSERT INTO dtcs
+                        (timestamp, dtc_code, dtc_name, description, severity,
+                         ecu, status, first_seen, last_seen, occurrence_count)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        first_seen,
+                        state['dtc_code'],
+                        state['dtc_name'],
+                        state.get('description', ''),
+                        state.get('severity', ''),
+                        state['ecu'],
+                        state.get('status'),
+                        first_seen,
+                        last_seen,
+                        state['occurrence_count']
+                    ))
+                    row_ids.append(cursor.lastrowid)
+                else:
+                    cursor.execute('''
+                        UPDATE dtcs SET status = ?, last_seen = ?, occurrence_count = ?
+                        WHERE id = ?
+                    ''', (state.get('status'), last_seen, state['occurrence_count'], state['row_id']))
+                    row_ids.append(state['row_id'])
+        
+            self.connection.commit()
+            return row_ids
+        
+        except Exception as e:
+            self.connection.rollback()
+            self.logger.error(f"Failed to save DTC states: {e}")
+            return None
+    
+    @_serialized
+    def log_trigger_event(self, event) -> Optional[int]:
+        """Store a TriggerEvent and its frames in one transaction; returns the event id"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN TRANSACTION')
+            cursor.execute('''
+                INSERT INTO trigger_events
+                (trigger_name, condition, trigger_time, start_time, end_time, frame_count, retriggers)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                event.trigger,
+                event.condition,
+                event.trigger_time.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                event.start_time.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                event.end_time.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                len(event.frames),
+                event.retriggers
+            ))
+            event_id = cursor.lastrowid
+        
+            cursor.executemany('''
+                INSERT INTO trigger_frames
+                (event_id, timestamp, can_id, data, dlc, is_rx, channel, message_name, decoded_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                event_id,
+                message_data['timestamp'].strftime('%Y-%m-%d %H:%M:%S.%f'),
+                message_data['can_id'],
+                sqlite3.Binary(message_data['data']),
+                message_data.get('dlc', len(message_data['data'])),
+                message_data.get('is_rx', True),
+                message_data.get('channel', 0),
+                message_data.get('message_name', ''),
+                json.dumps(message_data.get('decoded_signals') or {}, default=str)
+            ) for message_data in event.frames])
+        
+            self.connection.commit()
+            return event_id
+        
+        except Exception as e:
+            self.connection.rollback()
+            self.logger.error(f"Failed to log trigger event: {e}")
+            return None
+    
+    def _row_selected(self, selection, row) -> bool:
+        """Evaluate a compiled filter expression against a can_messages row"""
+        if selection.id_predicate is not None and not selection.id_predicate(row[1]):
+            return False
+        return selection.match({
+            'can_id': row[1],
+            'message_name': row[2] or None,
+            'is_rx': bool(row[3]),
+            'data': bytes(row[4] or b''),
+            'decoded_signals': json.loads(row[5]) if row[5] else {},
+            'channel': row[6]
+        })
+    
+    def generate_report(self, start_time: datetime, end_time: datetime, format: str = 'csv',
+                        filter_expression: Optional[str] = None) -> str:
+        """Generate comprehensive report, optionally only for messages matching a filter expression"""
+        if filter_expression and format != 'csv':
+            self.logger.error(f"Filter expressions are only supported for CSV reports, not {format}")
+            return ""
         if format == 'csv':
-            return self._generate_csv_report(start_time, end_time)
+            return self._generate_csv_report(start_time, end_time, filter_expression)
         elif format == 'html':
             return self._generate_html_report(start_time, end_time)
         else:
             return self._generate_text_report(start_time, end_time)
     
-    def _generate_csv_report(self, start_time: datetime, end_time: datetime) -> str:
+    def _generate_csv_report(self, start_time: datetime, end_time: datetime,
+                             filter_expression: Optional[str] = None) -> str:
         """Generate CSV report"""
         filename = f"can_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
         try:
+            selection = None
+            if filter_expression:
+                from parsers.filter_expression import compile_filter
+                selection = compile_filter(filter_expression)
+                
             with open(filename, 'w', newline='') as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow(['Timestamp', 'CAN ID', 'Message Name', 'Direction', 'Data', 'Decoded Signals'])
                 
                 cursor = self.connection.cursor()
                 cursor.execute('''
-                    SELECT timestamp, can_id, message_name, is_rx, data, decoded_data
+                    SELECT timestamp, can_id, message_name, is_rx, data, decoded_data, channel
                     FROM can_messages 
                     WHERE timestamp BETWEEN ? AND ?
                     ORDER BY timestamp
                 ''', (start_time, end_time))
                 
                 for row in cursor.fetchall():
+                    if selection is not None and not self._row_selected(selection, row):
+                        continue
                     writer.writerow([
                         row[0], row[1], row[2], 
                         'RX' if row[3] else 'TX',
@@ -0,0 +1,121 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+
+@dataclass
+class DTCState:
+    ecu: str
+    code: str
+    name: str
+    description: str
+    severity: str
+    status: Optional[int]
+    first_seen: datetime
+    last_seen: datetime
+    occurrences: int = 1
+    row_id: Optional[int] = None  # dtcs table row once written
+
+
+class DTCTracker:
+    """Aggregates DTC reports per (ECU, code) so storage and display see state changes.
+
+    record() only updates memory. flush() writes every state changed since
+    the previous flush in one transaction, and take_display_changes() hands
+    the UI the DTCs that are new or changed status, so both can run at a
+    fixed rate however often a DTC is reported.
+    """
+
+    def __init__(self, data_logger=None):
+        self.logger = logging.getLogger(__name__)
+        self.data_logger = data_logger
+        self.states: Dict[Tuple[str, str], DTCState] = {}
+        self.total_occurrences = 0
+        self._dirty = set()
+        self._display_changes = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def record(self, ecu: str, dtc_info: Dict[str, Any], status: Optional[int] = None,
+               timestamp: Optional[datetime] = None) -> DTCState:
+        """Count one report of a DTC"""
+        timestamp = timestamp or datetime.now()
+        key = (ecu, dtc_info['code'])
+        with self._lock:
+            self.total_occurrences += 1
+            state = self.states.get(key)
+            if state is None:
+                state = DTCState(ecu, dtc_info['code'], dtc_info.get('name', ''),
+                                 dtc_info.get('description', ''), dtc_info.get('severity', ''),
+                                 status, timestamp, timestamp)
+                self.states[key] = state
+                self._display_changes.append(state)
+            else:
+                state.occurrences += 1
+                state.last_seen = timestamp
+                if status is not None and status != state.status:
+                    state.status = status
+                    self._display_changes.append(state)
+            self._dirty.add(key)
+        return state
+
+    def take_display_changes(self) -> List[DTCState]:
+        """DTCs that appeared or changed status since the previous call"""
+        with self._lock:
+            changes, self._display_changes = self._display_changes, []
+        return changes
+
+    def has_pending(self) -> bool:
+        """True when states changed since the previous flush"""
+        return bool(self._dirty)
+
+    def flush(self) -> int:
+        """Write changed states to the dtcs table; returns the number written"""
+        if not self.data_logger:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                keys, self._dirty = self._dirty, set()
+                states = [self.states[key] for key in keys if key in self.states]
+                records = [self._to_record(state) for state in states]
+            if not records:
+                return 0
+
+            row_ids = self.data_logger.save_dtc_states(records)
+            with self._lock:
+                if row_ids is None:
+                    # Keep the changes for the next attempt
+                    self._dirty.update(keys)
+                    return 0
+                for state, row_id in zip(states, row_ids):
+                    state.row_id = row_id
+            return len(records)
+
+    def _to_record(self, state: DTCState) -> Dict[str, Any]:
+        return {
+            'row_id': state.row_id,
+            'ecu': state.ecu,
+            'dtc_code': state.code,
+            'dtc_name': state.name,
+            'description': state.description,
+            'severity': state.severity,
+            'status': state.status,
+            'first_seen': state.first_seen,
+            'last_seen': state.last_seen,
+            'occurrence_count': state.occurrences
+        }
+
+    def get_states(self) -> List[DTCState]:
+        """All tracked DTCs, most recently seen first"""
+        with self._lock:
+            return sorted(self.states.values(), key=lambda state: state.last_seen, reverse=True)
+
+    def clear(self):
+        """Forget tracked states (rows already written stay in the database)"""
+        with self._lock:
+            self.states.clear()
+            self._dirty.clear()
+            self._display_changes = []
+            self.total_occurrences = 0
@@ -115,7 +115,7 @@ class ReportGenerator:
         
         # DTC statistics
         cursor.execute('''
-            SELECT COUNT(*) as total_dtcs,
+            SELECT COALESCE(SUM(COALESCE(occurrence_count, 1)), 0) as total_dtcs,
                    COUNT(DISTINCT dtc_code) as unique_dtcs
             FROM dtcs 
             WHERE timestamp BETWEEN ? AND ?
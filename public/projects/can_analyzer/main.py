@@ -2,6 +2,7 @@
 import sys
 import os
 import logging
+import multiprocessing
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -36,4 +37,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
+    # Decode worker processes re-launch the frozen executable on Windows
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -5,5 +5,22 @@ Parsing modules for CAN Analyzer
 from .dbc_parser import DBCParser
 from .cdd_parser import CDDParser
 from .message_processor import MessageProcessor
+from .database_registry import DatabaseRegistry
+from .j1939 import J1939TransportReassembler
+from .isotp import IsoTpReassembler
+from .uds_decoder import UDSDecoder
+from .dtc_matcher import DTCMatcher
+from .uds_client import UDSClient, EcuTarget, EcuTiming
+from .message_store import MessageStore, MessageView
+from .message_statistics import MessageStatistics, IdStatistics
+from .filter_expression import FilterExpression, FilterSyntaxError, compile_filter
+from .handler_dispatch import HandlerDispatcher, Subscription
+from .delta_filter import DeltaFilter
+from .trigger_capture import TriggerCapture, TriggerEvent, Trigger
 
-__all__ = ['DBCParser', 'CDDParser', 'MessageProcessor']
\ No newline at end of file
+__all__ = ['DBCParser', 'CDDParser', 'MessageProcessor', 'DatabaseRegistry',
+           'J1939TransportReassembler', 'IsoTpReassembler', 'UDSDecoder',
+           'DTCMatcher', 'UDSClient', 'EcuTarget', 'EcuTiming', 'MessageStore', 'MessageView',
+           'MessageStatistics', 'IdStatistics', 'FilterExpression', 'FilterSyntaxError',
+           'compile_filter', 'HandlerDispatcher', 'Subscription', 'DeltaFilter',
+           'TriggerCapture', 'TriggerEvent', 'Trigger']
\ No newline at end of file
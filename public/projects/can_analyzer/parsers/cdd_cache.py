@@ -0,0 +1,168 @@
+import hashlib
+import marshal
+import os
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Any, Tuple
+import logging
+
+from .dtc_matcher import is_sae_dtc
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAGIC = b'CDDC'
+CACHE_FORMAT = 3
+# marshal data is only readable by the Python version that wrote it
+CACHE_HEADER = CACHE_MAGIC + bytes([CACHE_FORMAT, sys.version_info[0], sys.version_info[1]])
+HASH_CHUNK_SIZE = 1024 * 1024
+
+DID_FIELDS = ('name', 'id', 'length', 'description', 'data_objects')
+DTC_FIELDS = ('name', 'code', 'description', 'severity')
+
+
+class RecordTable(Mapping):
+    """Read-only string keyed table stored as columns.
+
+    Record dicts are only built when a key is looked up, so a cached CDD
+    with hundreds of thousands of entries is usable as soon as the columns
+    are read.
+    """
+
+    def __init__(self, fields: Tuple[str, ...], keys: Tuple[str, ...], columns: Tuple[Tuple, ...]):
+        self.fields = fields
+        self.keys_column = keys
+        self.columns = columns
+        self._rows = dict(zip(keys, range(len(keys))))
+        self._records: Dict[int, Dict] = {}
+
+    @classmethod
+    def from_records(cls, fields: Tuple[str, ...], records: Mapping) -> 'RecordTable':
+        keys = tuple(records)
+        columns = tuple(tuple(records[key].get(field, '') for key in keys) for field in fields)
+        return cls(fields, keys, columns)
+
+    def __getitem__(self, key: str) -> Dict:
+        row = self._rows[key]
+        record = self._records.get(row)
+        if record is None:
+            record = {field: column[row] for field, column in zip(self.fields, self.columns)}
+            self._records[row] = record
+        return record
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    def __iter__(self):
+        return iter(self.keys_column)
+
+    def __len__(self) -> int:
+        return len(self.keys_column)
+
+
+def number_index(keys, skip_sae: bool = False) -> Dict[int, str]:
+    """Map the numeric value of hex keys (F190, 0x123456) to the key itself"""
+    index = {}
+    for key in keys:
+        # SAE DTC codes (B1234) would otherwise parse as hex
+        if skip_sae and is_sae_dtc(key):
+            continue
+        try:
+            index.setdefault(int(key, 16), key)
+        except ValueError:
+            pass
+    return index
+
+
+@dataclass
+class CDDTables:
+    """DIDs and DTCs of the shared part of a CDD or of one of its variants"""
+    dids: Mapping = field(default_factory=dict)
+    dtcs: Mapping = field(default_factory=dict)
+    dids_by_number: Dict[int, str] = field(default_factory=dict)
+    dtcs_by_number: Dict[int, str] = field(default_factory=dict)
+
+    def build_indexes(self):
+        """Fill the integer keyed tables from the string keys"""
+        self.dids_by_number = number_index(self.dids)
+        self.dtcs_by_number = number_index(self.dtcs, skip_sae=True)
+
+
+def file_hash(path: str) -> str:
+    """Content hash used as the cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_key(source_hash: str, variant: str) -> str:
+    """Cache key of one variant's tables (variant names are not safe file names)"""
+    return f"{source_hash}-{hashlib.blake2b(variant.encode('utf-8'), digest_size=8).hexdigest()}"
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory (LOCALAPPDATA on Windows, XDG_CACHE_HOME or ~/.cache elsewhere)"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'can_analyzer', 'cdd')
+
+
+def cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}.cddc")
+
+
+def _number_columns(numbers: Dict[int, str]) -> Tuple[Tuple[int, ...], Tuple[str, ...]]:
+    return tuple(numbers), tuple(numbers.values())
+
+
+def write_cache(cache_dir: str, key: str, tables: CDDTables,
+                variants: Optional[Dict[str, Any]] = None) -> bool:
+    """Persist parsed CDD tables; written to a temporary file and renamed into place"""
+    try:
+        did_table = RecordTable.from_records(DID_FIELDS, tables.dids)
+        dtc_table = RecordTable.from_records(DTC_FIELDS, tables.dtcs)
+        payload = {
+            'dids': (did_table.fields, did_table.keys_column, did_table.columns),
+            'dtcs': (dtc_table.fields, dtc_table.keys_column, dtc_table.columns),
+            'variants': variants or {},
+            'dids_by_number': _number_columns(tables.dids_by_number),
+            'dtcs_by_number': _number_columns(tables.dtcs_by_number)
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+        target = cache_path(cache_dir, key)
+        temporary = f"{target}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as cache_file:
+            cache_file.write(CACHE_HEADER)
+            marshal.dump(payload, cache_file)
+        os.replace(temporary, target)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not write CDD cache: {e}")
+        return False
+
+
+def read_cache(cache_dir: str, key: str) -> Optional[Tuple[CDDTables, Dict[str, Any]]]:
+    """Load cached tables and variant definitions, or None without a usable entry"""
+    path = cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as cache_file:
+            if cache_file.read(len(CACHE_HEADER)) != CACHE_HEADER:
+                return None
+            payload = marshal.loads(cache_file.read())
+
+        tables = CDDTables(
+            dids=RecordTable(*payload['dids']),
+            dtcs=RecordTable(*payload['dtcs']),
+            dids_by_number=dict(zip(*payload['dids_by_number'])),
+            dtcs_by_number=dict(zip(*payload['dtcs_by_number']))
+        )
+        return tables, payload['variants']
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable CDD cache {path}: {e}")
+        return None
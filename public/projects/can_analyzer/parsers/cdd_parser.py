@@ -1,71 +1,344 @@
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional, Any
+from collections import ChainMap
+from typing import Dict, List, Optional, Any, Callable, Set, Tuple
 import logging
+import os
+import threading
+import time
+
+from .dtc_matcher import DTCMatcher
+from . import cdd_cache
+from .cdd_cache import CDDTables
+from .did_codec import parse_data_objects, compile_did_decoder
+
+PROGRESS_INTERVAL = 5000  # Elements between progress reports
+RECORD_TAGS = {'DATA-IDENTIFIER', 'DTC'}  # Parsed with their children still attached
+DEFAULT_CACHE_DIR = cdd_cache.default_cache_dir()  # Per user, never the working directory
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB, when the platform reports it"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
 
 class CDDParser:
-    def __init__(self):
+    """CDD diagnostic model: shared DIDs/DTCs plus those of the active ECU variant.
+    
+    Only the active variant's tables are held in memory. Other variants are
+    loaded on demand from the parsed model cache, or by streaming the file
+    again, when selected. Identification runs on the decode path, so a
+    variant identified from an ECU's responses is handed to
+    variant_load_callback for a background load, or loaded on a thread of
+    its own when no callback is set.
+    """
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
         self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir  # None disables the parsed model cache
         self.dids = {}
         self.dtcs = {}
         self.variants = {}
+        self.dids_by_number: Dict[int, str] = {}
+        self.dtcs_by_number: Dict[int, str] = {}
+        self.base_tables = CDDTables()
+        self.variant_tables: Optional[CDDTables] = None
+        self.active_variant: Optional[str] = None
+        self.identification_dids: Set[int] = set()
+        self.observed_identification: Dict[int, bytes] = {}
+        self.pending_variant: Optional[str] = None  # Identified, waiting for a background load
+        self.variant_load_callback: Optional[Callable[[str], None]] = None
+        self.source_path = None
+        self.source_hash = None
+        self.load_stats = {}
+        self._rss_peak: Optional[float] = None  # Highest RSS sampled during the current load
+        self._dtc_matcher = None
+        self._did_decoders: Dict[str, Optional[Callable]] = {}
+        self._element_handlers = {
+            'DATA-IDENTIFIER': self._parse_did,
+            'DTC': self._parse_dtc
+        }
         
-    def load_cdd_file(self, cdd_path: str) -> bool:
-        """Load and parse CDD file"""
+    def load_cdd_file(self, cdd_path: str,
+                      progress_callback: Optional[Callable[[int, str], None]] = None,
+                      variant: Optional[str] = None) -> bool:
+        """Load and parse CDD file, optionally reporting (percent, stage) progress.
+        
+        variant selects the ECU variant to activate; a CDD with a single
+        variant activates it automatically.
+        """
         try:
-            tree = ET.parse(cdd_path)
-            root = tree.getroot()
-            
-            # Parse DIDs (Data Identifier)
-            self._parse_dids(root)
+            start = time.perf_counter()
+            rss_start = self._rss_peak = _rss_mb()
+            self._report_progress(progress_callback, 0, "Parsing CDD file")
+            file_size = os.path.getsize(cdd_path) or 1
+            self.source_path = cdd_path
+            self.source_hash = cdd_cache.file_hash(cdd_path) if self.cache_dir else None
+            self.observed_identification = {}
+            self.pending_variant = None
             
-            # Parse DTCs (Diagnostic Trouble Codes)
-            self._parse_dtcs(root)
+            cached = self.source_hash and cdd_cache.read_cache(self.cache_dir, self.source_hash)
+            collected = {}
+            if cached:
+                self.base_tables, self.variants = cached
+            else:
+                self.variants = {}
+                cache_complete = [bool(self.source_hash)]
+                
+                def variant_done(name: str, tables: CDDTables) -> bool:
+                    # Cache each variant as soon as it is parsed and keep only the one
+                    # that gets activated (the first, while it may be the only one)
+                    if cache_complete[0] and not cdd_cache.write_cache(
+                            self.cache_dir, cdd_cache.variant_key(self.source_hash, name), tables):
+                        cache_complete[0] = False
+                    return name == variant or (variant is None and len(self.variants) == 1)
+                    
+                with open(cdd_path, 'rb') as cdd_file:
+                    self.base_tables, collected = self._stream_elements(
+                        cdd_file, file_size, progress_callback, variant_done=variant_done
+                    )
+                if cache_complete[0]:
+                    # The shared tables mark the cache entry complete
+                    cdd_cache.write_cache(self.cache_dir, self.source_hash, self.base_tables, self.variants)
+                    
+            self.identification_dids = {did for info in self.variants.values()
+                                        for did, _ in info['identification']}
+            if variant is None and len(self.variants) == 1:
+                variant = next(iter(self.variants))
+            self._activate(None, None)
+            if variant is not None:
+                if variant in collected:
+                    self._activate(variant, collected[variant])
+                else:
+                    self.select_variant(variant)
             
-            # Parse Variants
-            self._parse_variants(root)
-            
-            self.logger.info(f"Loaded CDD file: {cdd_path}")
-            self.logger.info(f"Found {len(self.dids)} DIDs and {len(self.dtcs)} DTCs")
+            self._sample_rss()
+            self.load_stats = {
+                'seconds': time.perf_counter() - start,
+                'file_size': file_size,
+                # Growth over the RSS at the start, so earlier loads do not count
+                'peak_rss_growth_mb': self._rss_peak - rss_start if rss_start is not None else None,
+                'cached': bool(cached)
+            }
+            self._report_progress(progress_callback, 100, "CDD file loaded")
+            self.logger.info(f"Loaded CDD file: {cdd_path}{' (cached)' if cached else ''}")
+            self.logger.info(f"Found {len(self.dids)} DIDs and {len(self.dtcs)} DTCs, "
+                             f"{len(self.variants)} variants")
+            self.logger.info(
+                f"CDD load took {self.load_stats['seconds']:.2f}s, "
+                f"RSS grew by up to {self.load_stats['peak_rss_growth_mb'] or 0:.0f} MB"
+            )
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to load CDD file: {e}")
             return False
     
-    def _parse_dids(self, root: ET.Element):
-        """Parse Data Identifiers from CDD"""
-        for did_elem in root.findall('.//DATA-IDENTIFIER'):
-            did_name = did_elem.get('NAME', '')
-            did_id = did_elem.get('ID', '')
-            
-            if did_name and did_id:
-                self.dids[did_id] = {
-                    'name': did_name,
-                    'id': did_id,
-                    'length': did_elem.get('LENGTH', ''),
-                    'description': did_elem.get('DESC', '')
-                }
-    
-    def _parse_dtcs(self, root: ET.Element):
-        """Parse Diagnostic Trouble Codes from CDD"""
-        for dtc_elem in root.findall('.//DTC'):
-            dtc_name = dtc_elem.get('NAME', '')
-            dtc_code = dtc_elem.get('CODE', '')
+    def select_variant(self, variant: Optional[str], stream: bool = True) -> bool:
+        """Activate an ECU variant (None for the shared tables only).
+        
+        With stream=False only cached variants are activated and the file
+        is never parsed again.
+        """
+        if variant == self.active_variant:
+            return True
+        if variant is None:
+            self._activate(None, None)
+            return True
+        if variant not in self.variants:
+            self.logger.warning(f"Unknown CDD variant: {variant}")
+            return False
             
-            if dtc_name and dtc_code:
-                self.dtcs[dtc_code] = {
-                    'name': dtc_name,
-                    'code': dtc_code,
-                    'description': dtc_elem.get('DESC', ''),
-                    'severity': dtc_elem.get('SEVERITY', '')
-                }
-    
-    def _parse_variants(self, root: ET.Element):
-        """Parse Variants from CDD"""
-        for var_elem in root.findall('.//VARIANT'):
-            var_name = var_elem.get('NAME', '')
-            if var_name:
-                self.variants[var_name] = var_name
+        tables = None
+        if self.source_hash:
+            cached = cdd_cache.read_cache(self.cache_dir, cdd_cache.variant_key(self.source_hash, variant))
+            tables = cached[0] if cached else None
+        if tables is None:
+            if not stream:
+                return False
+            try:
+                with open(self.source_path, 'rb') as cdd_file:
+                    _, collected = self._stream_elements(
+                        cdd_file, os.path.getsize(self.source_path) or 1, None, {variant}
+                    )
+                tables = collected.get(variant, CDDTables())
+            except Exception as e:
+                self.logger.error(f"Failed to load CDD variant {variant}: {e}")
+                return False
+                
+        self._activate(variant, tables)
+        self.logger.info(f"CDD variant {variant} active: {len(self.dids)} DIDs, {len(self.dtcs)} DTCs")
+        return True
+    
+    def identify_variant(self, did: int, data: bytes) -> Optional[str]:
+        """Record an identification DID response; returns a newly identified variant (loaded in the background)"""
+        if did not in self.identification_dids:
+            return None
+        self.observed_identification[did] = bytes(data)
+        
+        observed = self.observed_identification
+        for name, info in self.variants.items():
+            identification = info['identification']
+            if identification and all(did in observed and observed[did].startswith(value) for did, value in identification):
+                if name == self.active_variant or name == self.pending_variant:
+                    return None
+                # Even a cache read would stall decoding; the variant is loaded in the background
+                self.pending_variant = name
+                self.logger.info(f"CDD variant {name} identified, requesting a background load")
+                if self.variant_load_callback:
+                    self.variant_load_callback(name)
+                else:
+                    threading.Thread(target=self._load_pending_variant, args=(name,), daemon=True).start()
+                return name
+        return None
+    
+    def _load_pending_variant(self, variant: str):
+        """Activate an identified variant off the decode path"""
+        try:
+            self.select_variant(variant)
+        finally:
+            if self.pending_variant == variant:
+                self.pending_variant = None
+    
+    def _activate(self, variant: Optional[str], tables: Optional[CDDTables]):
+        """Expose the shared tables overlaid with one variant's tables"""
+        base = self.base_tables
+        self.active_variant = variant
+        self.variant_tables = tables
+        if tables is None:
+            self.dids, self.dtcs = base.dids, base.dtcs
+            self.dids_by_number, self.dtcs_by_number = base.dids_by_number, base.dtcs_by_number
+        else:
+            self.dids = ChainMap(tables.dids, base.dids)
+            self.dtcs = ChainMap(tables.dtcs, base.dtcs)
+            self.dids_by_number = {**base.dids_by_number, **tables.dids_by_number}
+            self.dtcs_by_number = {**base.dtcs_by_number, **tables.dtcs_by_number}
+        self._dtc_matcher = None
+        self._did_decoders = {}
+    
+    def _stream_elements(self, cdd_file, file_size: int, progress_callback,
+                         collect: Optional[Set[str]] = None,
+                         variant_done: Optional[Callable[[str, CDDTables], bool]] = None
+                         ) -> Tuple[CDDTables, Dict[str, CDDTables]]:
+        """Read shared and variant DIDs/DTCs in one iterparse pass with bounded memory.
+        
+        Every element is detached from its parent once it ends, so only the
+        currently open path of the document is ever held in memory. Inside
+        DIDs and DTCs children stay attached until the record itself ends.
+        collect limits which variants' tables are parsed (None parses all).
+        variant_done is called with each variant's finished tables; they are
+        only kept if it returns True.
+        """
+        handlers = self._element_handlers
+        base = CDDTables()
+        collected = {}
+        targets = [base]  # None while inside a variant that is not collected
+        variant_names = []
+        path = []
+        open_records = 0
+        count = 0
+        for event, elem in ET.iterparse(cdd_file, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                path.append(elem)
+                if tag == 'VARIANT':
+                    name = elem.get('NAME', '')
+                    variant_names.append(name)
+                    if name and collect is None:
+                        self.variants[name] = {'name': name, 'identification': ()}
+                    wanted = name and (collect is None or name in collect)
+                    targets.append(collected.setdefault(name, CDDTables()) if wanted else None)
+                elif tag in RECORD_TAGS:
+                    open_records += 1
+                continue
+                
+            path.pop()
+            if tag == 'VARIANT':
+                tables = targets.pop()
+                name = variant_names.pop()
+                if tables is not None:
+                    tables.build_indexes()
+                    if variant_done is not None and not variant_done(name, tables):
+                        del collected[name]
+            elif tag == 'VARIANT-ID':
+                if variant_names and collect is None:
+                    self._parse_variant_id(elem, variant_names[-1])
+            else:
+                handler = handlers.get(tag)
+                if handler and targets[-1] is not None:
+                    handler(elem, targets[-1])
+            if tag in RECORD_TAGS:
+                open_records -= 1
+            if open_records == 0:
+                elem.clear()
+                if path:
+                    path[-1].remove(elem)
+                
+            count += 1
+            if count % PROGRESS_INTERVAL == 0:
+                self._sample_rss()
+                percent = min(99, cdd_file.tell() * 100 // file_size)
+                self._report_progress(progress_callback, percent, "Reading CDD file")
+                
+        base.build_indexes()
+        return base, collected
+    
+    def _sample_rss(self):
+        """Track the highest RSS seen while loading (sampled, so short spikes can be missed)"""
+        if self._rss_peak is not None:
+            self._rss_peak = max(self._rss_peak, _rss_mb() or 0)
+    
+    def _report_progress(self, progress_callback, percent: int, stage: str):
+        """Forward loading progress to the caller, ignoring callback errors"""
+        if progress_callback:
+            try:
+                progress_callback(percent, stage)
+            except Exception as e:
+                self.logger.debug(f"Progress callback failed: {e}")
+    
+    def _parse_did(self, did_elem: ET.Element, tables: CDDTables):
+        """Parse one Data Identifier"""
+        did_name = did_elem.get('NAME', '')
+        did_id = did_elem.get('ID', '')
+        
+        if did_name and did_id:
+            tables.dids[did_id] = {
+                'name': did_name,
+                'id': did_id,
+                'length': did_elem.get('LENGTH', ''),
+                'description': did_elem.get('DESC', ''),
+                'data_objects': parse_data_objects(did_elem)
+            }
+    
+    def _parse_dtc(self, dtc_elem: ET.Element, tables: CDDTables):
+        """Parse one Diagnostic Trouble Code"""
+        dtc_name = dtc_elem.get('NAME', '')
+        dtc_code = dtc_elem.get('CODE', '')
+        
+        if dtc_name and dtc_code:
+            tables.dtcs[dtc_code] = {
+                'name': dtc_name,
+                'code': dtc_code,
+                'description': dtc_elem.get('DESC', ''),
+                'severity': dtc_elem.get('SEVERITY', '')
+            }
+    
+    def _parse_variant_id(self, id_elem: ET.Element, variant: str):
+        """Parse one identification pattern (expected start of a DID response) of a variant"""
+        info = self.variants.get(variant)
+        try:
+            pattern = (int(id_elem.get('DID', ''), 16), bytes.fromhex(id_elem.get('VALUE', '')))
+        except ValueError:
+            self.logger.debug(f"Ignoring invalid identification of variant {variant}")
+            return
+        if info is not None:
+            info['identification'] = info['identification'] + (pattern,)
     
     def get_did_info(self, did: str) -> Optional[Dict]:
         """Get DID information by ID"""
@@ -75,6 +348,37 @@ class CDDParser:
         """Get DTC information by code"""
         return self.dtcs.get(dtc.upper())
     
+    def get_did_info_by_number(self, did: int) -> Optional[Dict]:
+        """Get DID information by its 16-bit identifier"""
+        key = self.dids_by_number.get(did)
+        return self.dids[key] if key is not None else None
+    
+    def get_dtc_info_by_number(self, dtc: int) -> Optional[Dict]:
+        """Get DTC information by its 3-byte numeric code"""
+        key = self.dtcs_by_number.get(dtc)
+        return self.dtcs[key] if key is not None else None
+    
+    def get_did_decoder(self, did: int) -> Optional[Callable[[bytes], Optional[Dict[str, Any]]]]:
+        """Get the compiled decoder of a DID, compiled on first use"""
+        key = self.dids_by_number.get(did)
+        if key is None:
+            return None
+        if key not in self._did_decoders:
+            info = self.dids[key]
+            self._did_decoders[key] = compile_did_decoder(info['name'], info.get('data_objects'))
+        return self._did_decoders[key]
+    
+    def decode_did(self, did: int, data: bytes) -> Optional[Dict[str, Any]]:
+        """Decode DID response data into engineering values"""
+        decoder = self.get_did_decoder(did)
+        return decoder(data) if decoder else None
+    
+    def get_dtc_matcher(self) -> DTCMatcher:
+        """Get the matcher over all known DTCs, built on first use"""
+        if self._dtc_matcher is None:
+            self._dtc_matcher = DTCMatcher(self.dtcs, self.dtcs_by_number)
+        return self._dtc_matcher
+    
     def get_all_dids(self) -> List[str]:
         """Get list of all DIDs"""
         return list(self.dids.keys())
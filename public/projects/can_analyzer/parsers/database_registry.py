@@ -0,0 +1,259 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Callable
+import logging
+
+from .dbc_codec import compile_decoder
+from .j1939 import j1939_pgn, MAX_STANDARD_ID
+
+# Index key used for databases that apply to every channel
+ALL_CHANNELS = None
+
+
+def _signal_layout(signal) -> Tuple:
+    """Everything that decides how a signal is decoded from the payload"""
+    return (signal.name, signal.start, signal.length, signal.byte_order, signal.is_signed,
+            signal.is_float, signal.scale, signal.offset, signal.is_multiplexer,
+            tuple(signal.multiplexer_ids or ()), signal.multiplexer_signal)
+
+
+@dataclass
+class DecodePlan:
+    """Everything needed to decode one frame ID on one channel"""
+    message: Any
+    database_name: str
+    decoder: Optional[Callable[[bytes], Dict[str, Any]]] = None
+    j1939: bool = False  # Decoded with J1939 addressing (its database uses J1939)
+
+    def __post_init__(self):
+        self.length = self.message.length
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """Decode raw frame data into the DBCParser result format"""
+        message = self.message
+        decoder = self.decoder
+        if decoder is not None and len(data) >= self.length:
+            try:
+                signals = decoder(data)
+            except KeyError:
+                # Unknown multiplexer value, let cantools report it
+                signals = message.decode(data)
+        else:
+            signals = message.decode(data)
+            
+        return {
+            'message_name': message.name,
+            'signals': signals,
+            'comment': message.comment,
+            'send_type': message.send_type,
+            'cycle_time': message.cycle_time,
+            'database': self.database_name
+        }
+
+
+@dataclass
+class DatabaseEntry:
+    name: str
+    db: Any
+    channels: Optional[Tuple[int, ...]] = None  # None = all channels
+    plans: List[DecodePlan] = field(default_factory=list)
+    j1939: bool = False  # The database declares the J1939 protocol
+
+    def __post_init__(self):
+        # Compile every message once, when the database is registered
+        if not self.plans:
+            self.plans = [DecodePlan(message, self.name, compile_decoder(message))
+                          for message in self.db.messages]
+        self.j1939 = self._declares_j1939()
+
+    def _declares_j1939(self) -> bool:
+        # Database level ProtocolType attribute, as written by CANdb++
+        attributes = getattr(getattr(self.db, 'dbc', None), 'attributes', None) or {}
+        protocol = attributes.get('ProtocolType')
+        if protocol is not None and str(protocol.value).upper() == 'J1939':
+            return True
+        return any(getattr(plan.message, 'protocol', None) == 'j1939' for plan in self.plans)
+
+
+@dataclass(frozen=True)
+class DatabaseConflict:
+    channel: Optional[int]
+    frame_id: int
+    kept: str
+    ignored: str
+    reason: str
+
+
+class DatabaseRegistry:
+    """Maps (channel, frame ID) to a decode plan across several loaded databases.
+
+    All databases are flattened into a single dict when they are added or
+    removed, so a lookup is at most two dict probes (channel specific, then
+    all-channel) regardless of how many databases are loaded.
+
+    29-bit messages of databases that declare the J1939 protocol are
+    additionally indexed by PGN, so a frame from any source address hits
+    the same entry after masking its ID. Other databases keep exact ID
+    matching, even when loaded next to a J1939 one.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.entries: List[DatabaseEntry] = []
+        self.index: Dict[Tuple[Optional[int], int], DecodePlan] = {}
+        self.pgn_index: Dict[Tuple[Optional[int], int], DecodePlan] = {}
+        self.conflicts: List[DatabaseConflict] = []
+        self.j1939_override: Optional[bool] = None  # None: each database's own ProtocolType
+        self.j1939 = False  # Any database is decoded as J1939
+
+    def add_database(self, name: str, db: Any, channels: Optional[Iterable[int]] = None,
+                     strict: bool = False) -> bool:
+        """Register a database for the given channels (all channels if None).
+
+        Earlier databases win when two define the same frame ID on the same
+        channel. In strict mode a database that introduces a conflict is
+        rejected instead.
+        """
+        entry = DatabaseEntry(name, db, tuple(channels) if channels is not None else None)
+        index, pgn_index, conflicts = self._build_index(self.entries + [entry])
+
+        new_conflicts = [c for c in conflicts if name in (c.kept, c.ignored)]
+        if strict and new_conflicts:
+            for conflict in new_conflicts:
+                self.logger.error(self._describe_conflict(conflict))
+            return False
+
+        self.entries.append(entry)
+        self._publish(index, pgn_index, conflicts)
+        return True
+
+    def remove_database(self, name: str) -> bool:
+        """Unregister a database by name"""
+        entries = [entry for entry in self.entries if entry.name != name]
+        if len(entries) == len(self.entries):
+            return False
+
+        self.entries = entries
+        self._publish(*self._build_index(entries))
+        return True
+
+    def clear(self):
+        """Remove all databases"""
+        self.entries = []
+        self._publish({}, {}, [])
+    
+    def set_j1939_mode(self, enabled: Optional[bool]):
+        """Force PGN based lookup on (True) or off (False) for every database; None follows each ProtocolType"""
+        if enabled != self.j1939_override:
+            self.j1939_override = enabled
+            self._publish(*self._build_index(self.entries))
+    
+    def has_j1939_messages(self) -> bool:
+        """Check whether any loaded database declares the J1939 protocol"""
+        return any(entry.j1939 for entry in self.entries)
+
+    def _uses_j1939(self, entry: DatabaseEntry) -> bool:
+        return entry.j1939 if self.j1939_override is None else self.j1939_override
+
+    def lookup(self, frame_id: int, channel: Optional[int] = None) -> Optional[DecodePlan]:
+        """Find the decode plan for a frame: exact ID first, then PGN for J1939 databases"""
+        plan = self.lookup_id(frame_id, channel)
+        if plan is None and self.j1939 and frame_id > MAX_STANDARD_ID:
+            return self.lookup_pgn(j1939_pgn(frame_id), channel)
+        return plan
+
+    def lookup_id(self, frame_id: int, channel: Optional[int] = None) -> Optional[DecodePlan]:
+        """Find the decode plan defined for exactly this frame ID"""
+        index = self.index
+        if channel is not None:
+            plan = index.get((channel, frame_id))
+            if plan is not None:
+                return plan
+        return index.get((ALL_CHANNELS, frame_id))
+
+    def lookup_pgn(self, pgn: int, channel: Optional[int] = None) -> Optional[DecodePlan]:
+        """Find the decode plan for a J1939 parameter group"""
+        pgn_index = self.pgn_index
+        if channel is not None:
+            plan = pgn_index.get((channel, pgn))
+            if plan is not None:
+                return plan
+        return pgn_index.get((ALL_CHANNELS, pgn))
+
+    def get_database_names(self) -> List[str]:
+        """Get names of registered databases in priority order"""
+        return [entry.name for entry in self.entries]
+
+    def _publish(self, index, pgn_index, conflicts):
+        """Swap in a rebuilt index; readers only ever see a complete dict"""
+        known = set(self.conflicts)
+        self.index = index
+        self.pgn_index = pgn_index
+        self.conflicts = conflicts
+        self.j1939 = any(self._uses_j1939(entry) for entry in self.entries)
+        for conflict in conflicts:
+            if conflict not in known:
+                self.logger.warning(self._describe_conflict(conflict))
+
+    def _build_index(self, entries: List[DatabaseEntry]):
+        """Flatten all databases into one (channel, frame ID) index, plus a PGN index of the J1939 ones"""
+        index = {}
+        pgn_index = {}
+        conflicts = []
+
+        for entry in entries:
+            keys = entry.channels if entry.channels is not None else (ALL_CHANNELS,)
+            j1939 = self._uses_j1939(entry)
+            for plan in entry.plans:
+                message = plan.message
+                plan.j1939 = j1939
+                for channel in keys:
+                    self._index_plan(index, (channel, message.frame_id), plan, conflicts)
+                    if j1939 and message.is_extended_frame:
+                        self._index_plan(pgn_index, (channel, j1939_pgn(message.frame_id)), plan, conflicts,
+                                         by_pgn=True)
+
+        self._check_shadowing(index, conflicts)
+        self._check_shadowing(pgn_index, conflicts)
+        return index, pgn_index, conflicts
+
+    def _index_plan(self, index, key, plan, conflicts, by_pgn: bool = False):
+        """Add a plan to an index, recording a conflict if the key is taken"""
+        existing = index.get(key)
+        if existing is None:
+            index[key] = plan
+        elif by_pgn and existing.database_name == plan.database_name:
+            pass  # The same PGN from several source addresses of one database
+        elif not self._same_definition(existing.message, plan.message):
+            conflicts.append(DatabaseConflict(
+                key[0], key[1], existing.database_name, plan.database_name,
+                self._difference(existing.message, plan.message, 'vs')
+            ))
+
+    def _check_shadowing(self, index, conflicts):
+        """Channel specific definitions shadow all-channel ones for that channel"""
+        for (channel, frame_id), plan in index.items():
+            if channel is ALL_CHANNELS:
+                continue
+            shadowed = index.get((ALL_CHANNELS, frame_id))
+            if shadowed is not None and not self._same_definition(shadowed.message, plan.message):
+                conflicts.append(DatabaseConflict(
+                    channel, frame_id, plan.database_name, shadowed.database_name,
+                    self._difference(plan.message, shadowed.message, 'shadows')
+                ))
+
+    def _same_definition(self, first, second) -> bool:
+        """Treat identical message layouts loaded twice as a non-conflict"""
+        if first is second:
+            return True
+        return (first.name == second.name and first.length == second.length and
+                [_signal_layout(s) for s in first.signals] == [_signal_layout(s) for s in second.signals])
+
+    def _difference(self, first, second, relation: str) -> str:
+        if first.name == second.name:
+            return f"{first.name}: different length or signal layout"
+        return f"{first.name} {relation} {second.name}"
+
+    def _describe_conflict(self, conflict: DatabaseConflict) -> str:
+        channel = 'all channels' if conflict.channel is ALL_CHANNELS else f"channel {conflict.channel}"
+        return (f"DBC conflict on {channel} for ID/PGN {hex(conflict.frame_id)}: "
+                f"{conflict.kept} kept, {conflict.ignored} ignored ({conflict.reason})")
@@ -0,0 +1,317 @@
+import itertools
+import struct
+from typing import Dict, List, Optional, Any, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FLOAT_FORMATS = {16: struct.Struct('>e'), 32: struct.Struct('>f'), 64: struct.Struct('>d')}
+
+
+def _is_integer(value) -> bool:
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+class _SignalCode:
+    """Python source fragments that extract and scale one signal"""
+
+    def __init__(self, signal, index: int, message_bits: int, namespace: Dict[str, Any]):
+        self.name = signal.name
+        self.raw = f"r{index}"
+        mask = (1 << signal.length) - 1
+
+        # Raw bits from the little or big endian integer view of the payload
+        if signal.byte_order == 'little_endian':
+            self.source = 'le'
+            shift = signal.start
+        else:
+            self.source = 'be'
+            msb = (signal.start // 8) * 8 + (7 - signal.start % 8)
+            shift = message_bits - (msb + signal.length)
+        extract = f"(le >> {shift}) & {mask}" if self.source == 'le' else f"(be >> {shift}) & {mask}"
+        self.statements = [f"{self.raw} = {extract}"]
+
+        if signal.is_float:
+            float_format = _FLOAT_FORMATS[signal.length]
+            namespace[f"_f{index}"] = float_format
+            self.statements.append(
+                f"{self.raw} = _f{index}.unpack({self.raw}.to_bytes({signal.length // 8}, 'big'))[0]"
+            )
+        elif signal.is_signed:
+            sign_bit = 1 << (signal.length - 1)
+            self.statements.append(f"{self.raw} = ({self.raw} ^ {sign_bit}) - {sign_bit}")
+
+        # Same conversion rules as cantools (identity, integer linear, float linear)
+        scale, offset = signal.scale, signal.offset
+        if scale == 1 and offset == 0:
+            scaled = self.raw
+        elif _is_integer(scale) and _is_integer(offset) and not signal.is_float:
+            scaled = f"{self.raw} * {int(scale)} + {int(offset)}"
+        else:
+            namespace[f"_s{index}"] = scale
+            namespace[f"_o{index}"] = offset
+            scaled = f"{self.raw} * _s{index} + _o{index}"
+
+        if signal.choices:
+            namespace[f"_c{index}"] = signal.choices
+            self.value = f"(_c{index}[{self.raw}] if {self.raw} in _c{index} else {scaled})"
+            # Multiplexer ids are the raw number for named values, the scaled number otherwise
+            self.mux_key = self.raw if scaled == self.raw else \
+                f"({self.raw} if {self.raw} in _c{index} else int({scaled}))"
+        else:
+            self.value = scaled
+            self.mux_key = self.raw if scaled == self.raw else f"int({scaled})"
+
+
+class _DecoderBuilder:
+    """Generates specialized decode functions for one message.
+
+    Every combination of multiplexer values gets its own flat extractor, and
+    each multiplexer level is a dict from selector value to the next function,
+    so decoding a multiplexed frame is one table lookup per level.
+    """
+
+    def __init__(self, message):
+        self.message = message
+        self.message_bits = message.length * 8
+        self.namespace: Dict[str, Any] = {}
+        self.signals = {}
+        for index, signal in enumerate(message.signals):
+            self.signals[signal.name] = _SignalCode(signal, index, self.message_bits, self.namespace)
+        self.counter = itertools.count()
+
+    def build(self) -> Callable[[bytes], Dict[str, Any]]:
+        entry = self._node(self.message.signal_tree, [])
+        length = self.message.length
+        sources = {code.source for code in self.signals.values()}
+        le = "int.from_bytes(data, 'little')" if 'le' in sources else "0"
+        be = "int.from_bytes(data, 'big')" if 'be' in sources else "0"
+        self.namespace['_entry'] = entry
+        source = (
+            "def decode(data):\n"
+            f"    if len(data) != {length}:\n"
+            f"        data = data[:{length}]\n"
+            f"    return _entry({le}, {be})\n"
+        )
+        exec(compile(source, f"<decoder {self.message.name}>", 'exec'), self.namespace)
+        return self.namespace['decode']
+
+    def _node(self, tree: List, inherited: List[str]):
+        """Build the function for one node of the signal tree"""
+        plain = [item for item in tree if isinstance(item, str)]
+        muxes = [item for item in tree if isinstance(item, dict)]
+        selectors = [name for mux in muxes for name in mux]
+        active = inherited + selectors + plain
+
+        if not muxes:
+            return self._leaf(active)
+
+        # One table per node, keyed by the selector value (or tuple of values)
+        branches = [list(mux[name].items()) for mux in muxes for name in mux]
+        table = {}
+        for combination in itertools.product(*branches):
+            subtree = [item for _, branch in combination for item in branch]
+            key = combination[0][0] if len(combination) == 1 else tuple(mux_id for mux_id, _ in combination)
+            table[key] = self._node(subtree, active)
+
+        number = next(self.counter)
+        self.namespace[f"_t{number}"] = table
+        lines = []
+        for name in selectors:
+            lines.extend(self.signals[name].statements)
+        keys = [self.signals[name].mux_key for name in selectors]
+        key_expr = keys[0] if len(keys) == 1 else f"({', '.join(keys)},)"
+        lines.append(f"return _t{number}[{key_expr}](le, be)")
+        return self._define(f"_n{number}", lines)
+
+    def _leaf(self, active: List[str]):
+        """Build a flat extractor returning every signal active for one mux path"""
+        number = next(self.counter)
+        lines = []
+        for name in active:
+            lines.extend(self.signals[name].statements)
+        items = ', '.join(f"{name!r}: {self.signals[name].value}" for name in active)
+        lines.append(f"return {{{items}}}")
+        return self._define(f"_l{number}", lines)
+
+    def _define(self, name: str, lines: List[str]):
+        source = f"def {name}(le, be):\n" + ''.join(f"    {line}\n" for line in lines)
+        exec(compile(source, f"<decoder {self.message.name}>", 'exec'), self.namespace)
+        return self.namespace[name]
+
+
+def compile_decoder(message) -> Optional[Callable[[bytes], Dict[str, Any]]]:
+    """Compile a cantools message into a specialized decode function.
+
+    Returns None when the message uses features the compiler does not
+    handle (containers, unusual float widths); callers then keep using
+    cantools for that message.
+    """
+    try:
+        if getattr(message, 'is_container', False):
+            return None
+        return _DecoderBuilder(message).build()
+    except Exception as e:
+        logger.debug(f"Falling back to cantools for {message.name}: {e}")
+        return None
+
+
+class _SignalPacker:
+    """Scaled-to-raw conversion and bit placement for one signal"""
+
+    def __init__(self, signal, message_bits: int):
+        self.name = signal.name
+        self.mask = (1 << signal.length) - 1
+        self.is_float = signal.is_float
+        self.minimum = signal.minimum
+        self.maximum = signal.maximum
+        self.choices = {str(name): number for number, name in (signal.choices or {}).items()}
+
+        if signal.byte_order == 'little_endian':
+            self.big_endian = False
+            self.shift = signal.start
+        else:
+            self.big_endian = True
+            msb = (signal.start // 8) * 8 + (7 - signal.start % 8)
+            self.shift = message_bits - (msb + signal.length)
+        self.field = self.mask << self.shift
+
+        scale, offset = signal.scale, signal.offset
+        self.scale, self.offset = scale, offset
+        self.identity = scale == 1 and offset == 0
+        self.integer_linear = _is_integer(scale) and _is_integer(offset) and not signal.is_float
+        self.float_format = _FLOAT_FORMATS[signal.length] if signal.is_float else None
+
+    def to_raw(self, value, validate: bool) -> int:
+        """Convert a physical value (or value-table name) into the field bits"""
+        if not isinstance(value, (int, float)):
+            raw = self.choices.get(str(value))
+            if raw is None:
+                raise ValueError(f'Invalid value for signal "{self.name}": "{value}"')
+            return raw & self.mask
+
+        if validate:
+            if self.minimum is not None and value < self.minimum:
+                raise ValueError(f'Signal "{self.name}" value {value} below minimum {self.minimum}')
+            if self.maximum is not None and value > self.maximum:
+                raise ValueError(f'Signal "{self.name}" value {value} above maximum {self.maximum}')
+
+        if self.float_format is not None:
+            raw = value if self.identity else (value - self.offset) / self.scale
+            return int.from_bytes(self.float_format.pack(raw), 'big')
+
+        if self.identity:
+            raw = value
+        elif self.integer_linear and isinstance(value, int):
+            quotient, remainder = divmod(value - int(self.offset), int(self.scale))
+            raw = quotient if remainder == 0 else (value - self.offset) / self.scale
+        else:
+            raw = (value - self.offset) / self.scale
+        return round(raw) & self.mask
+
+
+class CompiledEncoder:
+    """Packs signal values for one message straight into a reusable bytearray.
+
+    Signal values are kept between calls, so update() only re-packs the
+    signals that changed. With validate=False range and completeness checks
+    are skipped for the fastest possible transmit path.
+    """
+
+    def __init__(self, message, validate: bool = True):
+        self.message = message
+        self.length = message.length
+        self.validate = validate
+        self.buffer = bytearray(self.length)
+        self.packers = {signal.name: _SignalPacker(signal, self.length * 8) for signal in message.signals}
+        self.conditions = {}
+        self._collect_conditions(message.signal_tree, [])
+        self.selectors = {name for conditions in self.conditions.values() for name, _ in conditions}
+        self.multiplexed = bool(self.selectors)
+        self.raw_values = {}
+        self._le = 0
+        self._be = 0
+
+    def _collect_conditions(self, tree, conditions):
+        """Record which selector values each multiplexed signal depends on"""
+        for item in tree:
+            if isinstance(item, str):
+                self.conditions[item] = conditions
+                continue
+            for selector, branches in item.items():
+                self.conditions[selector] = conditions
+                for mux_id, subtree in branches.items():
+                    self._collect_conditions(subtree, conditions + [(selector, mux_id)])
+
+    def _is_active(self, name: str) -> bool:
+        if not self.multiplexed:
+            return True
+        raw_values = self.raw_values
+        return all(raw_values.get(selector) == mux_id for selector, mux_id in self.conditions[name])
+
+    def _place(self, packer: _SignalPacker, raw: int):
+        if packer.big_endian:
+            self._be = (self._be & ~packer.field) | (raw << packer.shift)
+        else:
+            self._le = (self._le & ~packer.field) | (raw << packer.shift)
+
+    def _flush(self) -> bytearray:
+        """Write the packed integers into the reusable buffer"""
+        value = self._le
+        if self._be:
+            value |= int.from_bytes(self._be.to_bytes(self.length, 'big'), 'little')
+        self.buffer[:] = value.to_bytes(self.length, 'little')
+        return self.buffer
+
+    def _repack(self) -> bytearray:
+        """Pack every stored value that is active for the current mux path"""
+        le = be = 0
+        packers = self.packers
+        multiplexed = self.multiplexed
+        for name, raw in self.raw_values.items():
+            if multiplexed and not self._is_active(name):
+                continue
+            packer = packers[name]
+            if packer.big_endian:
+                be |= raw << packer.shift
+            else:
+                le |= raw << packer.shift
+        self._le = le
+        self._be = be
+        return self._flush()
+
+    def encode(self, signal_values: Dict[str, Any], validate: Optional[bool] = None) -> bytearray:
+        """Encode a complete set of signal values, replacing stored ones"""
+        validate = self.validate if validate is None else validate
+        packers = self.packers
+        self.raw_values = {name: packers[name].to_raw(value, validate)
+                           for name, value in signal_values.items()}
+
+        if validate:
+            missing = [name for name in packers if name not in self.raw_values and self._is_active(name)]
+            if missing:
+                raise ValueError(f"Missing signals for {self.message.name}: {', '.join(missing)}")
+        return self._repack()
+
+    def update(self, validate: Optional[bool] = None, **signal_values) -> bytearray:
+        """Re-pack only the given signals, keeping every other stored value"""
+        validate = self.validate if validate is None else validate
+        packers = self.packers
+        raw_values = self.raw_values
+        changed = []
+        for name, value in signal_values.items():
+            raw = packers[name].to_raw(value, validate)
+            if raw_values.get(name) != raw:
+                raw_values[name] = raw
+                changed.append(name)
+
+        if not changed:
+            return self.buffer
+        # A new selector value changes which signals own the overlapping bits
+        if self.selectors.intersection(changed):
+            return self._repack()
+
+        for name in changed:
+            if self._is_active(name):
+                self._place(packers[name], raw_values[name])
+        return self._flush()
@@ -1,44 +1,142 @@
 import cantools
-from typing import Dict, List, Optional, Any
+import os
+import time
+from typing import Dict, List, Optional, Any, Callable, Iterable
 import logging
 
+from .database_registry import DatabaseRegistry
+from .dbc_codec import CompiledEncoder
+from .j1939 import (J1939TransportReassembler, parse_j1939_id, PGN_TP_CM, PGN_TP_DT,
+                    MAX_STANDARD_ID)
+
 class DBCParser:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.db = None
         self.messages = {}
+        self.registry = DatabaseRegistry()
+        self.encoders = {}
+        self.sources = []  # (path, channels, strict) of every loaded file, in load order
+        self.j1939_transport = J1939TransportReassembler()
         
-    def load_dbc_file(self, dbc_path: str) -> bool:
-        """Load and parse DBC file"""
+    def load_dbc_file(self, dbc_path: str,
+                      progress_callback: Optional[Callable[[int, str], None]] = None) -> bool:
+        """Load and parse DBC file, replacing any loaded databases"""
+        return self._load_database(dbc_path, None, False, True, progress_callback)
+    
+    def add_dbc_file(self, dbc_path: str, channels: Optional[Iterable[int]] = None,
+                     strict: bool = False,
+                     progress_callback: Optional[Callable[[int, str], None]] = None) -> bool:
+        """Load a DBC file next to the already loaded ones, for the given channels (all if None)"""
+        return self._load_database(dbc_path, channels, strict, False, progress_callback)
+    
+    def _load_database(self, dbc_path, channels, strict, replace, progress_callback) -> bool:
+        """Parse a DBC file and register it in the decode index"""
         try:
-            self.db = cantools.db.load_file(dbc_path)
-            self.messages = {msg.name: msg for msg in self.db.messages}
+            self._report_progress(progress_callback, 0, "Parsing DBC file")
+            db = cantools.db.load_file(dbc_path)
+            
+            self._report_progress(progress_callback, 80, "Indexing messages")
+            if replace:
+                self.registry.clear()
+                self.messages = {}
+                self.encoders = {}
+                self.sources = []
+                
+            name = os.path.basename(dbc_path)
+            existing = self.registry.get_database_names()
+            if name in existing:
+                name = f"{name}#{len(existing)}"
+                
+            if not self.registry.add_database(name, db, channels, strict):
+                self.logger.error(f"DBC file {dbc_path} conflicts with loaded databases")
+                return False
+            
+            # Earlier databases keep their message names on a clash
+            messages = dict(self.messages)
+            for msg in db.messages:
+                messages.setdefault(msg.name, msg)
+            
+            # Publish the new database only once it is fully built
+            self.db = db
+            self.messages = messages
+            self.sources = self.sources + [(dbc_path, tuple(channels) if channels is not None else None, strict)]
+            self._report_progress(progress_callback, 100, "DBC file loaded")
             self.logger.info(f"Loaded DBC file: {dbc_path}")
-            self.logger.info(f"Found {len(self.messages)} messages")
+            self.logger.info(f"Found {len(db.messages)} messages")
             return True
         except Exception as e:
             self.logger.error(f"Failed to load DBC file: {e}")
             return False
     
-    def decode_message(self, can_id: int, data: bytes) -> Optional[Dict[str, Any]]:
-        """Decode CAN message using DBC"""
-        if not self.db:
+    def _report_progress(self, progress_callback, percent: int, stage: str):
+        """Forward loading progress to the caller, ignoring callback errors"""
+        if progress_callback:
+            try:
+                progress_callback(percent, stage)
+            except Exception as e:
+                self.logger.debug(f"Progress callback failed: {e}")
+    
+    def set_j1939_mode(self, enabled: Optional[bool]):
+        """Force J1939 decoding on or off for all databases (None: per database ProtocolType)"""
+        self.registry.set_j1939_mode(enabled)
+        mode = 'per database' if enabled is None else ('enabled' if enabled else 'disabled')
+        self.logger.info(f"J1939 mode {mode}")
+    
+    def decode_message(self, can_id: int, data: bytes, channel: Optional[int] = None,
+                       timestamp: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Decode CAN message using the database assigned to its channel"""
+        plan = self.registry.lookup_id(can_id, channel)
+        if self.registry.j1939 and can_id > MAX_STANDARD_ID and (plan is None or plan.j1939):
+            # Only databases declaring J1939 are looked up by PGN
+            return self._decode_j1939(can_id, data, channel, timestamp)
+        if plan is None:
+            return None
+            
+        try:
+            return plan.decode(data)
+        except Exception as e:
+            # Decoding error
+            return None
+    
+    def needs_sequential_decode(self, can_id: int) -> bool:
+        """True for frames whose decoding depends on earlier frames (J1939 transport)"""
+        if not self.registry.j1939 or can_id <= MAX_STANDARD_ID:
+            return False
+        pgn = parse_j1939_id(can_id)[1]
+        return pgn == PGN_TP_CM or pgn == PGN_TP_DT
+    
+    def _decode_j1939(self, can_id, data, channel, timestamp) -> Optional[Dict[str, Any]]:
+        """Decode a 29-bit frame by PGN, reassembling transport protocol transfers"""
+        priority, pgn, source, destination = parse_j1939_id(can_id)
+        transport = None
+        
+        if pgn == PGN_TP_CM or pgn == PGN_TP_DT:
+            transfer = self.j1939_transport.feed(
+                channel, can_id, data, timestamp if timestamp is not None else time.time()
+            )
+            if transfer is None:
+                return None
+            pgn, data, transport = transfer['pgn'], transfer['data'], transfer['transport']
+            
+        plan = self.registry.lookup_pgn(pgn, channel)
+        if plan is None:
             return None
             
         try:
-            message = self.db.get_message_by_frame_id(can_id)
-            decoded = message.decode(data)
-            
-            return {
-                'message_name': message.name,
-                'signals': decoded,
-                'comment': message.comment,
-                'send_type': message.send_type,
-                'cycle_time': message.cycle_time
-            }
+            decoded = plan.decode(data)
         except Exception as e:
-            # Message not found in DBC or decoding error
+            # Decoding error
             return None
+            
+        decoded['j1939'] = {
+            'priority': priority,
+            'pgn': pgn,
+            'source_address': source,
+            'destination_address': destination,
+            'transport': transport
+        }
+        return decoded
     
     def get_message_by_name(self, message_name: str):
         """Get message definition by name"""
@@ -48,15 +146,32 @@ class DBCParser:
         """Get list of all message names"""
         return list(self.messages.keys())
     
+    def get_encoder(self, message_name: str, validate: bool = True) -> Optional[CompiledEncoder]:
+        """Get the cached compiled encoder for a message.
+        
+        The encoder keeps its signal values and output buffer between calls,
+        so periodic transmitters can use encoder.update(...) to re-pack only
+        the signals that changed.
+        """
+        key = (message_name, validate)
+        encoder = self.encoders.get(key)
+        if encoder is None:
+            message = self.messages.get(message_name)
+            if message is None:
+                return None
+            encoder = self.encoders[key] = CompiledEncoder(message, validate)
+        return encoder
+    
     def encode_message(self, message_name: str, **signal_values) -> Optional[bytes]:
         """Encode message using DBC"""
         if not self.db:
             return None
             
         try:
-            message = self.messages[message_name]
-            encoded_data = message.encode(signal_values)
-            return encoded_data
+            encoder = self.get_encoder(message_name)
+            if encoder is None:
+                raise KeyError(message_name)
+            return bytes(encoder.encode(signal_values))
         except Exception as e:
             self.logger.error(f"Failed to encode message {message_name}: {e}")
             return None
\ No newline at end of file
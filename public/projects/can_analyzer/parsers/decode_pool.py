@@ -0,0 +1,70 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+from .dbc_parser import DBCParser
+
+# Parser of the current worker process, built once by the pool initializer
+_worker_parser: Optional[DBCParser] = None
+
+Frame = Tuple[int, bytes, Optional[int]]
+
+
+def _init_worker(sources: Tuple[Tuple[str, Optional[Tuple[int, ...]], bool], ...], j1939: Optional[bool]):
+    """Load the parent's DBC files into this worker process"""
+    global _worker_parser
+    parser = DBCParser()
+    for path, channels, strict in sources:
+        parser.add_dbc_file(path, channels, strict)
+    if parser.registry.j1939_override != j1939:
+        parser.set_j1939_mode(j1939)
+    _worker_parser = parser
+
+
+def _decode_frames(frames: List[Optional[Frame]]) -> List[Optional[Dict[str, Any]]]:
+    """Decode a batch in a worker; None entries are left to the caller"""
+    decode = _worker_parser.decode_message
+    return [decode(*frame) if frame is not None else None for frame in frames]
+
+
+class DecodePool:
+    """Decodes batches of frames with DBCParser copies in worker processes.
+
+    Compiled decoders cannot be pickled, so every worker loads the same DBC
+    files as the parent when it starts. The pool is rebuilt when the loaded
+    databases change. Frames whose decoding depends on earlier frames (J1939
+    transport sessions) must be decoded by the caller, in order.
+    """
+
+    def __init__(self, dbc_parser: DBCParser, workers: int):
+        self.logger = logging.getLogger(__name__)
+        self.dbc_parser = dbc_parser
+        self.workers = workers
+        self.executor = None
+        self._sources = None
+        self._j1939 = None
+
+    def submit(self, frames: List[Optional[Frame]]) -> Future:
+        """Queue one batch for decoding; the future yields one result per frame"""
+        self._ensure_executor()
+        return self.executor.submit(_decode_frames, frames)
+
+    def _ensure_executor(self):
+        sources = tuple(self.dbc_parser.sources)
+        j1939 = self.dbc_parser.registry.j1939_override
+        if self.executor is not None and sources == self._sources and j1939 == self._j1939:
+            return
+
+        # Batches already submitted finish on the old databases
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(sources, j1939))
+        self._sources = sources
+        self._j1939 = j1939
+        self.logger.info(f"Decode pool started with {self.workers} workers")
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+
+@dataclass
+class _DeltaState:
+    last_value: Any = None
+    last_forwarded: float = 0.0
+    forwarded: int = 0
+    suppressed: int = 0
+    pending: int = 0           # Suppressed since the last forwarded frame
+    pending_first: float = 0.0
+    pending_last: float = 0.0
+
+
+class DeltaFilter:
+    """Decides which frames carry news: a changed payload or changed chosen signals.
+
+    State is kept per (channel, ID). Unchanged frames are suppressed,
+    except that one is forwarded as a heartbeat once heartbeat_interval
+    seconds (message time) passed without a forwarded frame. Every
+    forwarded frame carries 'suppressed_count' and the timestamps of the
+    first and last frame suppressed before it, so consumers can rebuild
+    counts and timing.
+
+    IDs listed in signals are compared on those decoded signal values
+    instead of the raw payload, so only frames decoded by the DBC count
+    for them.
+    """
+
+    def __init__(self, signals: Optional[Dict[int, Iterable[str]]] = None,
+                 heartbeat_interval: Optional[float] = 1.0):
+        self.signals: Dict[int, Tuple[str, ...]] = {can_id: tuple(names) for can_id, names in (signals or {}).items()}
+        self.heartbeat_interval = heartbeat_interval
+        self.states: Dict[Tuple[Optional[int], int], _DeltaState] = {}
+
+    def uses_signals(self, can_id: int) -> bool:
+        return can_id in self.signals
+
+    def check_payload(self, message_data: Dict[str, Any]) -> bool:
+        """True if the frame should be forwarded (IDs compared on signals always pass here)"""
+        if message_data['can_id'] in self.signals:
+            return True
+        return self._check(message_data, message_data['data'])
+
+    def check_signals(self, message_data: Dict[str, Any], signals: Optional[Dict[str, Any]]) -> bool:
+        """True if the frame should be forwarded, for IDs compared on signal values"""
+        names = self.signals.get(message_data['can_id'])
+        if names is None:
+            return True
+        signals = signals or {}
+        return self._check(message_data, tuple(signals.get(name) for name in names))
+
+    def _check(self, message_data: Dict[str, Any], value: Any) -> bool:
+        key = (message_data.get('channel'), message_data['can_id'])
+        timestamp = message_data['timestamp'].timestamp()
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = _DeltaState()
+        elif value == state.last_value and not self._heartbeat_due(state, timestamp):
+            state.suppressed += 1
+            if not state.pending:
+                state.pending_first = timestamp
+            state.pending += 1
+            state.pending_last = timestamp
+            return False
+        elif value == state.last_value:
+            message_data['delta_heartbeat'] = True
+
+        message_data['suppressed_count'] = state.pending
+        if state.pending:
+            message_data['suppressed_first'] = state.pending_first
+            message_data['suppressed_last'] = state.pending_last
+        state.last_value = value
+        state.last_forwarded = timestamp
+        state.forwarded += 1
+        state.pending = 0
+        return True
+
+    def _heartbeat_due(self, state: _DeltaState, timestamp: float) -> bool:
+        return self.heartbeat_interval is not None and timestamp - state.last_forwarded >= self.heartbeat_interval
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Forwarded and suppressed counts per (channel, ID)"""
+        return [{
+            'channel': channel,
+            'can_id': can_id,
+            'forwarded': state.forwarded,
+            'suppressed': state.suppressed,
+            'pending': state.pending
+        } for (channel, can_id), state in self.states.items()]
+
+    def reset(self):
+        self.states = {}
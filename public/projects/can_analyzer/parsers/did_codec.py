@@ -0,0 +1,124 @@
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Any, Callable, Tuple
+import logging
+
+from .dbc_codec import _FLOAT_FORMATS, _is_integer
+
+logger = logging.getLogger(__name__)
+
+TEXT_TYPES = ('ascii', 'bytes')
+
+
+def parse_data_objects(parent: ET.Element, base_bit: int = 0, prefix: str = '') -> Tuple[Dict[str, Any], ...]:
+    """Flatten the DATA-OBJECT/STRUCTURE definitions of a DID into absolute bit positions.
+
+    Positions are relative to the enclosing structure (or the DID data) and
+    counted from its first byte, most significant bit first. Members of a
+    structure are named "Structure.Member".
+    """
+    data_objects = []
+    for child in parent:
+        position = base_bit + int(child.get('BIT-POSITION', '0'))
+        name = prefix + child.get('NAME', '')
+        if child.tag == 'STRUCTURE':
+            data_objects.extend(parse_data_objects(child, position, f"{name}."))
+        elif child.tag == 'DATA-OBJECT':
+            data_objects.append({
+                'name': name,
+                'bit_position': position,
+                'bit_length': int(child.get('BIT-LENGTH', '8')),
+                'type': child.get('TYPE', 'unsigned').lower(),
+                'byte_order': child.get('BYTE-ORDER', 'big').lower(),
+                'scale': float(child.get('SCALE', '1')),
+                'offset': float(child.get('OFFSET', '0')),
+                'unit': child.get('UNIT', ''),
+                'enums': {int(enum.get('VALUE', '0'), 0): enum.get('TEXT', '')
+                          for enum in child.findall('ENUM')}
+            })
+    return tuple(data_objects)
+
+
+class _DidDecoderBuilder:
+    """Generates one flat decode function for all data objects of a DID"""
+
+    def __init__(self, name: str, data_objects: Tuple[Dict[str, Any], ...]):
+        self.name = name
+        self.data_objects = data_objects
+        self.length = max(((item['bit_position'] + item['bit_length'] + 7) // 8 for item in data_objects),
+                          default=0)
+        self.namespace: Dict[str, Any] = {}
+
+    def build(self) -> Callable[[bytes], Optional[Dict[str, Any]]]:
+        bits = self.length * 8
+        lines = [f"if len(data) < {self.length}:", "    return None"]
+        numeric = [item for item in self.data_objects if item['type'] not in TEXT_TYPES]
+        if any(item['byte_order'] == 'big' for item in numeric):
+            lines.append(f"be = int.from_bytes(data[:{self.length}], 'big')")
+        if any(item['byte_order'] != 'big' for item in numeric):
+            lines.append(f"le = int.from_bytes(data[:{self.length}], 'little')")
+
+        items = []
+        for index, item in enumerate(self.data_objects):
+            lines.extend(self._statements(index, item, bits))
+            items.append(f"{item['name']!r}: v{index}")
+        lines.append(f"return {{{', '.join(items)}}}")
+
+        source = "def decode(data):\n" + ''.join(f"    {line}\n" for line in lines)
+        exec(compile(source, f"<did decoder {self.name}>", 'exec'), self.namespace)
+        return self.namespace['decode']
+
+    def _statements(self, index: int, item: Dict[str, Any], bits: int) -> List[str]:
+        value = f"v{index}"
+        position, length = item['bit_position'], item['bit_length']
+
+        if item['type'] in TEXT_TYPES:
+            start, end = position // 8, (position + length) // 8
+            if item['type'] == 'ascii':
+                return [f"{value} = bytes(data[{start}:{end}]).decode('latin-1').rstrip('\\x00 ')"]
+            return [f"{value} = bytes(data[{start}:{end}]).hex().upper()"]
+
+        mask = (1 << length) - 1
+        if item['byte_order'] == 'big':
+            statements = [f"{value} = (be >> {bits - position - length}) & {mask}"]
+        else:
+            # Little endian fields use Intel numbering: bit 0 is the LSB of the first byte
+            statements = [f"{value} = (le >> {position}) & {mask}"]
+
+        if item['type'] == 'float':
+            self.namespace[f"_f{index}"] = _FLOAT_FORMATS[length]
+            statements.append(f"{value} = _f{index}.unpack({value}.to_bytes({length // 8}, 'big'))[0]")
+        elif item['type'] == 'signed':
+            sign_bit = 1 << (length - 1)
+            statements.append(f"{value} = ({value} ^ {sign_bit}) - {sign_bit}")
+
+        scale, offset = item['scale'], item['offset']
+        if scale == 1 and offset == 0:
+            scaled = value
+        elif _is_integer(scale) and _is_integer(offset) and item['type'] != 'float':
+            scaled = f"{value} * {int(scale)} + {int(offset)}"
+        else:
+            self.namespace[f"_s{index}"] = scale
+            self.namespace[f"_o{index}"] = offset
+            scaled = f"{value} * _s{index} + _o{index}"
+
+        if item['enums']:
+            self.namespace[f"_e{index}"] = item['enums']
+            statements.append(f"{value} = _e{index}[{value}] if {value} in _e{index} else {scaled}")
+        elif scaled != value:
+            statements.append(f"{value} = {scaled}")
+        return statements
+
+
+def compile_did_decoder(name: str, data_objects) -> Optional[Callable[[bytes], Optional[Dict[str, Any]]]]:
+    """Compile the data objects of a DID into a decode function.
+
+    The function returns None when the response is shorter than the
+    definition. Returns None itself when the DID has no usable definition.
+    """
+    if not data_objects:
+        return None
+    try:
+        return _DidDecoderBuilder(name, tuple(data_objects)).build()
+    except Exception as e:
+        logger.debug(f"Cannot compile decoder for DID {name}: {e}")
+        return None
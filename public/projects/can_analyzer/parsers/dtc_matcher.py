@@ -0,0 +1,72 @@
+import re
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+
+SAE_DTC_LETTERS = 'PCBU'
+
+# One pattern for all four SAE groups, compiled once for every scan
+SAE_DTC_PATTERN = re.compile(r'[PCBU][0-3][0-9A-F]{3}')
+
+
+def format_sae_dtc(number: int) -> str:
+    """Format the upper two bytes of a 3-byte DTC as an SAE J2012 code (e.g. P0123)"""
+    high = (number >> 16) & 0xFF
+    return f"{SAE_DTC_LETTERS[high >> 6]}{(high >> 4) & 0x3}{high & 0xF:X}{(number >> 8) & 0xFF:02X}"
+
+
+def is_sae_dtc(code: str) -> bool:
+    """Check for SAE style codes, which would otherwise also parse as hex (B1234)"""
+    return len(code) == 5 and code[0].upper() in SAE_DTC_LETTERS
+
+
+class DTCMatcher:
+    """Matches payloads and text against the DTCs of a CDD, built once per CDD.
+
+    Numeric codes live in an integer hash set, so a payload is scanned in a
+    single pass with a rolling 3-byte value; SAE codes (P0123) are matched
+    on the upper two bytes of that value and in text. Only hits are
+    resolved to their DTC record.
+    """
+
+    def __init__(self, dtcs: Mapping[str, Dict], numbers: Dict[int, str]):
+        self.dtcs = dtcs
+        self.codes = numbers
+        self.sae_codes: Dict[str, str] = {code.upper(): code for code in dtcs if is_sae_dtc(code)}
+        self.sae_prefixes: Dict[int, str] = {}
+
+        # SAE codes as the 16-bit prefix they occupy in a 3-byte DTC
+        for code, key in self.sae_codes.items():
+            high = (SAE_DTC_LETTERS.index(code[0]) << 6) | (int(code[1]) << 4) | int(code[2], 16)
+            self.sae_prefixes.setdefault((high << 8) | int(code[3:], 16), key)
+
+    def __bool__(self) -> bool:
+        return bool(self.codes or self.sae_codes)
+
+    def lookup(self, number: int) -> Optional[Dict]:
+        """Resolve a 3-byte DTC (numeric code first, then its SAE code)"""
+        key = self.codes.get(number)
+        if key is None and self.sae_prefixes:
+            key = self.sae_prefixes.get(number >> 8)
+        return self.dtcs[key] if key is not None else None
+
+    def scan_bytes(self, data: bytes) -> List[Tuple[int, Dict]]:
+        """Find known numeric DTCs at any byte offset; returns (offset, info) pairs"""
+        codes = self.codes
+        if not codes or len(data) < 3:
+            return []
+
+        found = []
+        value = (data[0] << 8) | data[1]
+        for index in range(2, len(data)):
+            value = ((value << 8) | data[index]) & 0xFFFFFF
+            if value in codes:
+                found.append((index - 2, self.dtcs[codes[value]]))
+        return found
+
+    def scan_text(self, text: str) -> List[Tuple[str, Dict]]:
+        """Find known SAE DTC codes in text; returns (code, info) pairs"""
+        sae_codes = self.sae_codes
+        if not sae_codes:
+            return []
+        return [(code, self.dtcs[sae_codes[code]]) for code in SAE_DTC_PATTERN.findall(text.upper())
+                if code in sae_codes]
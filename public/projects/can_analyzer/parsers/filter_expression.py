@@ -0,0 +1,313 @@
+import fnmatch
+import re
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+# Standard IDs are answered from a precomputed bitmap
+BITMAP_SIZE = 0x800
+
+_TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<number>0[xX][0-9a-fA-F]+|\d+(?:\.\d+)?)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+      | (?P<op>==|!=|<=|>=|<|>|&|~|\(|\)|\[|\]|,|-)
+    )''', re.VERBOSE)
+
+COMPARISONS = ('==', '!=', '<', '<=', '>', '>=')
+FIELDS = ('id', 'channel', 'dlc', 'name', 'data', 'rx', 'tx', 'dtc', 'error')
+FLAGS = {
+    'rx': "m.get('is_rx', True)",
+    'tx': "(not m.get('is_rx', True))",
+    'dtc': "bool(m.get('detected_dtcs'))",
+    'error': "m.get('is_error_frame', False)"
+}
+
+
+class FilterSyntaxError(ValueError):
+    pass
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise FilterSyntaxError(f"Unexpected character at {position}: {text[position:position + 10]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser producing a small tuple AST"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterSyntaxError("Empty filter expression")
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise FilterSyntaxError(f"Unexpected {self._peek()[1]!r}")
+        return node
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _take(self, value: Optional[str] = None, kind: Optional[str] = None) -> str:
+        token_kind, token = self._peek()
+        if token is None or (value is not None and token.lower() != value) or (kind and token_kind != kind):
+            raise FilterSyntaxError(f"Expected {value or kind}, found {token!r}")
+        self.position += 1
+        return token
+
+    def _accept(self, value: str) -> bool:
+        token = self._peek()[1]
+        if token is not None and token.lower() == value:
+            self.position += 1
+            return True
+        return False
+
+    def _or(self):
+        terms = [self._and()]
+        while self._accept('or'):
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else ('or', terms)
+
+    def _and(self):
+        terms = [self._not()]
+        while self._accept('and'):
+            terms.append(self._not())
+        return terms[0] if len(terms) == 1 else ('and', terms)
+
+    def _not(self):
+        if self._accept('not'):
+            return ('not', self._not())
+        if self._accept('('):
+            node = self._or()
+            self._take(')')
+            return node
+        return self._predicate()
+
+    def _predicate(self):
+        field = self._take(kind='name')
+        lowered = field.lower()
+        if lowered in FLAGS:
+            return ('flag', lowered)
+        if lowered.startswith('signal.') and len(field) > 7:
+            field = ('signal', field[7:])
+        elif lowered == 'data':
+            self._take('[')
+            field = ('data', int(self._take(kind='number'), 0))
+            self._take(']')
+        elif lowered in FIELDS:
+            field = (lowered, None)
+        else:
+            raise FilterSyntaxError(f"Unknown field {field!r}")
+
+        mask = None
+        if self._accept('&'):
+            mask = int(self._take(kind='number'), 0)
+
+        operator = self._peek()[1]
+        if operator in COMPARISONS:
+            self.position += 1
+            return ('compare', field, mask, operator, self._value())
+        if operator == '~':
+            self.position += 1
+            return ('glob', field, mask, self._string())
+        if operator is not None and operator.lower() == 'in':
+            self.position += 1
+            return ('in', field, mask, self._items())
+        raise FilterSyntaxError(f"Expected a comparison after {field[0]}, found {operator!r}")
+
+    def _value(self):
+        kind, token = self._peek()
+        if kind == 'string':
+            return self._string()
+        negative = self._accept('-')
+        token = self._take(kind='number')
+        value = float(token) if '.' in token else int(token, 0)
+        return -value if negative else value
+
+    def _string(self) -> str:
+        return self._take(kind='string')[1:-1]
+
+    def _items(self) -> List[Any]:
+        """Either a single range (0x100-0x1FF) or a bracketed list of values and ranges"""
+        if not self._accept('['):
+            return [self._item()]
+        items = [self._item()]
+        while self._accept(','):
+            items.append(self._item())
+        self._take(']')
+        return items
+
+    def _item(self):
+        low = self._value()
+        if self._accept('-'):
+            return (low, self._value())
+        return low
+
+
+class FilterExpression:
+    """A filter compiled once into a Python function over message dicts.
+
+    Syntax: predicates combined with and/or/not and parentheses, e.g.
+        id in [0x100-0x1FF, 0x7E8] and rx
+        id & 0x700 == 0x700 or name ~ "Engine*"
+        channel == 1 and signal.EngineSpeed > 3000
+        dlc == 8 and data[0] & 0xF0 == 0x10
+
+    Fields are id, channel, dlc, name, data[n], signal.<name> and the
+    flags rx/tx (direction), dtc (frame reported DTCs) and error (error
+    frame). Every sub-expression that only looks at the ID
+    is evaluated for all standard IDs at compile time and becomes a single
+    bitmap lookup. Messages lacking a field (no such signal, short payload)
+    do not match.
+
+    For pipelines the top level and-terms are also compiled in two parts:
+    match_raw for terms answerable from the raw frame and match_decoded for
+    those needing the message name, signals or detected DTCs (None when
+    there are no such terms).
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tree = _Parser(text).parse()
+        self.namespace: Dict[str, Any] = {'_EMPTY': {}}
+        self._constants = 0
+
+        self.source = self._function_source('match', self.tree)
+        self.match: Callable[[Dict[str, Any]], bool] = self._compile('match', self.tree)
+
+        # Top level ID conditions let callers preselect candidates by ID
+        terms = self.tree[1] if self.tree[0] == 'and' else [self.tree]
+        id_terms = [term for term in terms if self._id_only(term)]
+        self.id_predicate: Optional[Callable[[int], bool]] = (
+            self._id_function(('and', id_terms)) if id_terms else None
+        )
+
+        # Pipelines filter raw frames before decoding; name and signal terms have to wait for it
+        raw_terms = [term for term in terms if not self._needs_decode(term)]
+        decoded_terms = [term for term in terms if self._needs_decode(term)]
+        self.needs_decode = bool(decoded_terms)
+        self.match_raw: Optional[Callable[[Dict[str, Any]], bool]] = (
+            self._compile('match_raw', ('and', raw_terms)) if raw_terms else None
+        )
+        self.match_decoded: Optional[Callable[[Dict[str, Any]], bool]] = (
+            self._compile('match_decoded', ('and', decoded_terms)) if decoded_terms else None
+        )
+
+    def __call__(self, message: Dict[str, Any]) -> bool:
+        return self.match(message)
+
+    def __repr__(self) -> str:
+        return f"FilterExpression({self.text!r})"
+
+    def _function_source(self, name: str, node) -> str:
+        return (f"def {name}(m):\n"
+                "    i = m['can_id']\n"
+                "    d = m['data']\n"
+                "    s = m.get('decoded_signals') or _EMPTY\n"
+                "    try:\n"
+                f"        return bool({self._generate(node)})\n"
+                "    except (TypeError, ValueError):\n"
+                "        return False\n")
+
+    def _compile(self, name: str, node) -> Callable[[Dict[str, Any]], bool]:
+        exec(compile(self._function_source(name, node), f"<filter {self.text}>", 'exec'), self.namespace)
+        return self.namespace[name]
+
+    def _needs_decode(self, node) -> bool:
+        """True if the node looks at the message name or decoded signals"""
+        kind = node[0]
+        if kind in ('and', 'or'):
+            return any(self._needs_decode(child) for child in node[1])
+        if kind == 'not':
+            return self._needs_decode(node[1])
+        if kind == 'flag':
+            return node[1] == 'dtc'
+        return node[1][0] in ('name', 'signal')
+
+    def _constant(self, value) -> str:
+        name = f"_c{self._constants}"
+        self._constants += 1
+        self.namespace[name] = value
+        return name
+
+    def _id_only(self, node) -> bool:
+        kind = node[0]
+        if kind in ('and', 'or'):
+            return all(self._id_only(child) for child in node[1])
+        if kind == 'not':
+            return self._id_only(node[1])
+        if kind == 'flag':
+            return False
+        return node[1][0] == 'id'
+
+    def _id_function(self, node) -> Callable[[int], bool]:
+        namespace = self.namespace
+        return eval(f"lambda i: bool({self._generate_plain(node)})", namespace)
+
+    def _generate(self, node) -> str:
+        if node[0] != 'flag' and self._id_only(node):
+            plain = self._generate_plain(node)
+            match_id = eval(f"lambda i: {plain}", self.namespace)
+            bitmap = self._constant(bytes(1 if match_id(can_id) else 0 for can_id in range(BITMAP_SIZE)))
+            return f"({bitmap}[i] if i < {BITMAP_SIZE} else ({plain}))"
+        return self._generate_plain(node, self._generate)
+
+    def _generate_plain(self, node, children=None) -> str:
+        children = children or self._generate_plain
+        kind = node[0]
+        if kind in ('and', 'or'):
+            return '(' + f' {kind} '.join(children(child) for child in node[1]) + ')'
+        if kind == 'not':
+            return f"(not {children(node[1])})"
+        if kind == 'flag':
+            return FLAGS[node[1]]
+
+        (field, argument), mask = node[1], node[2]
+        guard, reference = self._reference(field, argument)
+        if mask is not None:
+            reference = f"({reference} & {mask})"
+
+        if kind == 'compare':
+            condition = f"{reference} {node[3]} {node[4]!r}"
+        elif kind == 'glob':
+            pattern = self._constant(re.compile(fnmatch.translate(node[3]), re.IGNORECASE))
+            condition = f"{pattern}.match(str({reference}))"
+        else:
+            values = [item for item in node[3] if not isinstance(item, tuple)]
+            ranges = [item for item in node[3] if isinstance(item, tuple)]
+            tests = [f"{low!r} <= {reference} <= {high!r}" for low, high in ranges]
+            if values:
+                tests.insert(0, f"{reference} in {self._constant(frozenset(values))}")
+            condition = '(' + ' or '.join(tests) + ')'
+
+        return f"({guard} and {condition})" if guard else f"({condition})"
+
+    def _reference(self, field: str, argument) -> Tuple[Optional[str], str]:
+        """Guard expression and value expression of a field"""
+        if field == 'id':
+            return None, 'i'
+        if field == 'channel':
+            return None, "m.get('channel')"
+        if field == 'dlc':
+            return None, 'len(d)'
+        if field == 'name':
+            return "m.get('message_name') is not None", "m['message_name']"
+        if field == 'data':
+            return f"len(d) > {argument}", f"d[{argument}]"
+        return f"{argument!r} in s", f"s[{argument!r}]"
+
+
+def compile_filter(text: str) -> FilterExpression:
+    """Parse and compile a filter expression (raises FilterSyntaxError)"""
+    return FilterExpression(text)
@@ -0,0 +1,144 @@
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+import logging
+
+
+@dataclass(eq=False)
+class Subscription:
+    """A handler and the frames it wants (no topics = every frame)"""
+    handler: Callable
+    can_ids: Optional[frozenset] = None
+    message_names: Optional[frozenset] = None
+    signals: Optional[frozenset] = None
+    batch: bool = False
+    order: int = 0
+    pending: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def wildcard(self) -> bool:
+        return self.can_ids is None and self.message_names is None and self.signals is None
+
+
+class HandlerDispatcher:
+    """Routes processed frames to the handlers subscribed to their ID, message or signals.
+
+    The subscribers of each (ID, message name) pair are resolved once and
+    cached, so a frame costs one dict lookup plus a call per interested
+    handler, however many handlers are registered. Signal subscriptions are
+    routed through the DBC definition of the message; multiplexed signals
+    are checked against the decoded values. Batch subscribers receive lists
+    of frames when flush() is called.
+    """
+
+    def __init__(self, dbc_parser=None):
+        self.logger = logging.getLogger(__name__)
+        self.dbc_parser = dbc_parser
+        self.subscriptions: List[Subscription] = []
+        self.by_id: Dict[int, List[Subscription]] = {}
+        self.by_name: Dict[str, List[Subscription]] = {}
+        self.by_signal: Dict[str, List[Subscription]] = {}
+        self.wildcard: List[Subscription] = []
+        self._routes: Dict[Tuple[int, Optional[str]], Tuple[Tuple[Subscription, Optional[frozenset]], ...]] = {}
+        self._routes_messages = None
+        self._order = itertools.count()
+
+    def subscribe(self, handler: Callable, can_ids: Optional[Iterable[int]] = None,
+                  message_names: Optional[Iterable[str]] = None, signals: Optional[Iterable[str]] = None,
+                  batch: bool = False) -> Subscription:
+        """Register a handler for frames matching any of the given topics"""
+        subscription = Subscription(
+            handler,
+            frozenset(can_ids) if can_ids is not None else None,
+            frozenset(message_names) if message_names is not None else None,
+            frozenset(signals) if signals is not None else None,
+            batch,
+            next(self._order)
+        )
+        self.subscriptions = self.subscriptions + [subscription]
+        self._rebuild()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> bool:
+        if subscription not in self.subscriptions:
+            return False
+        self.subscriptions = [entry for entry in self.subscriptions if entry is not subscription]
+        self._rebuild()
+        return True
+
+    def clear(self):
+        self.subscriptions = []
+        self._rebuild()
+
+    def _rebuild(self):
+        """Rebuild the topic tables; cached routes are resolved again on demand"""
+        by_id, by_name, by_signal, wildcard = {}, {}, {}, []
+        for subscription in self.subscriptions:
+            if subscription.wildcard:
+                wildcard.append(subscription)
+            for can_id in subscription.can_ids or ():
+                by_id.setdefault(can_id, []).append(subscription)
+            for name in subscription.message_names or ():
+                by_name.setdefault(name, []).append(subscription)
+            for signal in subscription.signals or ():
+                by_signal.setdefault(signal, []).append(subscription)
+        self.by_id, self.by_name, self.by_signal, self.wildcard = by_id, by_name, by_signal, wildcard
+        self._routes = {}
+
+    def _route(self, can_id: int, name: Optional[str]):
+        """Subscribers of one (ID, message name) pair, in subscription order"""
+        matched: Dict[Subscription, Optional[frozenset]] = {}
+        for subscription in itertools.chain(self.wildcard, self.by_id.get(can_id, ()),
+                                            self.by_name.get(name, ()) if name else ()):
+            matched[subscription] = None
+
+        if self.by_signal and name:
+            message = self.dbc_parser.messages.get(name) if self.dbc_parser else None
+            names = ({signal.name for signal in message.signals} if message is not None
+                     else self.by_signal.keys())
+            for signal in names:
+                for subscription in self.by_signal.get(signal, ()):
+                    if subscription in matched and matched[subscription] is None:
+                        continue
+                    # Only multiplexed signals can be missing from a decoded frame
+                    matched[subscription] = subscription.signals
+
+        route = tuple(sorted(matched.items(), key=lambda item: item[0].order))
+        self._routes[(can_id, name)] = route
+        return route
+
+    def dispatch(self, message_data: Dict[str, Any]):
+        """Hand a frame to its subscribers (batch subscribers get it on flush())"""
+        if self.dbc_parser is not None and self.dbc_parser.messages is not self._routes_messages:
+            # A database was (re)loaded, so message definitions may have changed
+            self._routes = {}
+            self._routes_messages = self.dbc_parser.messages
+
+        name = message_data.get('message_name')
+        route = self._routes.get((message_data['can_id'], name))
+        if route is None:
+            route = self._route(message_data['can_id'], name)
+
+        for subscription, signals in route:
+            if signals is not None:
+                decoded = message_data.get('decoded_signals')
+                if not decoded or signals.isdisjoint(decoded):
+                    continue
+            if subscription.batch:
+                subscription.pending.append(message_data)
+                continue
+            try:
+                subscription.handler(message_data)
+            except Exception as e:
+                self.logger.error(f"Error in message handler: {e}")
+
+    def flush(self):
+        """Deliver the frames collected for batch subscribers"""
+        for subscription in self.subscriptions:
+            if not subscription.batch or not subscription.pending:
+                continue
+            batch, subscription.pending = subscription.pending, []
+            try:
+                subscription.handler(batch)
+            except Exception as e:
+                self.logger.error(f"Error in batch handler: {e}")
@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+# Protocol control information frame types (high nibble of the first byte)
+PCI_SINGLE_FRAME = 0x0
+PCI_FIRST_FRAME = 0x1
+PCI_CONSECUTIVE_FRAME = 0x2
+PCI_FLOW_CONTROL = 0x3
+
+FLOW_STATUS_OVERFLOW = 0x2
+
+# 29-bit normal fixed addressing (ISO 15765-4): 0x18DA<target><source>
+FIXED_ADDRESSING_MASK = 0x1FFF0000
+FIXED_PHYSICAL = 0x18DA0000
+FIXED_FUNCTIONAL = 0x18DB0000
+
+
+@dataclass
+class IsoTpSession:
+    channel: Any
+    tx_id: int
+    rx_id: Optional[int]
+    size: int
+    buffer: bytearray
+    next_sequence: int
+    started: float
+    last_update: float
+    frame_count: int = 1
+
+
+class IsoTpReassembler:
+    """Streaming ISO 15765-2 reassembly of passively captured diagnostic traffic.
+
+    Sessions are tracked per (channel, tx ID, rx ID), where tx ID carries the
+    data and rx ID is the paired ID the flow control comes back on. Memory is
+    bounded by max_sessions and max_pdu_size, and sessions that stop
+    receiving consecutive frames expire after timeout seconds (N_Cr).
+    """
+
+    def __init__(self, timeout: float = 1.0, max_sessions: int = 64,
+                 max_pdu_size: int = 4095, auto_detect: bool = True):
+        self.logger = logging.getLogger(__name__)
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.max_pdu_size = max_pdu_size
+        self.auto_detect = auto_detect
+        self.pairs: Dict[int, int] = {}
+        self.sessions: Dict[Tuple[Any, int, Optional[int]], IsoTpSession] = {}
+        self.stats = {
+            'pdus': 0,
+            'single_frames': 0,
+            'multi_frame_pdus': 0,
+            'sequence_errors': 0,
+            'timeouts': 0,
+            'aborted': 0,
+            'dropped': 0
+        }
+
+        if auto_detect:
+            # OBD/UDS 11-bit physical request/response IDs
+            for offset in range(8):
+                self.add_address_pair(0x7E0 + offset, 0x7E8 + offset)
+
+    def add_address_pair(self, tx_id: int, rx_id: int):
+        """Register a request/response ID pair (both directions are reassembled)"""
+        self.pairs[tx_id] = rx_id
+        self.pairs[rx_id] = tx_id
+
+    def is_diagnostic_id(self, can_id: int) -> bool:
+        """Cheap check used by the pipeline to skip non diagnostic traffic"""
+        if can_id in self.pairs:
+            return True
+        return self.auto_detect and (can_id & FIXED_ADDRESSING_MASK) in (FIXED_PHYSICAL, FIXED_FUNCTIONAL)
+
+    def _paired_id(self, can_id: int) -> Optional[int]:
+        rx_id = self.pairs.get(can_id)
+        if rx_id is None and (can_id & FIXED_ADDRESSING_MASK) == FIXED_PHYSICAL:
+            # Swap target and source address bytes
+            rx_id = FIXED_PHYSICAL | ((can_id & 0xFF) << 8) | ((can_id >> 8) & 0xFF)
+        return rx_id
+
+    def feed(self, channel, can_id: int, data: bytes, timestamp: float) -> Optional[Dict[str, Any]]:
+        """Feed one frame; returns a complete PDU dict when one finishes"""
+        if not data:
+            return None
+
+        frame_type = data[0] >> 4
+        if frame_type == PCI_SINGLE_FRAME:
+            return self._single_frame(channel, can_id, data, timestamp)
+        if frame_type == PCI_CONSECUTIVE_FRAME:
+            return self._consecutive_frame(channel, can_id, data, timestamp)
+        if frame_type == PCI_FIRST_FRAME:
+            self._first_frame(channel, can_id, data, timestamp)
+        elif frame_type == PCI_FLOW_CONTROL:
+            self._flow_control(channel, can_id, data)
+        return None
+
+    def expire(self, now: float):
+        """Drop sessions whose next consecutive frame never arrived"""
+        expired = [key for key, session in self.sessions.items()
+                   if now - session.last_update > self.timeout]
+        for key in expired:
+            del self.sessions[key]
+            self.stats['timeouts'] += 1
+
+    def _single_frame(self, channel, can_id, data, timestamp):
+        size = data[0] & 0x0F
+        start = 1
+        if size == 0 and len(data) > 8:
+            # CAN FD single frame escape: length in the second byte
+            size = data[1]
+            start = 2
+        if size == 0 or start + size > len(data):
+            return None
+
+        self.stats['single_frames'] += 1
+        return self._pdu(channel, can_id, self._paired_id(can_id), bytes(data[start:start + size]),
+                         timestamp, timestamp, 1)
+
+    def _first_frame(self, channel, can_id, data, timestamp):
+        if len(data) < 2:
+            return
+        size = ((data[0] & 0x0F) << 8) | data[1]
+        start = 2
+        if size == 0 and len(data) >= 6:
+            # Escape sequence for PDUs above 4095 bytes
+            size = int.from_bytes(data[2:6], 'big')
+            start = 6
+
+        if size > self.max_pdu_size:
+            self.stats['dropped'] += 1
+            return
+
+        rx_id = self._paired_id(can_id)
+        key = (channel, can_id, rx_id)
+        if key not in self.sessions and len(self.sessions) >= self.max_sessions:
+            self.expire(timestamp)
+            if len(self.sessions) >= self.max_sessions:
+                self.stats['dropped'] += 1
+                return
+
+        # A new first frame silently replaces an unfinished transfer on the same IDs
+        buffer = bytearray(data[start:])
+        self.sessions[key] = IsoTpSession(channel, can_id, rx_id, size, buffer, 1, timestamp, timestamp)
+
+    def _consecutive_frame(self, channel, can_id, data, timestamp):
+        key = (channel, can_id, self._paired_id(can_id))
+        session = self.sessions.get(key)
+        if session is None:
+            return None
+
+        if timestamp - session.last_update > self.timeout:
+            del self.sessions[key]
+            self.stats['timeouts'] += 1
+            return None
+
+        sequence = data[0] & 0x0F
+        if sequence != session.next_sequence:
+            del self.sessions[key]
+            self.stats['sequence_errors'] += 1
+            return None
+
+        session.buffer += data[1:]
+        session.next_sequence = (sequence + 1) & 0x0F
+        session.last_update = timestamp
+        session.frame_count += 1
+
+        if len(session.buffer) < session.size:
+            return None
+
+        del self.sessions[key]
+        self.stats['multi_frame_pdus'] += 1
+        return self._pdu(channel, can_id, session.rx_id, bytes(session.buffer[:session.size]),
+                         session.started, timestamp, session.frame_count)
+
+    def _flow_control(self, channel, can_id, data):
+        # Flow control is sent by the receiver, on the ID paired with the data sender
+        if (data[0] & 0x0F) == FLOW_STATUS_OVERFLOW:
+            sender = self._paired_id(can_id)
+            if sender is not None and self.sessions.pop((channel, sender, can_id), None):
+                self.stats['aborted'] += 1
+
+    def _pdu(self, channel, tx_id, rx_id, payload, started, finished, frame_count):
+        self.stats['pdus'] += 1
+        return {
+            'channel': channel,
+            'tx_id': tx_id,
+            'rx_id': rx_id,
+            'data': payload,
+            'timestamp': finished,
+            'start_timestamp': started,
+            'frame_count': frame_count
+        }
+
+    def get_active_sessions(self) -> List[IsoTpSession]:
+        """Get transfers that are still in progress"""
+        return list(self.sessions.values())
@@ -0,0 +1,160 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+# Transport protocol parameter groups
+PGN_TP_CM = 0xEC00
+PGN_TP_DT = 0xEB00
+
+# TP.CM control bytes
+TP_CM_RTS = 16
+TP_CM_CTS = 17
+TP_CM_END_OF_MSG_ACK = 19
+TP_CM_BAM = 32
+TP_CM_ABORT = 255
+
+GLOBAL_ADDRESS = 0xFF
+
+# Highest 11-bit identifier; anything above is treated as a 29-bit J1939 ID
+MAX_STANDARD_ID = 0x7FF
+
+
+def parse_j1939_id(can_id: int) -> Tuple[int, int, int, int]:
+    """Split a 29-bit identifier into (priority, PGN, source, destination)"""
+    priority = (can_id >> 26) & 0x7
+    pdu_format = (can_id >> 16) & 0xFF
+    pdu_specific = (can_id >> 8) & 0xFF
+    source = can_id & 0xFF
+
+    if pdu_format < 240:
+        # PDU1: PS is the destination address and not part of the PGN
+        pgn = (can_id >> 8) & 0x3FF00
+        destination = pdu_specific
+    else:
+        # PDU2: PS is the group extension, always broadcast
+        pgn = (can_id >> 8) & 0x3FFFF
+        destination = GLOBAL_ADDRESS
+    return priority, pgn, source, destination
+
+
+def j1939_pgn(can_id: int) -> int:
+    """Masked lookup key of a 29-bit identifier (its PGN)"""
+    if ((can_id >> 16) & 0xFF) < 240:
+        return (can_id >> 8) & 0x3FF00
+    return (can_id >> 8) & 0x3FFFF
+
+
+@dataclass
+class TransportSession:
+    pgn: int
+    size: int
+    packet_count: int
+    source: int
+    destination: int
+    mode: str
+    started: float
+    last_update: float
+    buffer: bytearray = field(default_factory=bytearray)
+    received: set = field(default_factory=set)
+
+
+class J1939TransportReassembler:
+    """Reassembles BAM and CMDT (RTS/CTS) transfers from passively observed traffic"""
+
+    def __init__(self, timeout: float = 1.25, max_sessions: int = 256):
+        self.logger = logging.getLogger(__name__)
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.sessions: Dict[Tuple[Any, int, int], TransportSession] = {}
+        self.stats = {
+            'completed': 0,
+            'aborted': 0,
+            'timed_out': 0,
+            'dropped': 0
+        }
+
+    def feed(self, channel, can_id: int, data: bytes, timestamp: float) -> Optional[Dict[str, Any]]:
+        """Feed one TP.CM or TP.DT frame; returns the transported message once complete"""
+        _, pgn, source, destination = parse_j1939_id(can_id)
+        if pgn == PGN_TP_CM:
+            self._handle_cm(channel, source, destination, data, timestamp)
+            return None
+        if pgn == PGN_TP_DT:
+            return self._handle_dt(channel, source, destination, data, timestamp)
+        return None
+
+    def expire(self, now: float):
+        """Drop sessions that stopped receiving data"""
+        expired = [key for key, session in self.sessions.items()
+                   if now - session.last_update > self.timeout]
+        for key in expired:
+            del self.sessions[key]
+            self.stats['timed_out'] += 1
+
+    def _handle_cm(self, channel, source, destination, data, timestamp):
+        if len(data) < 8:
+            return
+        control = data[0]
+        key = (channel, source, destination)
+
+        if control in (TP_CM_BAM, TP_CM_RTS):
+            size = data[1] | (data[2] << 8)
+            packet_count = data[3]
+            if packet_count == 0 or size > packet_count * 7:
+                return
+            self.expire(timestamp)
+            if key not in self.sessions and len(self.sessions) >= self.max_sessions:
+                self.stats['dropped'] += 1
+                return
+            self.sessions[key] = TransportSession(
+                pgn=data[5] | (data[6] << 8) | (data[7] << 16),
+                size=size,
+                packet_count=packet_count,
+                source=source,
+                destination=destination,
+                mode='BAM' if control == TP_CM_BAM else 'CMDT',
+                started=timestamp,
+                last_update=timestamp,
+                buffer=bytearray(packet_count * 7)
+            )
+        elif control == TP_CM_ABORT:
+            # Aborts travel from the receiver back to the originator
+            if self.sessions.pop((channel, destination, source), None) or self.sessions.pop(key, None):
+                self.stats['aborted'] += 1
+
+    def _handle_dt(self, channel, source, destination, data, timestamp):
+        session = self.sessions.get((channel, source, destination))
+        if session is None or len(data) < 2:
+            return None
+        if timestamp - session.last_update > self.timeout:
+            del self.sessions[(channel, source, destination)]
+            self.stats['timed_out'] += 1
+            return None
+
+        sequence = data[0]
+        if not 1 <= sequence <= session.packet_count:
+            return None
+
+        offset = (sequence - 1) * 7
+        chunk = bytes(data[1:8])
+        session.buffer[offset:offset + len(chunk)] = chunk
+        session.received.add(sequence)
+        session.last_update = timestamp
+
+        if len(session.received) < session.packet_count:
+            return None
+
+        del self.sessions[(channel, source, destination)]
+        self.stats['completed'] += 1
+        return {
+            'pgn': session.pgn,
+            'data': bytes(session.buffer[:session.size]),
+            'source_address': session.source,
+            'destination_address': session.destination,
+            'transport': session.mode,
+            'duration': timestamp - session.started
+        }
+
+    def get_active_sessions(self) -> List[TransportSession]:
+        """Get transfers that are still in progress"""
+        return list(self.sessions.values())
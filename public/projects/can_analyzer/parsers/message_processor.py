@@ -1,35 +1,85 @@
+import heapq
 import threading
 import time
+import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Iterable, Iterator, Union
 from queue import Queue, Empty
 from loggers.data_logger import DataLogger
-import re
+from hardware.flow_control import FlowMonitor, POLICY_BLOCK
+from .isotp import IsoTpReassembler
+from .uds_decoder import UDSDecoder
+from .decode_pool import DecodePool
+from .message_store import MessageStore
+from .message_statistics import MessageStatistics
+from .filter_expression import FilterExpression, compile_filter
+from .handler_dispatch import HandlerDispatcher, Subscription
+from .delta_filter import DeltaFilter
+from .trigger_capture import TriggerCapture
 
 class MessageProcessor:
-    def __init__(self, dbc_parser=None, cdd_parser=None):
+    """Filters, decodes and dispatches CAN frames in a background pipeline.
+
+    With decode_workers > 0 the pipeline runs in three stages: an intake
+    thread filters frames and sends them in batches to a DBC decode pool of
+    worker processes, and a delivery thread takes the decoded batches back
+    through a reorder buffer, so ISO-TP reassembly, DTC detection and
+    handlers see the frames in the order they were queued. Otherwise one
+    thread handles each frame from start to end.
+    """
+    
+    def __init__(self, dbc_parser=None, cdd_parser=None, decode_workers: int = 0,
+                 batch_size: int = 256, max_batches_in_flight: int = 0,
+                 history_size: int = 10000, history_max_age: Optional[float] = None,
+                 history_max_bytes: Optional[int] = None, flow: Optional[FlowMonitor] = None,
+                 queue_size: int = 100000, queue_policy: str = POLICY_BLOCK):
         self.logger = logging.getLogger(__name__)
         self.dbc_parser = dbc_parser
         self.cdd_parser = cdd_parser
-        self.message_queue = Queue()
-        self.processed_messages = []
+        # Bounded input; by default add_message() blocks, pushing back on the producer
+        self.flow = flow or FlowMonitor()
+        self.message_queue = self.flow.stage('processor_input', queue_size, queue_policy)
+        # Retained history; readers take views instead of copies
+        self.processed_messages = MessageStore(history_size, history_max_age, history_max_bytes)
+        self.id_statistics = MessageStatistics()
         self.filters = []
-        self.handlers = []
+        self.filter_expressions: List[str] = []
+        self.filter_expression: Optional[FilterExpression] = None  # All expressions, compiled as one
+        self.dispatcher = HandlerDispatcher(dbc_parser)
+        self.pdu_handlers = []
+        self.isotp = None
+        self.uds_decoder = None
+        self.heuristic_dtc_scan = False  # Legacy pattern scan of decoded signal values
+        self.delta_filter: Optional[DeltaFilter] = None  # Change-only mode, see enable_delta_mode()
+        self.trigger_capture: Optional[TriggerCapture] = None
         self.is_processing = False
         self.processing_thread = None
         
+        # Parallel decode stage
+        self.decode_workers = decode_workers
+        self.batch_size = batch_size
+        self.decode_pool = None
+        self.delivery_thread = None
+        # Decoded batches wait here until every earlier batch has been delivered
+        self.reorder_buffer = Queue(maxsize=max_batches_in_flight or max(2 * decode_workers, 2))
+        
         # Statistics
         self.stats = {
             'total_processed': 0,
             'rx_count': 0,
             'tx_count': 0,
             'decoded_count': 0,
-            'error_count': 0
+            'error_count': 0,
+            'pdu_count': 0,
+            'delta_suppressed': 0
         }
         
-    def add_message(self, message_data: Dict[str, Any]):
-        """Add a raw message to the processing queue"""
-        self.message_queue.put(message_data)
+        if cdd_parser:
+            self.set_cdd_parser(cdd_parser)
+        
+    def add_message(self, message_data: Dict[str, Any]) -> bool:
+        """Add a raw message to the processing queue; False if the queue policy dropped it"""
+        return self.message_queue.put(message_data)
         
     def start_processing(self):
         """Start the message processing thread"""
@@ -37,7 +87,14 @@ class MessageProcessor:
             return
             
         self.is_processing = True
-        self.processing_thread = threading.Thread(target=self._processing_loop)
+        if self.decode_workers > 0 and self.dbc_parser:
+            self.decode_pool = DecodePool(self.dbc_parser, self.decode_workers)
+            self.processing_thread = threading.Thread(target=self._intake_loop)
+            self.delivery_thread = threading.Thread(target=self._delivery_loop)
+            self.delivery_thread.daemon = True
+            self.delivery_thread.start()
+        else:
+            self.processing_thread = threading.Thread(target=self._processing_loop)
         self.processing_thread.daemon = True
         self.processing_thread.start()
         self.logger.info("Message processor started")
@@ -47,15 +104,31 @@ class MessageProcessor:
         self.is_processing = False
         if self.processing_thread:
             self.processing_thread.join(timeout=5.0)
+        if self.delivery_thread:
+            self.delivery_thread.join(timeout=5.0)
+            self.delivery_thread = None
+        if self.decode_pool:
+            self.decode_pool.shutdown()
+            self.decode_pool = None
+        if self.trigger_capture:
+            # A post-trigger window still open would otherwise wait for the next frame
+            self.trigger_capture.flush()
         self.logger.info("Message processor stopped")
         
     def _processing_loop(self):
         """Main processing loop"""
+        unflushed = 0
         while self.is_processing:
             try:
                 # Get message with timeout to allow checking is_processing
                 message_data = self.message_queue.get(timeout=0.1)
                 self._process_single_message(message_data)
+                
+                # Batch handlers get a batch when the queue runs dry or batch_size frames are collected
+                unflushed += 1
+                if unflushed >= self.batch_size or self.message_queue.empty():
+                    self.dispatcher.flush()
+                    unflushed = 0
                 self.message_queue.task_done()
                 
             except Empty:
@@ -64,60 +137,270 @@ class MessageProcessor:
                 self.logger.error(f"Error in processing loop: {e}")
                 self.stats['error_count'] += 1
                 
-    def _process_single_message(self, message_data: Dict[str, Any]):
-        """Process a single CAN message"""
+    def _intake_loop(self):
+        """Filter queued frames and hand them to the decode pool in batches"""
+        while self.is_processing:
+            try:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                    
+                messages = [message_data for message_data in batch if self._apply_filters(message_data)]
+                if self.delta_filter is not None:
+                    # Unchanged frames skip the pool; delivery accounts them in order
+                    for message_data in messages:
+                        if not self._delta_payload_changed(message_data):
+                            message_data['delta_suppressed'] = True
+                # Frames depending on earlier frames are decoded in order by the delivery stage
+                sequential = self.dbc_parser.needs_sequential_decode
+                frames = [None if sequential(message_data['can_id']) or message_data.get('delta_suppressed') else
+                          (message_data['can_id'], message_data['data'], message_data.get('channel'))
+                          for message_data in messages]
+                future = self.decode_pool.submit(frames) if messages else None
+                
+                # Blocks while the pool is max_batches_in_flight batches behind
+                self.reorder_buffer.put((messages, future, len(batch)))
+                
+            except Exception as e:
+                self.logger.error(f"Error in intake loop: {e}")
+                self.stats['error_count'] += 1
+                
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Wait for one frame, then take whatever else is queued up to batch_size"""
         try:
-            # Apply filters
-            if not self._apply_filters(message_data):
-                return
+            batch = [self.message_queue.get(timeout=0.1)]
+        except Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.message_queue.get_nowait())
+            except Empty:
+                break
+        return batch
+        
+    def _delivery_loop(self):
+        """Finish decoded batches strictly in the order they were submitted"""
+        while self.is_processing or not self.reorder_buffer.empty():
+            try:
+                messages, future, count = self.reorder_buffer.get(timeout=0.1)
+            except Empty:
+                continue
                 
-            # Decode with DBC if available
-            decoded_data = None
-            if self.dbc_parser:
-                decoded_data = self.dbc_parser.decode_message(
-                    message_data['can_id'], message_data['data']
-                )
+            try:
+                results = future.result() if future is not None else []
+            except Exception as e:
+                # Decode the batch here rather than losing it
+                self.logger.error(f"Decode pool failed: {e}")
+                self.stats['error_count'] += 1
+                results = [None] * len(messages)
+                future = None
                 
-                if decoded_data:
-                    message_data['message_name'] = decoded_data['message_name']
-                    message_data['decoded_signals'] = decoded_data['signals']
-                    message_data['decoded'] = True
-                    self.stats['decoded_count'] += 1
-                else:
-                    message_data['decoded'] = False
-            
-            # Check for DTCs if CDD parser available
-            if self.cdd_parser:
-                self._check_for_dtcs(message_data)
-            
-            # Update statistics
-            self.stats['total_processed'] += 1
-            if message_data.get('is_rx', True):
-                self.stats['rx_count'] += 1
-            else:
-                self.stats['tx_count'] += 1
-            
-            # Store processed message
-            message_data['processed_timestamp'] = datetime.now()
-            self.processed_messages.append(message_data)
-            
-            # Limit stored messages to prevent memory issues
-            if len(self.processed_messages) > 10000:
-                self.processed_messages = self.processed_messages[-5000:]
-            
-            # Call handlers
-            for handler in self.handlers:
+            for message_data, decoded_data in zip(messages, results):
                 try:
-                    handler(message_data)
+                    if message_data.get('delta_suppressed'):
+                        self._account_suppressed(message_data)
+                        continue
+                    if decoded_data is None and (future is None or
+                                                 self.dbc_parser.needs_sequential_decode(message_data['can_id'])):
+                        decoded_data = self._decode_message(message_data)
+                    self._complete_message(message_data, decoded_data)
                 except Exception as e:
-                    self.logger.error(f"Error in message handler: {e}")
+                    self.logger.error(f"Error processing message: {e}")
+                    self.stats['error_count'] += 1
+                    
+            self.dispatcher.flush()
+            for _ in range(count):
+                self.message_queue.task_done()
+                
+    def _process_single_message(self, message_data: Dict[str, Any],
+                                processed_timestamp: Optional[datetime] = None) -> bool:
+        """Process a single CAN message; False if it was filtered, suppressed or failed"""
+        try:
+            if not self._apply_filters(message_data):
+                return False
+            if self.delta_filter is not None and not self._delta_payload_changed(message_data):
+                self._account_suppressed(message_data)
+                return False
+                
+            decoded_data = self._decode_message(message_data) if self.dbc_parser else None
+            return self._complete_message(message_data, decoded_data, processed_timestamp)
                     
         except Exception as e:
             self.logger.error(f"Error processing message: {e}")
             self.stats['error_count'] += 1
+            return False
+            
+    def process_batch(self, frames: Union[Iterable[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process logged frames synchronously and return the ones that passed (see process_iter)"""
+        return list(self.process_iter(frames))
+        
+    def process_iter(self, frames: Union[Iterable[Dict[str, Any]], Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Process logged frames on the calling thread, yielding each processed frame.
+        
+        Runs the same filtering, decoding, delta, DTC and handler stages as
+        the background thread, in input order, without queues or waits.
+        Times come from the frames only: processed_timestamp is the frame's
+        own timestamp, so the same input always gives the same output.
+        
+        frames is an iterable of message dicts or a columnar dict of equal
+        length sequences ('timestamp', 'can_id', 'data' and optionally
+        'channel', 'dlc', 'is_rx'); timestamps may be datetimes or POSIX
+        seconds.
+        """
+        if self.is_processing:
+            raise RuntimeError("process_iter() cannot run while the processing thread is active")
+            
+        if isinstance(frames, dict):
+            frames = self._frames_from_columns(frames)
+        process = self._process_single_message
+        unflushed = 0
+        try:
+            for message_data in frames:
+                timestamp = message_data['timestamp']
+                if not isinstance(timestamp, datetime):
+                    timestamp = message_data['timestamp'] = datetime.fromtimestamp(timestamp)
+                if process(message_data, timestamp):
+                    yield message_data
+                unflushed += 1
+                if unflushed >= self.batch_size:
+                    self.dispatcher.flush()
+                    unflushed = 0
+        finally:
+            self.dispatcher.flush()
+            if self.trigger_capture:
+                self.trigger_capture.flush()
+                
+    def _frames_from_columns(self, columns: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Message dicts from a columnar batch, one row at a time"""
+        optional = [name for name in ('channel', 'dlc', 'is_rx') if name in columns]
+        rows = zip(columns['timestamp'], columns['can_id'], columns['data'],
+                   *(columns[name] for name in optional))
+        for timestamp, can_id, data, *extra in rows:
+            message_data = {
+                'timestamp': timestamp,
+                'can_id': int(can_id),
+                'data': bytes(data),
+                'is_rx': True
+            }
+            message_data.update(zip(optional, extra))
+            message_data.setdefault('dlc', len(message_data['data']))
+            yield message_data
+            
+    def _decode_message(self, message_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """DBC decode stage"""
+        return self.dbc_parser.decode_message(
+            message_data['can_id'], message_data['data'], message_data.get('channel'),
+            message_data['timestamp'].timestamp()
+        )
+        
+    def _complete_message(self, message_data: Dict[str, Any], decoded_data: Optional[Dict[str, Any]],
+                          processed_timestamp: Optional[datetime] = None) -> bool:
+        """In-order stage: reassembly, DTC detection, statistics, storage and handlers"""
+        delta = self.delta_filter
+        if delta is not None and delta.uses_signals(message_data['can_id']):
+            if not delta.check_signals(message_data, decoded_data['signals'] if decoded_data else None):
+                self._account_suppressed(message_data)
+                return False
+                
+        # Reassemble multi-frame diagnostic PDUs (only diagnostic IDs pay for this)
+        isotp = self.isotp
+        if isotp is not None and isotp.is_diagnostic_id(message_data['can_id']):
+            self._reassemble_isotp(message_data)
+            
+        if self.dbc_parser:
+            if decoded_data:
+                message_data['message_name'] = decoded_data['message_name']
+                message_data['decoded_signals'] = decoded_data['signals']
+                message_data['decoded'] = True
+                self.stats['decoded_count'] += 1
+            else:
+                message_data['decoded'] = False
+        
+        # DTCs normally come from decoded UDS responses; the signal scan is opt-in
+        if self.heuristic_dtc_scan and self.cdd_parser:
+            self._check_for_dtcs(message_data)
+            
+        # Filter terms on message names, signals and DTCs can only be checked now
+        expression = self.filter_expression
+        if expression is not None and expression.match_decoded is not None and not expression.match_decoded(message_data):
+            return False
+        
+        # Update statistics
+        self.id_statistics.update_message(message_data)
+        self.stats['total_processed'] += 1
+        if message_data.get('is_rx', True):
+            self.stats['rx_count'] += 1
+        else:
+            self.stats['tx_count'] += 1
+        
+        # Store processed message (the ring evicts the oldest ones)
+        message_data['processed_timestamp'] = processed_timestamp or datetime.now()
+        self.processed_messages.append(message_data)
+        
+        if self.trigger_capture is not None:
+            self.trigger_capture.feed(message_data)
+            
+        # Call the handlers subscribed to this frame
+        self.dispatcher.dispatch(message_data)
+        return True
+            
+    def _delta_payload_changed(self, message_data: Dict[str, Any]) -> bool:
+        """Delta mode payload check; diagnostic frames always pass (ISO-TP needs every one)"""
+        isotp = self.isotp
+        if isotp is not None and isotp.is_diagnostic_id(message_data['can_id']):
+            return True
+        return self.delta_filter.check_payload(message_data)
+        
+    def _account_suppressed(self, message_data: Dict[str, Any]):
+        """A frame dropped by delta mode still counts for the per-ID timing statistics"""
+        self.id_statistics.update_message(message_data)
+        self.stats['delta_suppressed'] += 1
+        
+    def _reassemble_isotp(self, message_data: Dict[str, Any]):
+        """Feed a diagnostic frame to the ISO-TP stage and dispatch finished PDUs"""
+        pdu = self.isotp.feed(
+            message_data.get('channel'), message_data['can_id'], message_data['data'],
+            message_data['timestamp'].timestamp()
+        )
+        if pdu is None:
+            return
+            
+        message_data['isotp_pdu'] = pdu
+        self.stats['pdu_count'] += 1
+        if self.uds_decoder:
+            self._decode_uds(message_data, pdu)
+            
+        for handler in self.pdu_handlers:
+            try:
+                handler(pdu)
+            except Exception as e:
+                self.logger.error(f"Error in PDU handler: {e}")
+            
+    def _decode_uds(self, message_data: Dict[str, Any], pdu: Dict[str, Any]):
+        """Decode a diagnostic response and attach the DTCs it reports"""
+        response = self.uds_decoder.decode_pdu(pdu)
+        if not response:
+            return
+            
+        message_data['uds_response'] = response
+        for dtc in response.get('dtcs', []):
+            if not dtc['info']:
+                continue
+            message_data.setdefault('detected_dtcs', []).append({
+                'code': dtc['info'].get('code', dtc['code']),
+                'number': dtc['number'],
+                'status': dtc['status'],
+                'info': dtc['info'],
+                'source_signal': None,
+                'timestamp': message_data['timestamp']
+            })
             
     def _apply_filters(self, message_data: Dict[str, Any]) -> bool:
         """Apply registered filters to the message"""
+        expression = self.filter_expression
+        if expression is not None and expression.match_raw is not None and not expression.match_raw(message_data):
+            return False
+            
         if not self.filters:
             return True
             
@@ -131,76 +414,188 @@ class MessageProcessor:
         return True
         
     def _check_for_dtcs(self, message_data: Dict[str, Any]):
-        """Check if message contains DTC information"""
+        """Check if decoded signal values name a known DTC"""
         if not self.cdd_parser or not message_data.get('decoded_signals'):
             return
             
-        # Look for DTCs in decoded signals
+        matcher = self.cdd_parser.get_dtc_matcher()
+        if not matcher.sae_codes:
+            return
+            
+        # Only text values (value table names) can carry a code like P0123
         for signal_name, signal_value in message_data['decoded_signals'].items():
-            # Convert signal value to string and check for DTC patterns
-            signal_str = str(signal_value).upper()
-            
-            # Common DTC patterns (P0, P1, P2, P3 codes)
-            dtc_patterns = [
-                r'P[0-3][0-9A-F]{3}',
-                r'C[0-3][0-9A-F]{3}',
-                r'B[0-3][0-9A-F]{3}',
-                r'U[0-3][0-9A-F]{3}'
-            ]
-            
-            for pattern in dtc_patterns:
-                matches = re.findall(pattern, signal_str)
-                for match in matches:
-                    dtc_info = self.cdd_parser.get_dtc_info(match)
-                    if dtc_info:
-                        message_data['detected_dtcs'] = message_data.get('detected_dtcs', [])
-                        message_data['detected_dtcs'].append({
-                            'code': match,
-                            'info': dtc_info,
-                            'source_signal': signal_name,
-                            'timestamp': message_data['timestamp']
-                        })
+            if isinstance(signal_value, (int, float)):
+                continue
+            for code, dtc_info in matcher.scan_text(str(signal_value)):
+                message_data.setdefault('detected_dtcs', []).append({
+                    'code': code,
+                    'info': dtc_info,
+                    'source_signal': signal_name,
+                    'timestamp': message_data['timestamp']
+                })
     
-    def add_filter(self, filter_func: Callable[[Dict], bool]):
-        """Add a message filter function"""
-        self.filters.append(filter_func)
+    def add_filter(self, filter_func: Union[str, Callable[[Dict], bool]]):
+        """Add a message filter function or filter expression (see FilterExpression)"""
+        if isinstance(filter_func, str):
+            expressions = self.filter_expressions + [filter_func]
+            self.filter_expression = compile_filter(' and '.join(f"({text})" for text in expressions))
+            self.filter_expressions = expressions
+        else:
+            self.filters.append(filter_func)
         
     def add_handler(self, handler_func: Callable[[Dict], None]):
         """Add a message handler function"""
-        self.handlers.append(handler_func)
+        self.dispatcher.subscribe(handler_func)
+        
+    def subscribe(self, handler_func: Callable, can_ids: Optional[List[int]] = None,
+                  message_names: Optional[List[str]] = None, signals: Optional[List[str]] = None,
+                  batch: bool = False) -> Subscription:
+        """Add a handler for frames with one of the IDs, message names or signals.
+        
+        With batch=True the handler is called with lists of frames instead.
+        """
+        return self.dispatcher.subscribe(handler_func, can_ids, message_names, signals, batch)
+        
+    def unsubscribe(self, subscription: Subscription) -> bool:
+        """Remove a handler added with subscribe()"""
+        return self.dispatcher.unsubscribe(subscription)
+        
+    def enable_delta_mode(self, signals: Optional[Dict[Union[int, str], List[str]]] = None,
+                          heartbeat_interval: Optional[float] = 1.0) -> DeltaFilter:
+        """Forward only frames whose payload changed since the last forwarded one.
+        
+        signals maps IDs or DBC message names to the signals compared for
+        that message instead of the payload. An unchanged frame is still
+        forwarded every heartbeat_interval seconds (None disables that);
+        forwarded frames carry 'suppressed_count' for the frames skipped
+        before them, and get_delta_summary() has the totals per ID.
+        """
+        resolved = {}
+        for key, names in (signals or {}).items():
+            if isinstance(key, str):
+                message = self.dbc_parser.messages.get(key) if self.dbc_parser else None
+                if message is None:
+                    raise ValueError(f"Unknown message: {key}")
+                key = message.frame_id
+            resolved[key] = names
+        self.delta_filter = DeltaFilter(resolved, heartbeat_interval)
+        return self.delta_filter
+        
+    def disable_delta_mode(self):
+        """Forward every frame again"""
+        self.delta_filter = None
+        
+    def get_delta_summary(self) -> List[Dict[str, Any]]:
+        """Forwarded and suppressed frame counts per (channel, ID) in delta mode"""
+        return self.delta_filter.summary() if self.delta_filter else []
+        
+    def enable_trigger_capture(self, capture: Optional[TriggerCapture] = None, **kwargs) -> TriggerCapture:
+        """Record the frames around trigger conditions (see TriggerCapture).
+        
+        The capture sees every processed frame before the handlers do;
+        keyword arguments are passed to TriggerCapture.
+        """
+        self.disable_trigger_capture()
+        self.trigger_capture = capture or TriggerCapture(**kwargs)
+        return self.trigger_capture
+        
+    def disable_trigger_capture(self):
+        """Stop recording triggers, writing out the event in progress"""
+        if self.trigger_capture is None:
+            return
+        capture, self.trigger_capture = self.trigger_capture, None
+        capture.shutdown()
+        
+    def enable_isotp(self, reassembler: Optional[IsoTpReassembler] = None):
+        """Enable ISO-TP reassembly of diagnostic traffic in the pipeline"""
+        self.isotp = reassembler or IsoTpReassembler()
+        return self.isotp
+        
+    def set_cdd_parser(self, cdd_parser):
+        """Resolve DTCs and DIDs of diagnostic responses through a (new) CDD"""
+        self.cdd_parser = cdd_parser
+        if self.uds_decoder:
+            self.uds_decoder.set_cdd_parser(cdd_parser)
+        else:
+            self.uds_decoder = UDSDecoder(cdd_parser)
+        if self.isotp is None:
+            self.enable_isotp()
+            
+    def add_pdu_handler(self, handler_func: Callable[[Dict], None]):
+        """Add a handler for complete ISO-TP PDUs"""
+        self.pdu_handlers.append(handler_func)
         
     def clear_filters(self):
         """Clear all filters"""
         self.filters.clear()
+        self.filter_expressions = []
+        self.filter_expression = None
         
     def clear_handlers(self):
         """Clear all handlers"""
-        self.handlers.clear()
+        self.dispatcher.clear()
         
     def get_statistics(self) -> Dict[str, int]:
         """Get current processing statistics"""
         return self.stats.copy()
         
+    def get_id_statistics(self) -> Dict[str, Any]:
+        """Snapshot of the per-ID rate, period, jitter and change statistics"""
+        return self.id_statistics.snapshot()
+        
     def reset_statistics(self):
         """Reset processing statistics"""
+        self.id_statistics.reset()
+        if self.delta_filter:
+            self.delta_filter.reset()
         self.stats = {
             'total_processed': 0,
             'rx_count': 0,
             'tx_count': 0,
             'decoded_count': 0,
-            'error_count': 0
+            'error_count': 0,
+            'pdu_count': 0,
+            'delta_suppressed': 0
         }
         
-    def search_messages(self, criteria: Dict[str, Any], limit: int = 100) -> List[Dict]:
-        """Search processed messages based on criteria"""
+    def search_messages(self, criteria: Union[Dict[str, Any], str], limit: int = 100) -> List[Dict]:
+        """Search processed messages by field values or a filter expression, newest first"""
+        if isinstance(criteria, str):
+            expression = compile_filter(criteria)
+            candidates, matches = self._expression_candidates(expression), expression.match
+        else:
+            candidates, matches = self._search_candidates(criteria), lambda message: self._matches_criteria(message, criteria)
+            
         results = []
-        for message in reversed(self.processed_messages):
-            if self._matches_criteria(message, criteria):
+        for message in candidates:
+            if matches(message):
                 results.append(message)
                 if len(results) >= limit:
                     break
         return results
         
+    def _expression_candidates(self, expression: FilterExpression):
+        """Messages of the retained IDs that pass the expression's ID conditions"""
+        store = self.processed_messages
+        if expression.id_predicate is None:
+            return reversed(store)
+        can_ids = [can_id for can_id in store.index_keys('can_id') if expression.id_predicate(can_id)]
+        return self._search_candidates({'can_id': can_ids})
+        
+    def _search_candidates(self, criteria: Dict[str, Any]):
+        """Messages that can match, from an index when the criteria name an indexed field"""
+        store = self.processed_messages
+        for field in store.indexes:
+            if field not in criteria:
+                continue
+            values = criteria[field]
+            if isinstance(values, (list, tuple)):
+                seqs = heapq.merge(*(store.iter_indexed(field, value) for value in set(values)), reverse=True)
+            else:
+                seqs = store.iter_indexed(field, values)
+            return (message for message in (store.get(seq, None) for seq in seqs) if message is not None)
+        return reversed(store)
+        
     def _matches_criteria(self, message: Dict, criteria: Dict) -> bool:
         """Check if message matches search criteria"""
         for key, value in criteria.items():
@@ -218,23 +613,26 @@ class MessageProcessor:
         
     def get_message_frequency(self, can_id: int, time_window: int = 60) -> float:
         """Calculate message frequency for a specific CAN ID"""
-        now = datetime.now()
-        window_start = now.timestamp() - time_window
+        now = datetime.now().timestamp()
+        window_start = now - time_window
         
-        relevant_messages = [
-            msg for msg in self.processed_messages
-            if msg['can_id'] == can_id and 
-            msg['timestamp'].timestamp() >= window_start
-        ]
+        # Walk this ID's messages from the newest until one is outside the window
+        store = self.processed_messages
+        count = 0
+        oldest = None
+        for seq in store.iter_indexed('can_id', can_id):
+            timestamp = store.timestamp_of(seq)
+            if timestamp < window_start:
+                break
+            count += 1
+            oldest = timestamp
         
-        if not relevant_messages:
+        if not count:
             return 0.0
             
-        time_span = now.timestamp() - min(
-            msg['timestamp'].timestamp() for msg in relevant_messages
-        )
+        time_span = now - oldest
         
         if time_span == 0:
             return 0.0
             
-        return len(relevant_messages) / time_span
\ No newline at end of file
+        return count / time_span
\ No newline at end of file
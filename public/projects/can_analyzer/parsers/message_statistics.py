@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Any
+
+
+@dataclass
+class IdStatistics:
+    """Running statistics of one CAN ID (periods in seconds)"""
+    can_id: Optional[int]
+    count: int = 0
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+    ewma_period: float = 0.0
+    min_period: float = math.inf
+    max_period: float = 0.0
+    mean_period: float = 0.0
+    period_m2: float = 0.0  # Welford: sum of squared deviations from mean_period
+    dlc: int = 0
+    data: bytes = b''
+    dlc_changes: int = 0
+    payload_changes: int = 0
+
+    @property
+    def jitter(self) -> float:
+        """Standard deviation of the period"""
+        periods = self.count - 1
+        return math.sqrt(self.period_m2 / (periods - 1)) if periods > 1 else 0.0
+
+    def rate(self, now: float, idle_timeout: float) -> float:
+        """Smoothed frames per second, falling off once the ID goes quiet"""
+        if not self.ewma_period:
+            return 0.0
+        silence = now - self.last_seen
+        if silence > idle_timeout:
+            return 0.0
+        return 1.0 / max(self.ewma_period, silence)
+
+    def as_dict(self, now: float, idle_timeout: float) -> Dict[str, Any]:
+        periods = self.count > 1
+        return {
+            'can_id': self.can_id,
+            'count': self.count,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'rate': self.rate(now, idle_timeout),
+            'min_period': self.min_period if periods else None,
+            'max_period': self.max_period if periods else None,
+            'mean_period': self.mean_period if periods else None,
+            'jitter': self.jitter,
+            'dlc': self.dlc,
+            'dlc_changes': self.dlc_changes,
+            'payload_changes': self.payload_changes
+        }
+
+
+class MessageStatistics:
+    """Per-ID traffic statistics updated in O(1) per frame.
+
+    Tracks counts, an EWMA of the period (reported as a rate), min/max/mean
+    period, jitter via Welford's variance and how often the DLC and payload
+    change, for each ID and for the bus as a whole. snapshot() copies
+    everything under the update lock, so readers on other threads get
+    consistent numbers.
+    """
+
+    def __init__(self, ewma_alpha: float = 0.1, idle_timeout: float = 2.0):
+        self.ewma_alpha = ewma_alpha
+        self.idle_timeout = idle_timeout
+        self.ids: Dict[int, IdStatistics] = {}
+        self.bus = IdStatistics(None)
+        self._lock = threading.Lock()
+
+    def update(self, can_id: int, timestamp: float, data: bytes):
+        """Account one frame (timestamp as POSIX seconds)"""
+        with self._lock:
+            entry = self.ids.get(can_id)
+            if entry is None:
+                entry = self.ids[can_id] = IdStatistics(can_id)
+            self._update_entry(entry, timestamp, data)
+            self._update_entry(self.bus, timestamp, data)
+
+    def update_message(self, message_data: Dict[str, Any]):
+        """Account one message dict as produced by the capture"""
+        self.update(message_data['can_id'], message_data['timestamp'].timestamp(), message_data['data'])
+
+    def _update_entry(self, entry: IdStatistics, timestamp: float, data: bytes):
+        entry.count += 1
+        if entry.count == 1:
+            entry.first_seen = entry.last_seen = timestamp
+            entry.dlc = len(data)
+            entry.data = data
+            return
+
+        period = timestamp - entry.last_seen
+        entry.last_seen = timestamp
+        if entry.ewma_period:
+            entry.ewma_period += self.ewma_alpha * (period - entry.ewma_period)
+        else:
+            entry.ewma_period = period
+        if period < entry.min_period:
+            entry.min_period = period
+        if period > entry.max_period:
+            entry.max_period = period
+
+        periods = entry.count - 1
+        delta = period - entry.mean_period
+        entry.mean_period += delta / periods
+        entry.period_m2 += delta * (period - entry.mean_period)
+
+        if len(data) != entry.dlc:
+            entry.dlc = len(data)
+            entry.dlc_changes += 1
+        if data != entry.data:
+            entry.data = data
+            entry.payload_changes += 1
+
+    def total_rate(self, now: Optional[float] = None) -> float:
+        """Smoothed frames per second over all IDs"""
+        return self.bus.rate(now if now is not None else time.time(), self.idle_timeout)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Consistent copy of the bus totals and every ID's statistics"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            return {
+                'timestamp': now,
+                'bus': self.bus.as_dict(now, self.idle_timeout),
+                'ids': {can_id: entry.as_dict(now, self.idle_timeout) for can_id, entry in self.ids.items()}
+            }
+
+    def reset(self):
+        with self._lock:
+            self.ids = {}
+            self.bus = IdStatistics(None)
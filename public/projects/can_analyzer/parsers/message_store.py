@@ -0,0 +1,229 @@
+import sys
+import threading
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+# Rough per-message cost on top of the payload, used for byte based retention
+MESSAGE_OVERHEAD = 64
+
+
+class MessageView(Sequence):
+    """Read-only window onto a MessageStore, addressed by sequence numbers.
+
+    Nothing is copied. Messages evicted after the view was taken are
+    skipped by iteration and raise IndexError on direct access.
+    """
+
+    def __init__(self, store: 'MessageStore', first_seq: int, end_seq: int):
+        self.store = store
+        self.first_seq = first_seq
+        self.end_seq = max(end_seq, first_seq)
+
+    def __len__(self) -> int:
+        return self.end_seq - self.first_seq
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return MessageView(self.store, self.first_seq + start, self.first_seq + stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("message view index out of range")
+        return self.store.get(self.first_seq + index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        store = self.store
+        for seq in range(max(self.first_seq, store.first_seq), self.end_seq):
+            message = store.get(seq, None)
+            if message is not None:
+                yield message
+
+    def __reversed__(self) -> Iterator[Dict[str, Any]]:
+        store = self.store
+        for seq in range(self.end_seq - 1, self.first_seq - 1, -1):
+            message = store.get(seq, None)
+            if message is None:
+                # Everything older has been evicted as well
+                return
+            yield message
+
+
+class _IndexEntry:
+    """Ascending sequence numbers of the retained messages with one key value.
+
+    Evicted numbers are skipped by advancing head; the list is only
+    replaced (never shrunk in place) when compacted, so readers holding the
+    old list still see a consistent one.
+    """
+    __slots__ = ('seqs', 'head')
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+
+class MessageStore:
+    """Fixed capacity ring buffer of processed messages.
+
+    Messages are numbered with a running sequence number and kept in
+    preallocated slots, so appending and evicting are O(1) and never move
+    other messages. Besides the capacity, retention can be limited to a
+    time window (seconds of message timestamp) and an approximate byte
+    budget; the oldest messages are evicted first.
+
+    Secondary indexes (by CAN ID and message name by default) list the
+    sequence numbers per key and are updated on append and eviction, so
+    lookups cost time in proportion to the result. Slot timestamps are in
+    append order and serve as the time index (since()).
+
+    One thread appends; other threads may read. Appends and evictions hold
+    a lock that index_keys() also takes for its snapshot, and get() checks
+    that a slot was not reused while it was read.
+    """
+
+    def __init__(self, capacity: int = 10000, max_age: Optional[float] = None,
+                 max_bytes: Optional[int] = None,
+                 index_fields: Tuple[str, ...] = ('can_id', 'message_name')):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._slots = [None] * capacity
+        self._times = [0.0] * capacity
+        self._sizes = [0] * capacity
+        self._keys: List[Tuple[Tuple[str, Any], ...]] = [()] * capacity  # Index keys as of append
+        self.first_seq = 0  # oldest retained message
+        self.next_seq = 0   # sequence number of the next append
+        self.total_bytes = 0
+        self.evicted_count = 0
+        self.indexes: Dict[str, Dict[Any, _IndexEntry]] = {field: {} for field in index_fields}
+        self._lock = threading.Lock()
+
+    def append(self, message: Dict[str, Any]) -> int:
+        """Store a message, evicting old ones as needed; returns its sequence number"""
+        with self._lock:
+            if self.next_seq - self.first_seq >= self.capacity:
+                self._evict_oldest()
+
+            seq = self.next_seq
+            slot = seq % self.capacity
+            timestamp = message['timestamp'].timestamp()
+            self._slots[slot] = message
+            self._times[slot] = timestamp
+            if self.max_bytes is not None:
+                size = sys.getsizeof(message) + len(message.get('data', b'')) + MESSAGE_OVERHEAD
+                self._sizes[slot] = size
+                self.total_bytes += size
+            # Keys are kept with the slot: the message can be changed later (e.g. re-decoded)
+            keys = []
+            for field, index in self.indexes.items():
+                value = message.get(field)
+                if value is not None:
+                    entry = index.get(value)
+                    if entry is None:
+                        entry = index[value] = _IndexEntry()
+                    entry.seqs.append(seq)
+                    keys.append((field, value))
+            self._keys[slot] = tuple(keys)
+            self.next_seq = seq + 1
+
+            if self.max_age is not None:
+                oldest = timestamp - self.max_age
+                while self._times[self.first_seq % self.capacity] < oldest:
+                    self._evict_oldest()
+            if self.max_bytes is not None:
+                while self.total_bytes > self.max_bytes and self.next_seq - self.first_seq > 1:
+                    self._evict_oldest()
+            return seq
+
+    def _evict_oldest(self):
+        slot = self.first_seq % self.capacity
+        indexes = self.indexes
+        for field, value in self._keys[slot]:
+            index = indexes[field]
+            entry = index[value]
+            # The oldest message overall is also the oldest one for its key
+            entry.head += 1
+            if entry.head >= len(entry.seqs):
+                del index[value]
+            elif entry.head > 32 and entry.head * 2 > len(entry.seqs):
+                entry.seqs = entry.seqs[entry.head:]
+                entry.head = 0
+        self._keys[slot] = ()
+        self._slots[slot] = None
+        self.total_bytes -= self._sizes[slot]
+        self._sizes[slot] = 0
+        self.first_seq += 1
+        self.evicted_count += 1
+
+    def get(self, seq: int, *default):
+        """Message by sequence number (IndexError or default once evicted)"""
+        if self.first_seq <= seq < self.next_seq:
+            message = self._slots[seq % self.capacity]
+            # Evicted (and the slot reused) while reading: first_seq has moved past seq
+            if message is not None and seq >= self.first_seq:
+                return message
+        if default:
+            return default[0]
+        raise IndexError(f"message {seq} is not retained")
+
+    def timestamp_of(self, seq: int) -> float:
+        """POSIX timestamp of a retained message"""
+        return self._times[seq % self.capacity]
+
+    def iter_indexed(self, field: str, value: Any) -> Iterator[int]:
+        """Sequence numbers of retained messages whose field equals value, newest first"""
+        entry = self.indexes[field].get(value)
+        if entry is None:
+            return
+        seqs = entry.seqs
+        for position in range(len(seqs) - 1, -1, -1):
+            seq = seqs[position]
+            if seq < self.first_seq:
+                return
+            yield seq
+
+    def index_keys(self, field: str) -> List[Any]:
+        """Values of an indexed field present among the retained messages"""
+        with self._lock:
+            return list(self.indexes[field])
+
+    def view(self) -> MessageView:
+        """Zero-copy view of everything retained right now, oldest first"""
+        return MessageView(self, self.first_seq, self.next_seq)
+
+    def latest(self, count: int) -> MessageView:
+        """View of the newest count messages"""
+        return MessageView(self, max(self.first_seq, self.next_seq - count), self.next_seq)
+
+    def since(self, timestamp: float) -> MessageView:
+        """View of the messages with a timestamp at or after the given POSIX time"""
+        low, high = self.first_seq, self.next_seq
+        while low < high:
+            middle = (low + high) // 2
+            if self._times[middle % self.capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return MessageView(self, low, self.next_seq)
+
+    def clear(self):
+        """Drop all messages (sequence numbers keep counting)"""
+        with self._lock:
+            while self.first_seq < self.next_seq:
+                self._evict_oldest()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return self.next_seq - self.first_seq
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.view())
+
+    def __reversed__(self) -> Iterator[Dict[str, Any]]:
+        return reversed(self.view())
+
+    def __getitem__(self, index):
+        return self.view()[index]
@@ -0,0 +1,232 @@
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from queue import Queue
+from typing import Dict, List, Optional, Any, Callable, Tuple
+import logging
+
+from .filter_expression import FilterExpression, compile_filter
+
+
+@dataclass(eq=False)
+class Trigger:
+    """A named trigger condition (a filter expression, see FilterExpression)"""
+    name: str
+    expression: FilterExpression
+    edge: bool = True     # Fire when the condition becomes true, not on every matching frame
+    fired: int = 0
+    levels: Dict[Tuple[Optional[int], int], bool] = field(default_factory=dict)
+
+    def check(self, message_data: Dict[str, Any]) -> bool:
+        matched = self.expression.match(message_data)
+        if not self.edge:
+            return matched
+        # Edges are tracked per (channel, ID) so unrelated frames do not reset them
+        key = (message_data.get('channel'), message_data['can_id'])
+        previous = self.levels.get(key, False)
+        self.levels[key] = matched
+        return matched and not previous
+
+
+@dataclass(eq=False)
+class TriggerEvent:
+    """Frames recorded around one trigger"""
+    trigger: str
+    condition: str
+    trigger_time: datetime
+    frames: List[Dict[str, Any]] = field(default_factory=list)
+    retriggers: int = 0    # Further triggers during the post-trigger window
+    event_id: Optional[int] = None
+
+    @property
+    def start_time(self) -> datetime:
+        return self.frames[0]['timestamp'] if self.frames else self.trigger_time
+
+    @property
+    def end_time(self) -> datetime:
+        return self.frames[-1]['timestamp'] if self.frames else self.trigger_time
+
+
+class TriggerCapture:
+    """Keeps the frames around trigger conditions at full resolution.
+
+    Every frame fed in goes to a pre-trigger ring holding the last
+    pre_trigger seconds (message time). When a trigger condition fires,
+    the ring becomes the start of an event, frames keep being added for
+    post_trigger seconds, and the finished event is written out on a
+    background thread (DataLogger.log_trigger_event() by default). After
+    an event the capture re-arms by itself unless auto_rearm is off, but
+    ignores triggers until hold_off seconds after the last trigger.
+
+        capture = processor.enable_trigger_capture(data_logger=logger, pre_trigger=2.0)
+        capture.add_trigger('signal.EngineSpeed > 6000', 'overspeed')
+        capture.add_trigger('dtc or error')
+    """
+
+    def __init__(self, data_logger=None, pre_trigger: float = 5.0, post_trigger: float = 5.0,
+                 hold_off: float = 0.0, auto_rearm: bool = True, max_frames: int = 200000,
+                 writer: Optional[Callable[[TriggerEvent], Optional[int]]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.data_logger = data_logger
+        self.writer = writer or (data_logger.log_trigger_event if data_logger else None)
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.hold_off = hold_off
+        self.auto_rearm = auto_rearm
+        self.max_frames = max_frames  # Per window, bounds memory on a busy bus
+        self.triggers: List[Trigger] = []
+        self.event_handlers: List[Callable[[TriggerEvent], None]] = []
+        self.events: deque = deque(maxlen=100)  # Recently finished events
+        self.event_count = 0
+        self.armed = True
+        self.ring: deque = deque(maxlen=max_frames)
+        self.current: Optional[TriggerEvent] = None
+        self._post_end = 0.0
+        self._hold_off_end = 0.0
+        self._lock = threading.Lock()
+        self._write_queue: Queue = Queue()
+        self._write_thread = None
+
+    def add_trigger(self, condition: str, name: Optional[str] = None, edge: bool = True) -> Trigger:
+        """Add a trigger condition (raises FilterSyntaxError)"""
+        trigger = Trigger(name or condition, compile_filter(condition), edge)
+        with self._lock:
+            self.triggers = self.triggers + [trigger]
+        return trigger
+
+    def remove_trigger(self, name: str) -> bool:
+        with self._lock:
+            remaining = [trigger for trigger in self.triggers if trigger.name != name]
+            removed = len(remaining) != len(self.triggers)
+            self.triggers = remaining
+        return removed
+
+    def clear_triggers(self):
+        with self._lock:
+            self.triggers = []
+
+    def add_event_handler(self, handler_func: Callable[[TriggerEvent], None]):
+        """Called with every finished event, before it is written out"""
+        self.event_handlers.append(handler_func)
+
+    def arm(self):
+        """Start watching the triggers again (after an event with auto_rearm off)"""
+        with self._lock:
+            self.armed = True
+
+    def disarm(self):
+        """Stop watching the triggers; an event being recorded is still completed"""
+        with self._lock:
+            self.armed = False
+            self.ring.clear()
+
+    def feed(self, message_data: Dict[str, Any]):
+        """Process one frame; usable directly as a MessageProcessor handler"""
+        finished = None
+        with self._lock:
+            timestamp = message_data['timestamp'].timestamp()
+            current = self.current
+            if current is not None:
+                if timestamp <= self._post_end and len(current.frames) < self.max_frames:
+                    current.frames.append(message_data)
+                    if self._check_triggers(message_data):
+                        current.retriggers += 1
+                    return
+                finished = self._finish()
+
+            if self.armed:
+                ring = self.ring
+                ring.append(message_data)
+                horizon = timestamp - self.pre_trigger
+                while ring[0]['timestamp'].timestamp() < horizon:
+                    ring.popleft()
+
+                trigger = self._check_triggers(message_data)
+                if trigger is not None and timestamp >= self._hold_off_end:
+                    self._start(trigger, message_data, timestamp)
+
+        if finished is not None:
+            self._publish(finished)
+
+    def _check_triggers(self, message_data: Dict[str, Any]) -> Optional[Trigger]:
+        """First trigger firing on this frame (all are evaluated to keep their edge state)"""
+        fired = None
+        for trigger in self.triggers:
+            if trigger.check(message_data) and fired is None:
+                fired = trigger
+        return fired
+
+    def _start(self, trigger: Trigger, message_data: Dict[str, Any], timestamp: float):
+        trigger.fired += 1
+        self.current = TriggerEvent(trigger.name, trigger.expression.text, message_data['timestamp'], list(self.ring))
+        self.ring.clear()
+        self._post_end = timestamp + self.post_trigger
+        self._hold_off_end = timestamp + self.hold_off
+        self.logger.info(f"Trigger '{trigger.name}' fired at {message_data['timestamp']}")
+
+    def _finish(self) -> TriggerEvent:
+        event, self.current = self.current, None
+        self.armed = self.auto_rearm
+        self.event_count += 1
+        self.events.append(event)
+        return event
+
+    def flush(self) -> Optional[TriggerEvent]:
+        """Finish the event being recorded now, e.g. when capture stops"""
+        with self._lock:
+            finished = self._finish() if self.current is not None else None
+        if finished is not None:
+            self._publish(finished)
+        return finished
+
+    def _publish(self, event: TriggerEvent):
+        for handler in self.event_handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                self.logger.error(f"Error in trigger event handler: {e}")
+
+        if self.writer is None:
+            return
+        # One writer thread keeps events in order and off the processing thread
+        if self._write_thread is None or not self._write_thread.is_alive():
+            self._write_thread = threading.Thread(target=self._write_loop, daemon=True)
+            self._write_thread.start()
+        self._write_queue.put(event)
+
+    def _write_loop(self):
+        while True:
+            event = self._write_queue.get()
+            try:
+                if event is None:
+                    return
+                event.event_id = self.writer(event)
+                self.logger.info(f"Trigger event '{event.trigger}' written: {len(event.frames)} frames")
+            except Exception as e:
+                self.logger.error(f"Failed to write trigger event: {e}")
+            finally:
+                self._write_queue.task_done()
+
+    def wait_written(self):
+        """Block until every finished event has been written out"""
+        self._write_queue.join()
+
+    def shutdown(self):
+        """Finish the current event, write everything out and stop the writer thread"""
+        self.flush()
+        if self._write_thread is not None and self._write_thread.is_alive():
+            self._write_queue.put(None)
+            self._write_thread.join()
+        self._write_thread = None
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'armed': self.armed,
+                'recording': self.current is not None,
+                'pre_trigger_frames': len(self.ring),
+                'events': self.event_count,
+                'pending_writes': self._write_queue.qsize(),
+                'triggers': {trigger.name: trigger.fired for trigger in self.triggers}
+            }
@@ -0,0 +1,355 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+import logging
+
+from .isotp import IsoTpReassembler, PCI_FIRST_FRAME, PCI_CONSECUTIVE_FRAME, PCI_FLOW_CONTROL
+from .uds_decoder import (UDSDecoder, SID_READ_DATA_BY_IDENTIFIER, SID_READ_DTC_INFORMATION,
+                          POSITIVE_RESPONSE_OFFSET, NEGATIVE_RESPONSE)
+
+SID_TESTER_PRESENT = 0x3E
+SUPPRESS_POSITIVE_RESPONSE = 0x80
+NRC_RESPONSE_PENDING = 0x78
+# Negative responses after which a batched DID read is retried one DID at a time
+NRC_RETRY_SINGLE = {0x13, 0x14, 0x31}
+
+FLOW_STATUS_CONTINUE = 0x0
+FLOW_STATUS_WAIT = 0x1
+MAX_PDU_LENGTH = 0xFFF  # 12-bit first frame length
+
+# Items on a session's response queue
+RESPONSE_SEGMENT = 'segment'  # A first or consecutive frame of a response arrived
+RESPONSE_PDU = 'pdu'          # A complete response
+
+
+@dataclass
+class EcuTiming:
+    p2: float = 0.05            # Time to the start of the response (single or first frame)
+    p2_star: float = 5.0        # Same, after a response pending (0x78)
+    n_bs: float = 1.0           # Wait for a flow control frame
+    n_cr: float = 1.0           # Wait between consecutive frames of a response
+    st_min: float = 0.0         # Separation time requested from the ECU for its consecutive frames
+    tester_present_interval: float = 2.0
+
+
+@dataclass
+class EcuTarget:
+    name: str
+    tx_id: int
+    rx_id: int
+    channel: Any = None
+    is_extended: bool = False
+    timing: EcuTiming = field(default_factory=EcuTiming)
+    max_dids_per_request: int = 8
+    padding: Optional[int] = 0xCC
+
+
+@dataclass
+class RequestResult:
+    ecu: str
+    request: bytes
+    response: Optional[bytes] = None
+    decoded: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+    pending_count: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _EcuSession:
+    """Per ECU transport state: one outstanding request, flow control and reassembly"""
+
+    def __init__(self, target: EcuTarget):
+        self.target = target
+        self.lock = asyncio.Lock()
+        self.reassembler = IsoTpReassembler(timeout=max(target.timing.n_bs, 1.0), auto_detect=False)
+        self.reassembler.add_address_pair(target.tx_id, target.rx_id)
+        self.responses: asyncio.Queue = asyncio.Queue()
+        self.flow_control: Optional[asyncio.Future] = None
+        self.last_request = 0.0
+        self.tester_present_task: Optional[asyncio.Task] = None
+
+
+class UDSClient:
+    """Asynchronous UDS client for many ECUs on top of the capture interface.
+
+    Each ECU handles one request at a time, as UDS requires, while requests
+    to different ECUs run concurrently. DID reads are batched into
+    multi-DID ReadDataByIdentifier requests and TesterPresent keeps the
+    sessions alive in the background. Received frames arrive through the
+    interface's message callbacks, on the capture thread, and are handed
+    over to the event loop.
+    """
+
+    def __init__(self, can_interface, cdd_parser=None, max_history: int = 10000):
+        self.logger = logging.getLogger(__name__)
+        self.can_interface = can_interface
+        self.decoder = UDSDecoder(cdd_parser)
+        self.sessions: Dict[str, _EcuSession] = {}
+        self.sessions_by_rx_id: Dict[int, _EcuSession] = {}
+        self.history: deque = deque(maxlen=max_history)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """Start receiving responses; must be awaited on the loop that runs the requests"""
+        self.loop = asyncio.get_running_loop()
+        self.can_interface.add_message_callback(self._on_message)
+
+    async def stop(self):
+        """Stop TesterPresent tasks and stop receiving responses"""
+        for session in self.sessions.values():
+            if session.tester_present_task:
+                session.tester_present_task.cancel()
+                session.tester_present_task = None
+        if self._on_message in self.can_interface.message_callbacks:
+            self.can_interface.message_callbacks.remove(self._on_message)
+
+    def add_ecu(self, target: EcuTarget):
+        """Register an ECU by its request/response IDs"""
+        session = _EcuSession(target)
+        self.sessions[target.name] = session
+        self.sessions_by_rx_id[target.rx_id] = session
+
+    def _on_message(self, message_data: Dict[str, Any]):
+        """Capture thread callback: pass frames from known ECUs to the event loop"""
+        session = self.sessions_by_rx_id.get(message_data['can_id'])
+        if session is None or self.loop is None or not message_data.get('is_rx', True):
+            return
+        self.loop.call_soon_threadsafe(self._handle_frame, session, bytes(message_data['data']))
+
+    def _handle_frame(self, session: _EcuSession, data: bytes):
+        if not data:
+            return
+        frame_type = data[0] >> 4
+        if frame_type == PCI_FLOW_CONTROL:
+            if session.flow_control and not session.flow_control.done():
+                session.flow_control.set_result(data)
+            return
+        if frame_type == PCI_FIRST_FRAME:
+            self._send_flow_control(session)
+
+        target = session.target
+        pdu = session.reassembler.feed(target.channel, target.rx_id, data, time.monotonic())
+        if pdu is not None:
+            session.responses.put_nowait((RESPONSE_PDU, pdu['data']))
+        elif frame_type in (PCI_FIRST_FRAME, PCI_CONSECUTIVE_FRAME):
+            session.responses.put_nowait((RESPONSE_SEGMENT, None))
+
+    # Transport
+
+    def _send_frame(self, target: EcuTarget, data: bytes):
+        if target.padding is not None and len(data) < 8:
+            data = data + bytes([target.padding] * (8 - len(data)))
+        self.can_interface.send_message(target.tx_id, data, target.is_extended)
+
+    def _send_flow_control(self, session: _EcuSession):
+        """Let the ECU send all consecutive frames, paced by our STmin"""
+        st_min = session.target.timing.st_min
+        st_min_byte = min(0x7F, int(st_min * 1000)) if st_min >= 0.001 else 0
+        self._send_frame(session.target, bytes([0x30, 0x00, st_min_byte]))
+
+    @staticmethod
+    def _decode_st_min(value: int) -> float:
+        if value <= 0x7F:
+            return value / 1000
+        if 0xF1 <= value <= 0xF9:
+            return (value - 0xF0) / 10000
+        return 0.127
+
+    async def _send_pdu(self, session: _EcuSession, payload: bytes):
+        """Send one request, segmented with flow control when it exceeds a single frame"""
+        target = session.target
+        if len(payload) > MAX_PDU_LENGTH:
+            raise ValueError(f"Request of {len(payload)} bytes exceeds the {MAX_PDU_LENGTH} byte ISO-TP limit")
+        if len(payload) <= 7:
+            self._send_frame(target, bytes([len(payload)]) + payload)
+            return
+
+        self._send_frame(target, bytes([0x10 | (len(payload) >> 8), len(payload) & 0xFF]) + payload[:6])
+        offset, sequence = 6, 1
+        while offset < len(payload):
+            block_size, st_min = await self._wait_flow_control(session)
+            sent = 0
+            while offset < len(payload) and (block_size == 0 or sent < block_size):
+                if sent and st_min:
+                    await asyncio.sleep(st_min)
+                self._send_frame(target, bytes([0x20 | sequence]) + payload[offset:offset + 7])
+                offset += 7
+                sequence = (sequence + 1) & 0x0F
+                sent += 1
+
+    async def _wait_flow_control(self, session: _EcuSession) -> Tuple[int, float]:
+        while True:
+            session.flow_control = self.loop.create_future()
+            data = await asyncio.wait_for(session.flow_control, session.target.timing.n_bs)
+            status = data[0] & 0x0F
+            if status == FLOW_STATUS_CONTINUE:
+                return data[1], self._decode_st_min(data[2])
+            if status != FLOW_STATUS_WAIT:
+                raise ConnectionError("ECU aborted the transfer (flow control overflow)")
+
+    # Requests
+
+    async def request(self, ecu: str, payload: bytes, expect_response: bool = True,
+                      record: bool = True) -> RequestResult:
+        """Send one UDS request and wait for its final response.
+        
+        P2 (P2* after a response pending) limits the wait for the start of
+        the response and N_Cr the gaps between its consecutive frames.
+        record=False keeps the request out of the latency history.
+        """
+        session = self.sessions[ecu]
+        result = RequestResult(ecu=ecu, request=bytes(payload))
+        timing = session.target.timing
+
+        async with session.lock:
+            while not session.responses.empty():
+                session.responses.get_nowait()  # Late responses to an earlier request
+
+            start = time.perf_counter()
+            try:
+                await self._send_pdu(session, payload)
+                session.last_request = time.monotonic()
+                response_timeout = timeout = timing.p2
+                while expect_response:
+                    kind, response = await asyncio.wait_for(session.responses.get(), timeout)
+                    if kind == RESPONSE_SEGMENT:
+                        # The response has started; wait for its next frame
+                        timeout = timing.n_cr
+                        continue
+                    timeout = response_timeout
+                    if len(response) >= 3 and response[0] == NEGATIVE_RESPONSE and response[1] == payload[0] \
+                            and response[2] == NRC_RESPONSE_PENDING:
+                        result.pending_count += 1
+                        response_timeout = timeout = timing.p2_star
+                        continue
+                    if response[0] not in (payload[0] + POSITIVE_RESPONSE_OFFSET, NEGATIVE_RESPONSE):
+                        continue  # Not ours, e.g. a response to a functional request
+                    result.response = response
+                    result.decoded = self.decoder.decode(response)
+                    if response[0] == NEGATIVE_RESPONSE:
+                        result.error = f"Negative response 0x{response[2]:02X}" if len(response) >= 3 \
+                            else "Negative response"
+                    break
+            except asyncio.TimeoutError:
+                result.error = "Timeout"
+            except Exception as e:
+                result.error = str(e)
+            result.latency = time.perf_counter() - start
+
+        if record:
+            self.history.append(result)
+        if result.error and result.error != "Timeout":
+            self.logger.debug(f"{ecu}: request {payload[:3].hex()} failed: {result.error}")
+        return result
+
+    async def read_dids(self, ecu: str, dids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Read DIDs in batches of max_dids_per_request; returns DID -> decoded entry"""
+        dids = list(dids)
+        batch_size = max(1, self.sessions[ecu].target.max_dids_per_request)
+        values = {}
+        for index in range(0, len(dids), batch_size):
+            batch = dids[index:index + batch_size]
+            result = await self.request(ecu, self._did_request(batch))
+            nrc = result.response[2] if result.response and result.response[0] == NEGATIVE_RESPONSE else None
+            if len(batch) > 1 and (nrc in NRC_RETRY_SINGLE or (result.ok and not result.decoded)):
+                # The ECU does not accept this many DIDs at once (or one of them)
+                for did in batch:
+                    single = await self.request(ecu, self._did_request([did]))
+                    self._collect_dids(single, values)
+                continue
+            self._collect_dids(result, values)
+        return values
+
+    def _did_request(self, dids: List[int]) -> bytes:
+        payload = bytearray([SID_READ_DATA_BY_IDENTIFIER])
+        for did in dids:
+            payload += did.to_bytes(2, 'big')
+        return bytes(payload)
+
+    def _collect_dids(self, result: RequestResult, values: Dict[int, Dict[str, Any]]):
+        if result.ok and result.decoded:
+            for entry in result.decoded.get('dids', []):
+                values[entry['did']] = entry
+
+    async def read_dtcs(self, ecu: str, status_mask: int = 0xFF) -> List[Dict[str, Any]]:
+        """Read DTCs by status mask (ReadDTCInformation 0x02)"""
+        result = await self.request(ecu, bytes([SID_READ_DTC_INFORMATION, 0x02, status_mask]))
+        if result.ok and result.decoded:
+            return result.decoded.get('dtcs', [])
+        return []
+
+    async def read_all(self, ecus: Optional[Iterable[str]] = None,
+                       dids: Optional[Iterable[int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Read DIDs (all CDD DIDs by default) and DTCs from every ECU concurrently"""
+        ecus = list(ecus) if ecus is not None else list(self.sessions)
+        if dids is None:
+            cdd_parser = self.decoder.cdd_parser
+            dids = sorted(cdd_parser.dids_by_number) if cdd_parser else []
+        dids = list(dids)
+
+        async def read_ecu(ecu):
+            return {'dids': await self.read_dids(ecu, dids), 'dtcs': await self.read_dtcs(ecu)}
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(read_ecu(ecu) for ecu in ecus), return_exceptions=True)
+        self.logger.info(f"Read {len(dids)} DIDs and DTCs from {len(ecus)} ECUs "
+                         f"in {time.perf_counter() - start:.2f}s")
+        return {ecu: (result if not isinstance(result, Exception) else {'error': str(result)})
+                for ecu, result in zip(ecus, results)}
+
+    # Keep-alive
+
+    def start_tester_present(self, ecu: Optional[str] = None):
+        """Keep diagnostic sessions alive with suppressed TesterPresent requests"""
+        for name in ([ecu] if ecu else list(self.sessions)):
+            session = self.sessions[name]
+            if session.tester_present_task is None:
+                session.tester_present_task = self.loop.create_task(self._tester_present_loop(session))
+
+    def stop_tester_present(self, ecu: Optional[str] = None):
+        for name in ([ecu] if ecu else list(self.sessions)):
+            session = self.sessions[name]
+            if session.tester_present_task:
+                session.tester_present_task.cancel()
+                session.tester_present_task = None
+
+    async def _tester_present_loop(self, session: _EcuSession):
+        interval = session.target.timing.tester_present_interval
+        while True:
+            idle = time.monotonic() - session.last_request
+            if idle < interval:
+                # Any request keeps the session alive, so only fill the gaps
+                await asyncio.sleep(interval - idle)
+                continue
+            await self.request(session.target.name,
+                               bytes([SID_TESTER_PRESENT, SUPPRESS_POSITIVE_RESPONSE]),
+                               expect_response=False, record=False)
+
+    # Metrics
+
+    def get_latency_stats(self, ecu: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Latency statistics per ECU and service (milliseconds)"""
+        groups: Dict[str, List[RequestResult]] = {}
+        for result in self.history:
+            if ecu is None or result.ecu == ecu:
+                groups.setdefault(f"{result.ecu}:0x{result.request[0]:02X}", []).append(result)
+
+        stats = {}
+        for key, results in groups.items():
+            latencies = sorted(result.latency * 1000 for result in results if result.ok)
+            stats[key] = {
+                'count': len(results),
+                'errors': sum(1 for result in results if not result.ok),
+                'timeouts': sum(1 for result in results if result.error == "Timeout"),
+                'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+                'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+                'max_ms': latencies[-1] if latencies else 0.0
+            }
+        return stats
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional, Any
+import logging
+
+from .dtc_matcher import DTCMatcher
+
+SID_READ_DTC_INFORMATION = 0x19
+SID_READ_DATA_BY_IDENTIFIER = 0x22
+POSITIVE_RESPONSE_OFFSET = 0x40
+NEGATIVE_RESPONSE = 0x7F
+
+# ReadDTCInformation sub-functions, grouped by response layout
+DTC_COUNT_SUBFUNCTIONS = {0x01, 0x07, 0x11, 0x12}
+DTC_STATUS_LIST_SUBFUNCTIONS = {0x02, 0x0A, 0x0B, 0x0C, 0x0D, 0x0E, 0x0F, 0x13, 0x15}
+DTC_SINGLE_RECORD_SUBFUNCTIONS = {0x04, 0x06, 0x10}
+DTC_SEVERITY_LIST_SUBFUNCTIONS = {0x08, 0x09}
+DTC_SNAPSHOT_ID_SUBFUNCTIONS = {0x03}
+DTC_FAULT_COUNTER_SUBFUNCTIONS = {0x14}
+DTC_USER_MEMORY_SUBFUNCTIONS = {0x17}
+
+SERVICE_NAMES = {
+    SID_READ_DTC_INFORMATION: 'ReadDTCInformation',
+    SID_READ_DATA_BY_IDENTIFIER: 'ReadDataByIdentifier'
+}
+
+
+class UDSDecoder:
+    """Decodes reassembled UDS responses and resolves DTCs/DIDs through a CDDParser"""
+
+    def __init__(self, cdd_parser=None):
+        self.logger = logging.getLogger(__name__)
+        self.cdd_parser = cdd_parser
+        self._no_dtcs = DTCMatcher({}, {})
+
+    def set_cdd_parser(self, cdd_parser):
+        """Use a (new) CDD model for DTC and DID resolution"""
+        self.cdd_parser = cdd_parser
+
+    @property
+    def dtc_matcher(self) -> DTCMatcher:
+        # Asked for every time: the parser rebuilds it when another variant is activated
+        return self.cdd_parser.get_dtc_matcher() if self.cdd_parser else self._no_dtcs
+
+    def decode_pdu(self, pdu: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Decode a PDU produced by the ISO-TP stage"""
+        return self.decode(pdu['data'])
+
+    def decode(self, payload: bytes) -> Optional[Dict[str, Any]]:
+        """Decode a UDS response payload; returns None for anything not handled"""
+        if not payload:
+            return None
+
+        sid = payload[0]
+        if sid == NEGATIVE_RESPONSE and len(payload) >= 3:
+            return {
+                'service': SERVICE_NAMES.get(payload[1], hex(payload[1])),
+                'sid': payload[1],
+                'negative': True,
+                'nrc': payload[2]
+            }
+
+        if sid == SID_READ_DTC_INFORMATION + POSITIVE_RESPONSE_OFFSET:
+            return self._decode_dtc_information(payload)
+        if sid == SID_READ_DATA_BY_IDENTIFIER + POSITIVE_RESPONSE_OFFSET:
+            return self._decode_data_by_identifier(payload)
+        return None
+
+    def _decode_dtc_information(self, payload: bytes) -> Optional[Dict[str, Any]]:
+        if len(payload) < 2:
+            return None
+
+        subfunction = payload[1]
+        result = {
+            'service': 'ReadDTCInformation',
+            'sid': SID_READ_DTC_INFORMATION,
+            'negative': False,
+            'subfunction': subfunction,
+            'dtcs': []
+        }
+
+        if subfunction in DTC_COUNT_SUBFUNCTIONS:
+            if len(payload) >= 6:
+                result['status_availability_mask'] = payload[2]
+                result['dtc_count'] = (payload[4] << 8) | payload[5]
+        elif subfunction in DTC_STATUS_LIST_SUBFUNCTIONS:
+            if len(payload) >= 3:
+                result['status_availability_mask'] = payload[2]
+            self._read_dtc_records(payload, 3, 4, 0, result['dtcs'])
+        elif subfunction in DTC_USER_MEMORY_SUBFUNCTIONS:
+            if len(payload) >= 4:
+                result['memory_selection'] = payload[2]
+                result['status_availability_mask'] = payload[3]
+            self._read_dtc_records(payload, 4, 4, 0, result['dtcs'])
+        elif subfunction in DTC_SEVERITY_LIST_SUBFUNCTIONS:
+            if len(payload) >= 3:
+                result['status_availability_mask'] = payload[2]
+            self._read_dtc_records(payload, 3, 6, 2, result['dtcs'])
+        elif subfunction in DTC_SINGLE_RECORD_SUBFUNCTIONS:
+            self._read_dtc_records(payload[:6], 2, 4, 0, result['dtcs'])
+        elif subfunction in DTC_SNAPSHOT_ID_SUBFUNCTIONS or subfunction in DTC_FAULT_COUNTER_SUBFUNCTIONS:
+            self._read_dtc_records(payload, 2, 4, 0, result['dtcs'], has_status=False)
+
+        return result
+
+    def _read_dtc_records(self, payload, start, record_size, dtc_offset, dtcs, has_status=True):
+        """Read fixed size DTC records (3-byte DTC at dtc_offset, status after it)"""
+        for offset in range(start, len(payload) - record_size + 1, record_size):
+            position = offset + dtc_offset
+            number = (payload[position] << 16) | (payload[position + 1] << 8) | payload[position + 2]
+            if number == 0:
+                continue
+            dtcs.append({
+                'number': number,
+                'code': f"{number:06X}",
+                'status': payload[position + 3] if has_status else None,
+                'info': self.get_dtc_info(number)
+            })
+
+    def get_dtc_info(self, number: int) -> Optional[Dict]:
+        """Resolve a 3-byte DTC through the CDD (hex code first, then SAE code)"""
+        return self.dtc_matcher.lookup(number)
+
+    def _decode_data_by_identifier(self, payload: bytes) -> Optional[Dict[str, Any]]:
+        result = {
+            'service': 'ReadDataByIdentifier',
+            'sid': SID_READ_DATA_BY_IDENTIFIER,
+            'negative': False,
+            'dids': []
+        }
+
+        offset = 1
+        while offset + 2 <= len(payload):
+            did = (payload[offset] << 8) | payload[offset + 1]
+            info = self.cdd_parser.get_did_info_by_number(did) if self.cdd_parser else None
+            length = self._did_length(info)
+            start = offset + 2
+
+            # Identification values are matched by prefix, so the rest of the response will do
+            end = start + length if length else len(payload)
+            data = bytes(payload[start:end])
+            if self.cdd_parser:
+                # Another variant is loaded in the background; later responses use its tables
+                self.cdd_parser.identify_variant(did, data)
+
+            if not length or end > len(payload):
+                # Without this DID's length the following DIDs cannot be located
+                result['undecoded'] = bytes(payload[offset:])
+                break
+            result['dids'].append({
+                'did': did,
+                'data': data,
+                'info': info,
+                'values': self.cdd_parser.decode_did(did, data) if info else None
+            })
+            offset = end
+
+        if offset < len(payload) and 'undecoded' not in result:
+            result['undecoded'] = bytes(payload[offset:])
+
+        return result
+
+    def _did_length(self, info: Optional[Dict]) -> Optional[int]:
+        if not info:
+            return None
+        try:
+            return int(info.get('length') or 0) or None
+        except (TypeError, ValueError):
+            return None
+
+    def get_all_dtc_codes(self) -> List[int]:
+        """Get numeric codes of all DTCs known to the CDD"""
+        return list(self.dtc_matcher.codes)
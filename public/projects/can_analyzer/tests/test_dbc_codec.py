@@ -0,0 +1,76 @@
+import math
+import os
+import random
+
+import cantools
+import pytest
+
+from parsers.dbc_codec import CompiledEncoder, compile_decoder
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'codec.dbc')
+PAYLOADS = 2000
+
+database = cantools.database.load_file(FIXTURE)
+
+
+def _payloads(message, count):
+    """Random payloads; multiplexed messages mostly get a known selector value"""
+    rng = random.Random(message.frame_id)
+    selectors = sorted(message.signal_tree[0]['Mux']) if message.is_multiplexed() else []
+    for _ in range(count):
+        data = bytearray(rng.getrandbits(8) for _ in range(message.length))
+        if selectors and rng.random() < 0.9:
+            data[0] = rng.choice(selectors)
+        yield bytes(data)
+
+
+def _same_value(expected, decoded):
+    if type(expected) is not type(decoded):
+        return False
+    return expected == decoded or (isinstance(expected, float) and math.isnan(expected) and math.isnan(decoded))
+
+
+def _decode_or_error(decode, data):
+    try:
+        return decode(data)
+    except Exception:
+        return 'error'
+
+
+@pytest.mark.parametrize('message', database.messages, ids=lambda message: message.name)
+def test_decoder_matches_cantools(message):
+    decoder = compile_decoder(message)
+    assert decoder is not None
+
+    for data in _payloads(message, PAYLOADS):
+        expected = _decode_or_error(message.decode, data)
+        decoded = _decode_or_error(decoder, data)
+        if expected == 'error':
+            assert decoded == 'error', data.hex()
+            continue
+        assert decoded.keys() == expected.keys(), data.hex()
+        for name, value in expected.items():
+            assert _same_value(value, decoded[name]), f"{message.name}.{name} {data.hex()}"
+
+
+@pytest.mark.parametrize('message', database.messages, ids=lambda message: message.name)
+def test_encoder_matches_cantools(message):
+    encoder = CompiledEncoder(message, validate=False)
+
+    for data in _payloads(message, PAYLOADS):
+        try:
+            values = message.decode(data, decode_choices=False)
+        except Exception:
+            continue  # Unknown multiplexer value, nothing to encode
+        expected = message.encode(values, strict=False)
+        assert bytes(encoder.encode(values)) == expected, f"{message.name} {values}"
+
+
+def test_encoder_update_matches_full_encode():
+    message = database.get_message_by_name('Scaled')
+    encoder = CompiledEncoder(message)
+    values = {'Rpm': 1500.25, 'Temp': 85, 'Torque': -12.5, 'Pressure': 1000, 'Ratio': 1.25}
+    encoder.encode(values)
+
+    values['Torque'] = 250.0
+    assert bytes(encoder.update(Torque=250.0)) == message.encode(values)